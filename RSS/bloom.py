@@ -0,0 +1 @@
+../Unleash-tenders/bloom.py
\ No newline at end of file
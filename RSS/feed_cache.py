@@ -0,0 +1 @@
+../Unleash-tenders/feed_cache.py
\ No newline at end of file
@@ -0,0 +1 @@
+../Unleash-tenders/keyword_matcher.py
\ No newline at end of file
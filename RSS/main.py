@@ -1,7 +1,15 @@
+import hashlib
+from itertools import islice
 import requests
 import xml.etree.ElementTree as ET
 from email_sender import build_email_body, send_email
 
+# shared helpers, symlinks to the main agent's modules in Unleash-tenders
+from feed_cache import FeedCache
+from rss_stream import iter_items, CHUNK_SIZE
+from seen_store import SeenStore, content_hash
+from keyword_matcher import KeywordMatcher
+
 keywords = {
     "IT": 4,
     "ai": 5,
@@ -89,53 +97,82 @@ keywords = {
     "security stream": 3
 }
 
+# keywords are matched lower-case, keep the original spelling for the output
+keyword_names = {keyword.lower(): keyword for keyword in keywords}
+keyword_matcher = KeywordMatcher({keyword.lower(): weight for keyword, weight in keywords.items()})
+
 # The RSS feed URL
-#rss_urls = ["https://www.tenders.gov.au/public_data/rss/rss.xml",
-#            "https://www.vendorpanel.com.au/PublicTendersRssV2.aspx?mode=all"]
+rss_urls = ["https://www.tenders.gov.au/public_data/rss/rss.xml",
+            "https://www.vendorpanel.com.au/PublicTendersRssV2.aspx?mode=all"]
+
+headers = {
+    'User-Agent': 'Mozilla/5.0 (compatible; TenderBot/1.0; +https://unleashlive.com)'
+}
 
 # input
 
 found_matches = {}
 # load the memory file
 log_file = "processed_links.txt"
+# ETag / Last-Modified + body hash per feed, so unchanged feeds are skipped
+feed_cache = FeedCache("feed_cache.json")
+
+seen_store = SeenStore()
 
 try:
-    processed_links = set()
-    try:
-        with open(log_file, "r") as file:
-            processed_links = {line.strip() for line in file}
-    except FileNotFoundError:
-        print(f"Log file, '{log_file}' not found. Starting with no history.")
-        pass
+    # the old log file is imported into the seen store the first time
+    if seen_store.migrate_legacy_file(log_file, source="rss"):
+        print(f"Imported '{log_file}' into the seen store.")
 
     for rss_url in rss_urls:
         print(f"Checking for tenders at: {rss_url}")
         try:
-            response = requests.get(rss_url, headers=headers)
+            response = requests.get(rss_url, headers={**headers, **feed_cache.request_headers(rss_url)},
+                                    timeout=15, stream=True)
+            if response.status_code == 304:
+                print("Feed not modified since last check.")
+                response.close()
+                continue
             response.raise_for_status()
 
-            root = ET.fromstring(response.text)
-            items = root.findall('.//item')
-
-            if not items:
-                print("No tender items in RSS feed.")
-            else:
-                for item in items:
-                    link = item.find('link').text
+            # the body is hashed as it comes off the socket and compared with the feed
+            # cache before anything is parsed, so a feed sent again unchanged (200, not
+            # 304) is never parsed. Only the raw chunks are kept until then, and the
+            # items are parsed from them lazily, a batch at a time
+            body_hash = hashlib.sha256()
+            chunks = []
+            with response:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    body_hash.update(chunk)
+                    chunks.append(chunk)
+            digest = body_hash.hexdigest()
+
+            if feed_cache.is_unchanged(rss_url, response.status_code, digest=digest):
+                print("Feed content unchanged since last check.")
+                feed_cache.remember(rss_url, response.headers, digest=digest)
+                continue
+
+            item_count = 0
+            items = iter_items(chunks)
+            while True:
+                # check the seen store a batch of items at a time
+                batch = list(islice(items, 200))
+                if not batch:
+                    break
+                item_count += len(batch)
+                processed_links = seen_store.contains_many([item['link'] for item in batch])
+
+                for item in batch:
+                    link = item['link']
                     if link in processed_links:
                         continue
 
-                    title = item.find('title').text
-                    description = item.find('description').text
+                    title = item['title']
+                    description = item['description']
                     content_to_search = (title + " " + description).lower()
 
-                    matched_keywords = []
-                    total_score = 0
-
-                    for keyword, weight in keywords.items():
-                        if keyword.lower() in content_to_search:
-                            matched_keywords.append(f"{keyword} (x{weight})")
-                            total_score += weight
+                    total_score, found = keyword_matcher.score(content_to_search)
+                    matched_keywords = [f"{keyword_names[k]} (x{keywords[keyword_names[k]]})" for k in found]
 
                     if matched_keywords:
                         found_matches[link] = {
@@ -145,25 +182,29 @@ try:
                             'matched_keywords': matched_keywords,
                             'total_score': total_score
                         }
+
+            if not item_count:
+                print("No tender items in RSS feed.")
+            feed_cache.remember(rss_url, response.headers, digest=digest)
         except requests.exceptions.RequestException as e:
             print(f"Error fetching RSS feed from {rss_url}: {e}")
 
+    feed_cache.save()
+
     # This is the correct placement for the sorting and printing logic.
     # It executes only once, after the loop finishes.
     sorted_matches = sorted(found_matches.values(),
                             key=lambda x: x['total_score'],
                             reverse=True)
 
-    new_links_found = [match['link'] for match in sorted_matches]
+    new_links_found = [(match['link'], content_hash(match['title'], match['description'])) for match in sorted_matches]
 
     if new_links_found:
-        print(f"Adding {len(new_links_found)} new links to the log file.")
+        print(f"Adding {len(new_links_found)} new links to the seen store.")
         try:
-            with open(log_file, "a") as file:
-                for link in new_links_found:
-                    file.write(link + "\n")
+            seen_store.add_many(new_links_found, source="rss")
         except Exception as e:
-            print(f"Error writing file: {e}")
+            print(f"Error writing seen store: {e}")
 
     if sorted_matches:
         # build the email
@@ -188,3 +229,5 @@ except requests.exceptions.RequestException as e:
     print(f"Error fetching the RSS feed: {e}")
 except ET.ParseError as e:
     print(f"Error parsing XML: {e}")
+finally:
+    seen_store.close()
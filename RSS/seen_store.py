@@ -0,0 +1 @@
+../Unleash-tenders/seen_store.py
\ No newline at end of file
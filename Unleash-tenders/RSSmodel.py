@@ -1,33 +1,58 @@
 import os
-import json
+from itertools import islice
 import requests
 import xml.etree.ElementTree as ET
 from datetime import datetime
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
-import joblib
 import numpy as np
-from scipy.sparse import hstack, csr_matrix
-from keywords_file import keywords
+from profiles import rss_profile_registry as profile_registry
+from feed_fetcher import fetch_feeds
+from feed_cache import FeedCache
+from rss_stream import iter_items
+from seen_store import SeenStore, content_hash, normalise_key, field_hashes, UNCHANGED, AMENDED
+from near_dup import NearDuplicateIndex
+from model_store import load_pipeline
+from compact_model import LinearScorer
+from text_analysis import TenderAnalyzer
+from html_text import html_to_text
+from prediction_cache import PredictionCache, file_fingerprint, keywords_fingerprint
+from cascade import Cascade, MODEL
 
 
 load_dotenv()
 OUTPUT_DIR = "TenderAusAgent_logs"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 LOG_FILE = os.path.join(OUTPUT_DIR, f"tender_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+FEED_CACHE_FILE = os.path.join(OUTPUT_DIR, "feed_cache.json")
+SEEN_STORE_FILE = os.path.join(OUTPUT_DIR, "seen.db")
+SEEN_BLOOM_FILE = os.path.join(OUTPUT_DIR, "seen.bloom")
+PROCESSED_LINKS_FILE = "processed_links.txt"
+SEEN_BATCH_SIZE = 200
+# item fields we watch for amendments once a tender is in the seen store
+AMENDMENT_FIELDS = ("title", "description")
+# characters of description kept for the model (and Notion's rich text limit)
+DESCRIPTION_LIMIT = 2000
 
 HUBSPOT_TOKEN = os.getenv("HUBSPOT_TOKEN")
 NOTION_TOKEN = os.getenv("NOTION_TOKEN", "").strip()
 NOTION_DB_ID = os.getenv("NOTION_DB_ID", "").strip()
 
-RSS_URLS = ["https://www.tenders.gov.au/public_data/rss/rss.xml"]
+RSS_URLS = [
+    "https://www.tenders.gov.au/public_data/rss/rss.xml",
+    "https://www.vendorpanel.com.au/PublicTendersRssV2.aspx?mode=all",
+]
 
-# Load ML model and vectorizer
+# ML model and vectorizer, loaded by get_model the first time there's something to score
 MODEL_PATH = "RSS_tender_relevance_model.pkl"
 VECTORIZER_PATH = "RSS_tfidf_vectorizer.pkl"
+# sklearn-free export of the two, used when it was made from these pickles (python compact_model.py ... -o RSS_model.npz)
+COMPACT_MODEL_PATH = "RSS_model.npz"
 
-model = joblib.load(MODEL_PATH)
-vectorizer = joblib.load(VECTORIZER_PATH)
+# the keyword profile the model was trained on
+MODEL_PROFILE = "unleash"
+
+_model = None
+_analyzer = None
 
 
 HEADERS = {
@@ -42,137 +67,218 @@ def log(message: str):
         f.write(f"[{datetime.now()}] {message}\n")
 
 
-def safe_get(element, tag, default=""):
-    """Safely extract text from an XML element."""
-    try:
-        node = element.find(tag)
-        return node.text.strip() if node is not None and node.text else default
-    except Exception:
-        return default
+def get_model():
+    """(model, vectorizer), loaded on first use, from the compact export if there is one."""
+    global _model
+    if _model is None:
+        _model = load_pipeline((MODEL_PATH, VECTORIZER_PATH), COMPACT_MODEL_PATH)
+    return _model
+
 
+def model_text(tender):
+    """What the model reads: formatted title + description."""
+    return tender.get('Title', '') + ' ' + tender.get('description', '')
 
-def calculate_keyword_scores(tender):
-    """Calculate weighted keyword score."""
-    text = (tender.get('title', '') + " " + tender.get('description', '')).lower()
-    matched = []
-    total = 0
 
-    # changes KEYWORDS to keywords to bring from other file
-    for keyword, weight in keywords.items():
-        if keyword in text:
-            matched.append(f"{keyword} (x{weight})")
-            total += weight
+def get_analyzer():
+    """
+    Analysis pass for the model (text_analysis.TenderAnalyzer), built on first use.
+    Keyword scores come from get_RSS, so it only does the model's text.
+    """
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = TenderAnalyzer((model_text,), keyword_fields=None, scorer=LinearScorer(*get_model()))
+    return _analyzer
+
 
-    return total, matched
+def open_prediction_cache():
+    """Cache of the model's decisions for this model and keyword profile, see prediction_cache."""
+    cache = PredictionCache(
+        model_hash=file_fingerprint((MODEL_PATH, VECTORIZER_PATH, COMPACT_MODEL_PATH)),
+        profile_hash=keywords_fingerprint(profile_registry[MODEL_PROFILE].keywords),
+        path=SEEN_STORE_FILE,
+    )
+    cache.prune()
+    return cache
+
+
+def seen_record(link, item):
+    """(key, content hash, field hashes), what the seen store keeps for an item."""
+    return link, content_hash(item["title"], item["description"]), field_hashes(item, AMENDMENT_FIELDS)
+
+
+def open_seen_store():
+    return SeenStore(SEEN_STORE_FILE, bloom_path=SEEN_BLOOM_FILE)
 
 
 def get_RSS():
     """
     Get the RSS feed and filter the data that come through it.
+    Items we've seen before only come back if they've been amended since,
+    with the fields that changed under "amended_fields".
     """
     found_matches = []
-    processed_log = "processed_links.txt"
+    found_links = set()
+    # amended items that aren't candidates any more, their new hashes still get saved
+    amended_records = []
 
-    # look for processed links file, this is how we know if the tenders are new or not
+    # the seen store is how we know if the tenders are new or not
     # via the tender url link (as unique, acts as primary key)
-    try:
-        with open(processed_log, "r") as f:
-            processed_links = {line.strip() for line in f}
-    except FileNotFoundError:
-        processed_links = set()
-        log("No previous log file found, starting fresh.")
-
-    # go through RSS urls and get the data
-    for rss_url in RSS_URLS:
-        log(f"Fetching RSS feed: {rss_url}")
-        try:
-            resp = requests.get(rss_url, headers=HEADERS, timeout=15)
-            resp.raise_for_status()
-        except requests.RequestException as e:
-            log(f"ERROR fetching RSS feed: {e}")
+    # an old processed_links.txt is imported into it the first time
+    seen_store = open_seen_store()
+    if seen_store.migrate_legacy_file(PROCESSED_LINKS_FILE, source="rss"):
+        log(f"Imported {PROCESSED_LINKS_FILE} into the seen store.")
+    if seen_store.maybe_compact():
+        log("Compacted the seen store.")
+    near_dups = NearDuplicateIndex(SEEN_STORE_FILE)
+    near_dups.prune()
+    duplicates = []
+    model_profile = profile_registry[MODEL_PROFILE]
+    model_column = profile_registry.names.index(MODEL_PROFILE)
+
+    # fetch all the RSS urls at once, then go through the data
+    # feeds that haven't changed since the last run come back as None
+    feed_cache = FeedCache(FEED_CACHE_FILE)
+    log(f"Fetching {len(RSS_URLS)} RSS feeds")
+    feeds = fetch_feeds(RSS_URLS, headers=HEADERS, timeout=15, cache=feed_cache)
+
+    for rss_url, body in feeds.items():
+        if isinstance(body, Exception):
+            log(f"ERROR fetching RSS feed {rss_url}: {body!r}")
+            continue
+        if body is None:
+            log(f"RSS feed unchanged since last poll: {rss_url}")
             continue
 
+        # from the RSS take the information available
+        # from the RSS we only get a summary, a link and a title
+        # items are streamed out of the body one at a time, start filtering the data
         try:
-            root = ET.fromstring(resp.text)
-            items = root.findall(".//item")
+            items = iter_items(body)
+            while True:
+                # check the seen store a batch of items at a time
+                batch = list(islice(items, SEEN_BATCH_SIZE))
+                if not batch:
+                    break
+                status = seen_store.classify_many(
+                    [(item["link"], field_hashes(item, AMENDMENT_FIELDS)) for item in batch if item["link"]]
+                )
+                # new items, and ones that changed since we saw them
+                new_items = [item for item in batch if item["link"] and status[item["link"]][0] != UNCHANGED]
+
+                # keyword scores for every profile, for the whole batch in one go
+                scores, hits = profile_registry.batch_scores(new_items, return_hits=True)
+
+                for i, item in enumerate(new_items):
+                    try:
+                        link = item["link"]
+                        if link in found_links:
+                            continue
+
+                        title = item["title"]
+                        description = item["description"]
+
+                        total_score = int(scores[i, model_column])
+                        matched = profile_registry.matched_keywords(hits[i], model_profile)
+                        kind, changed = status[link]
+                        amended = kind == AMENDED
+
+                        if not profile_registry.candidates(scores[i]):
+                            if amended:
+                                amended_records.append(seen_record(link, item))
+                                found_links.add(link)
+                            continue
+
+                        if not amended:
+                            # same tender as one we've matched from another source under a different url
+                            duplicate = near_dups.find(title, description, exclude_key=normalise_key(link))
+                            if duplicate:
+                                log(f"Skipping '{title}': near-duplicate of {duplicate[0]} ({duplicate[1]:.2f})")
+                                duplicates.append(seen_record(link, item))
+                                found_links.add(link)
+                                continue
+
+                        match = {
+                            "title": title,
+                            "description": description,
+                            "url": link,
+                            "total_score": total_score,
+                            "matched_keywords": matched,
+                            "profile_scores": dict(zip(profile_registry.names, scores[i].tolist())),
+                        }
+                        if amended:
+                            match["amended_fields"] = changed
+                        found_matches.append(match)
+                        found_links.add(link)
+
+                    except Exception as e:
+                        log(f"ERROR processing item: {e}")
+                        continue
         except ET.ParseError as e:
             log(f"ERROR parsing RSS XML: {e}")
+            feed_cache.forget(rss_url)
             continue
 
-        # from the RSS take the information available
-        # from the RSS we only get a summary, a link and a title
-        # start filtering the data
-        for item in items:
-            try:
-                link = safe_get(item, "link")
-                if not link or link in processed_links:
-                    continue
-
-                title = safe_get(item, "title")
-                description = safe_get(item, "description")
-
-                total_score, matched = calculate_keyword_scores({
-                    "title": title,
-                    "description": description
-                })
-
-                if total_score >= 10:
-                    found_matches.append({
-                        "title": title,
-                        "description": description,
-                        "url": link,
-                        "total_score": total_score,
-                        "matched_keywords": matched
-                    })
-                    processed_links.add(link)
-
-            except Exception as e:
-                log(f"ERROR processing item: {e}")
-                continue
-
-    # Update log file of processed links
+    # Add the new tenders to the seen store, and the new hashes of the amended ones
     try:
-        with open(processed_log, "a") as f:
-            for tender in found_matches:
-                f.write(tender["url"] + "\n")
+        seen_store.add_many(
+            [seen_record(t["url"], t) for t in found_matches if "amended_fields" not in t] + duplicates,
+            source="rss",
+        )
+        seen_store.update_many(
+            [seen_record(t["url"], t) for t in found_matches if "amended_fields" in t] + amended_records
+        )
     except Exception as e:
-        log(f"ERROR updating processed links file: {e}")
+        log(f"ERROR updating seen store: {e}")
+    finally:
+        seen_store.close()
+        near_dups.close()
 
-    log(f"Found {len(found_matches)} new tenders.")
+    try:
+        feed_cache.save()
+    except OSError as e:
+        log(f"ERROR saving feed cache: {e}")
+
+    amended_count = sum("amended_fields" in t for t in found_matches)
+    log(f"Found {len(found_matches) - amended_count} new and {amended_count} amended tenders.")
     return sorted(found_matches, key=lambda x: x["total_score"], reverse=True)
 
 
+def hubspot_headers():
+    return {"Content-Type": "application/json", "Authorization": f"Bearer {HUBSPOT_TOKEN}"}
+
+
+def hubspot_properties(tender):
+    # for title I want to only display after the :
+    # the description is already plain text, formatTender ran it through html_to_text
+    return {
+        # split the title into 2 parts, before the : and after (if there is one)
+        # return the second half
+        "dealname": tender.get("Title", "No Title").split(":", 1)[1].strip() if ":" in tender.get("Title", "") else tender.get("Title", "No Title"),
+        "dealstage": "appointmentscheduled",
+        "tender_description": tender.get("description", ""),
+        "keyword_score": float(tender.get("keyword_score", 0)),
+
+        "url": tender.get("url", "N/A"),
+
+        "ml_recommendation": str(tender['ml_recommendation']),
+    }
+
+
 def post_to_hubspot(tender):
+    """Create a deal for the tender, returns its id (or False)."""
     if not HUBSPOT_TOKEN:
         log("Missing HubSpot token.")
         return False
 
     url = "https://api.hubspot.com/crm/v3/objects/deals"
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {HUBSPOT_TOKEN}"}
-
-    # for title I want to only display after the :
-    # for desctiption I want to remove the <p> from the front and the </p> from the back
-    payload = {
-        "properties": {
-            # split the title into 2 parts, before the : and after (if there is one)
-            # return the second half
-            "dealname": tender.get("Title", "No Title").split(":", 1)[1].strip() if ":" in tender.get("Title", "") else tender.get("Title", "No Title"),
-            "dealstage": "appointmentscheduled",
-            # remove the <p> and </p> if they are present
-            "tender_description": tender.get("description", "")[3:-4] if tender.get("description", "").startswith("<p>") and tender.get("description", "").endswith("</p>") else tender.get("description", ""),
-            "keyword_score": float(tender.get("keyword_score", 0)),
-
-            "url": tender.get("url", "N/A"),
-
-            "ml_recommendation": str(tender['ml_recommendation']),
-        }
-    }
+    payload = {"properties": hubspot_properties(tender)}
 
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=15)
+        resp = requests.post(url, headers=hubspot_headers(), json=payload, timeout=15)
         if resp.status_code == 201:
             log(f"HubSpot: Created deal for '{tender['Title']}'")
-            return True
+            return resp.json()["id"]
         else:
             log(f"HubSpot error {resp.status_code}: {resp.text}")
             return False
@@ -181,63 +287,90 @@ def post_to_hubspot(tender):
         return False
 
 
-def post_to_notion(tender):
-    if not NOTION_TOKEN:
-        log("Missing Notion token.")
+def update_hubspot(deal_id, tender):
+    """Update the deal we made for a tender that has since been amended."""
+    if not HUBSPOT_TOKEN:
+        log("Missing HubSpot token.")
         return False
 
-    url = "https://api.notion.com/v1/pages"
-    headers = {
+    url = f"https://api.hubspot.com/crm/v3/objects/deals/{deal_id}"
+    properties = hubspot_properties(tender)
+    # leave the deal in whatever stage it has been moved to
+    del properties["dealstage"]
+
+    try:
+        resp = requests.patch(url, headers=hubspot_headers(), json={"properties": properties}, timeout=15)
+        if resp.status_code == 200:
+            log(f"HubSpot: Updated deal for '{tender['Title']}'")
+            return deal_id
+        else:
+            log(f"HubSpot error {resp.status_code}: {resp.text}")
+            return False
+    except requests.RequestException as e:
+        log(f"ERROR updating HubSpot: {e}")
+        return False
+
+
+def notion_headers():
+    return {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {NOTION_TOKEN}",
         "Notion-Version": "2022-06-28"
     }
 
-    # for title I want to only display after the :
-    # for desctiption I want to remove the <p> from the front and the </p> from the back
-    payload = {
-        "parent": {"database_id": NOTION_DB_ID},
-        "properties": {
-            "Title": {
-                "title": [
-                    {
-                        "text": {
-                            "content": (
-                                tender.get("Title", "No Title").split(":", 1)[1].strip()
-                                if ":" in tender.get("Title", "")
-                                else tender.get("Title", "No Title")
-                            )
-                        }
+
+def notion_properties(tender):
+    # for title I want to only display after the :
+    # the description is already plain text, formatTender ran it through html_to_text
+    return {
+        "Title": {
+            "title": [
+                {
+                    "text": {
+                        "content": (
+                            tender.get("Title", "No Title").split(":", 1)[1].strip()
+                            if ":" in tender.get("Title", "")
+                            else tender.get("Title", "No Title")
+                        )
                     }
-                ]
-            },
-            "tenderdecription": {
-                "rich_text": [
-                    {
-                        "text": {
-                            "content": (
-                                tender.get("description", "")
-                                .removeprefix("<p>")
-                                .removesuffix("</p>")[:2000]
-                            )
-                        }
+                }
+            ]
+        },
+        "tenderdecription": {
+            "rich_text": [
+                {
+                    "text": {
+                        "content": tender.get("description", "")[:DESCRIPTION_LIMIT]
                     }
-                ]
-            },
-            "keyword_score": {"number": float(tender.get("keyword_score", 0))},
-            "url": {"url": tender.get("url", "N/A")},
-
-            "MLRecommendation": {
-                "rich_text": [{"text": {"content": str(tender.get("ml_recommendation", ""))}}]
-            },
-        }
+                }
+            ]
+        },
+        "keyword_score": {"number": float(tender.get("keyword_score", 0))},
+        "url": {"url": tender.get("url", "N/A")},
+
+        "MLRecommendation": {
+            "rich_text": [{"text": {"content": str(tender.get("ml_recommendation", ""))}}]
+        },
+    }
+
+
+def post_to_notion(tender):
+    """Add a page for the tender, returns its id (or False)."""
+    if not NOTION_TOKEN:
+        log("Missing Notion token.")
+        return False
+
+    url = "https://api.notion.com/v1/pages"
+    payload = {
+        "parent": {"database_id": NOTION_DB_ID},
+        "properties": notion_properties(tender),
     }
 
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=15)
+        resp = requests.post(url, headers=notion_headers(), json=payload, timeout=15)
         if resp.status_code in (200, 201):
             log(f"Notion: Added '{tender['Title']}'")
-            return True
+            return resp.json()["id"]
         else:
             log(f"Notion error {resp.status_code}: {resp.text}")
             return False
@@ -246,11 +379,43 @@ def post_to_notion(tender):
         return False
 
 
+def update_notion(page_id, tender):
+    """Update the page we made for a tender that has since been amended."""
+    if not NOTION_TOKEN:
+        log("Missing Notion token.")
+        return False
+
+    url = f"https://api.notion.com/v1/pages/{page_id}"
+
+    try:
+        resp = requests.patch(url, headers=notion_headers(), json={"properties": notion_properties(tender)}, timeout=15)
+        if resp.status_code == 200:
+            log(f"Notion: Updated '{tender['Title']}'")
+            return page_id
+        else:
+            log(f"Notion error {resp.status_code}: {resp.text}")
+            return False
+    except requests.RequestException as e:
+        log(f"ERROR updating Notion: {e}")
+        return False
+
+
+# where a profile's matches can be sent, see profiles_file.py
+SINKS = {
+    "hubspot": post_to_hubspot,
+    "notion": post_to_notion,
+}
+# and how the record a sink made is updated when the tender is amended
+UPDATE_SINKS = {
+    "hubspot": update_hubspot,
+    "notion": update_notion,
+}
+
+
 def formatTender(tender):
     """Format the data so it is better readable for a machine learning model"""
-    # Remove unwanted HTML tags etc from the description
-    soup = BeautifulSoup(tender.get("description", ""), "html.parser")
-    description = soup.get_text(strip=True)
+    # Remove unwanted HTML tags etc from the description, only as much of it as we keep is parsed
+    description = html_to_text(tender.get("description", ""), DESCRIPTION_LIMIT)
 
     formatted_tender = {
         # title
@@ -261,7 +426,7 @@ def formatTender(tender):
         ),
 
         # description
-        "description": description[:2000],
+        "description": description,
 
         # keyword score
         "keyword_score": float(tender.get("total_score", 0)),
@@ -271,19 +436,32 @@ def formatTender(tender):
     return formatted_tender
 
 
-def predict_tender_relevance(tender, model, vectorizer):
+def score_tenders(tenders, analyzer, analyses=None, cache=None):
     """
-    Given a tender dict with title, description, and keyword_score,
-    return True/False for whether it's relevant.
+    Model predictions for a list of formatted tenders, with the fused scorer: each
+    tender is tokenised once and scored straight from its term ids, no tf-idf matrix
+    (same results as the model's predict / predict_proba).
+    Pass analyses if these tenders have already been through analyzer.analyse_many.
+    With a cache (open_prediction_cache) tenders it has seen are a lookup, and never tokenised.
+    Returns (predictions, probabilities), in the same order as tenders.
     """
-    text = tender.get('Title', '') + ' ' + tender.get('description', '')
-    X_text = vectorizer.transform([text])
-    X_kw = np.array([[tender.get('keyword_score', 0)]])  # keyword score feature
-    X_combined = hstack([X_text, csr_matrix(X_kw)])
+    if analyses is None:
+        analyses = analyzer.analyse_many(tenders)
+    extras = [(float(t.get('keyword_score', 0)),) for t in tenders]
 
-    prediction = model.predict(X_combined)[0]
-    # prob = model.predict_proba(X_combined)[0][1]  # optional probability
-    return bool(prediction)
+    def decide(indices):
+        return [analyzer.decision(analyses[i], extras[i]) for i in indices]
+
+    if cache is None:
+        decisions = decide(range(len(tenders)))
+    else:
+        keys = [analyzer.fingerprint(analysis, extra) for analysis, extra in zip(analyses, extras)]
+        decisions = cache.decisions(keys, decide)
+    decisions = np.array(decisions)
+    # same rule as model.predict / predict_proba
+    predictions = analyzer.scorer.classes_[(decisions > 0).astype(int)]
+    probabilities = 1.0 / (1.0 + np.exp(-decisions))
+    return predictions, probabilities
 
 
 def main():
@@ -294,16 +472,79 @@ def main():
         log("No tenders found in RSS feed.")
         return
 
-    for tender in tenders:
-        formatted = formatTender(tender)
-        is_relevant = predict_tender_relevance(formatted, model, vectorizer)
-        formatted["ml_recommendation"] = f"{'True' if is_relevant else 'False'}"
-
-        log(f"Prediction for '{tender['title']}': {is_relevant}")
+    # format everything, then run the model over the ones the keyword bands leave undecided
+    # (the feeds don't give a country, so that stage is skipped)
+    formatted_tenders = [formatTender(tender) for tender in tenders]
+    score_rows = [[tender["profile_scores"][name] for name in profile_registry.names] for tender in tenders]
+    cascade = Cascade.from_config(profile_registry, use_countries=False)
+    stages = cascade.triage(tenders, score_rows)
+    log(cascade.summary())
+    to_model = [i for i, stage in enumerate(stages) if stage == MODEL]
+    predictions = np.zeros(len(tenders), dtype=bool)
+    analyzer = None
+    # one analysis per tender the model sees, shared by the cache key, the model and the explanation
+    analyses = {}
+
+    if to_model:
+        analyzer = get_analyzer()
+        analyses = dict(zip(to_model, analyzer.analyse_many([formatted_tenders[i] for i in to_model])))
+        # tenders we've scored before (same text, model and keywords) are a lookup
+        prediction_cache = open_prediction_cache()
+        predictions[to_model], _ = score_tenders(
+            [formatted_tenders[i] for i in to_model], analyzer,
+            analyses=[analyses[i] for i in to_model], cache=prediction_cache,
+        )
+        prediction_cache.close()
+        log(f"Prediction cache: {prediction_cache.hits} hits, {prediction_cache.misses} scored")
+
+    # amended tenders update the deal / page we made for them instead of making another
+    seen_store = open_seen_store()
+    # matched tenders are indexed so their copies from other sources are dropped
+    near_dups = NearDuplicateIndex(SEEN_STORE_FILE)
+    record_ids = seen_store.sink_ids_many([t["url"] for t in tenders if "amended_fields" in t])
+    created_ids = []
+
+    for i, (tender, formatted, stage, score_row, is_relevant) in enumerate(zip(
+            tenders, formatted_tenders, stages, score_rows, predictions)):
+        is_relevant = bool(is_relevant)
+        if stage == MODEL:
+            formatted["ml_recommendation"] = f"{'True' if is_relevant else 'False'}"
+            log(f"Prediction for '{tender['title']}': {is_relevant}")
+        else:
+            formatted["ml_recommendation"] = f"Not run ({stage})"
+            log(f"Decided by {stage}: '{tender['title']}'")
+        if "amended_fields" in tender:
+            log(f"Amended: {', '.join(tender['amended_fields'])}")
+        if is_relevant:
+            # the words that pushed the model to say yes, from the term ids it was scored on
+            top_terms = analyzer.explain(analyses[i])
+            log(f"Top terms: {', '.join(term for term, _ in top_terms)}")
+
+        # every profile the tender matches, each sink posted to once
+        matched_profiles, sinks = cascade.route(stage, score_row, is_relevant)
+        if matched_profiles:
+            log(f"Matched profiles: {', '.join(p.name for p in matched_profiles)}")
+            key = normalise_key(tender["url"])
+            if "amended_fields" in tender:
+                near_dups.add(key, tender["title"], tender["description"])
+            else:
+                duplicate = near_dups.check_and_add(key, tender["title"], tender["description"])
+                if duplicate:
+                    # another copy of it matched earlier in this run
+                    log(f"Skipping '{tender['title']}': near-duplicate of {duplicate[0]} ({duplicate[1]:.2f})")
+                    continue
+        existing_ids = record_ids.get(tender["url"], {})
+        for sink in sinks:
+            if sink in existing_ids:
+                UPDATE_SINKS[sink](existing_ids[sink], formatted)
+                continue
+            record_id = SINKS[sink](formatted)
+            if record_id:
+                created_ids.append((tender["url"], sink, record_id))
 
-        if is_relevant or tender.get('total_score', 0) > 10:
-            post_to_hubspot(formatted)
-            post_to_notion(formatted)
+    seen_store.set_sink_ids(created_ids)
+    seen_store.close()
+    near_dups.close()
 
     log("=== Tender Keyword Scanner Completed ===")
 
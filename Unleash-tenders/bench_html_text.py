@@ -0,0 +1,80 @@
+import argparse
+import html
+import json
+import time
+import warnings
+
+import html_text
+from html_text import html_to_text
+
+# Compares BeautifulSoup(description, "html.parser").get_text(strip=True)[:2000]
+# (what formatTender used to do) with html_text.html_to_text, checks they give
+# the same text and times both per description, with the cache cold and warm.
+#
+# The checked-in data is already cleaned, so by default the descriptions are
+# wrapped back up the way the tenders.gov.au feed sends them (<p>escaped text</p>).
+# A saved feed gives the real thing:
+#
+#   python bench_html_text.py [--feed saved_rss.xml] [--repeat 5]
+
+warnings.filterwarnings("ignore")
+
+DESCRIPTION_LIMIT = 2000
+
+
+def best_of(fn, repeat):
+    """Fastest of repeat runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def sample_descriptions():
+    descriptions = []
+    for path, key in (("RSS_tenders_data.json", "description"), ("tenders_data.json", "description")):
+        with open(path, "r", encoding="utf-8") as f:
+            descriptions += [f"<p>{html.escape(t.get(key, ''))}</p>" for t in json.load(f)]
+    return descriptions
+
+
+def feed_descriptions(path):
+    from rss_stream import iter_items
+
+    with open(path, "rb") as f:
+        return [item["description"] for item in iter_items(f)]
+
+
+def soup_text(description):
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(description, "html.parser").get_text(strip=True)[:DESCRIPTION_LIMIT]
+
+
+def cold_text(description):
+    html_text._cache.clear()
+    return html_to_text(description, DESCRIPTION_LIMIT)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark BeautifulSoup get_text against html_text.html_to_text.")
+    parser.add_argument("--feed", help="a saved RSS feed to take the descriptions from")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, the best is reported")
+    args = parser.parse_args()
+
+    descriptions = feed_descriptions(args.feed) if args.feed else sample_descriptions()
+    n = len(descriptions)
+
+    mismatches = sum(soup_text(d) != cold_text(d) for d in descriptions)
+
+    soup = best_of(lambda: [soup_text(d) for d in descriptions], args.repeat)
+    cold = best_of(lambda: [cold_text(d) for d in descriptions], args.repeat)
+    [html_to_text(d, DESCRIPTION_LIMIT) for d in descriptions]
+    warm = best_of(lambda: [html_to_text(d, DESCRIPTION_LIMIT) for d in descriptions], args.repeat)
+
+    print(f"{n} descriptions, {mismatches} differ from BeautifulSoup")
+    print(f"  BeautifulSoup  {soup / n * 1e6:8.1f} us/description")
+    print(f"  html_to_text   {cold / n * 1e6:8.1f} us/description   ({soup / cold:.1f}x)")
+    print(f"  cached         {warm / n * 1e6:8.1f} us/description   ({soup / warm:.1f}x)")
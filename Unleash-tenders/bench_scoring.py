@@ -0,0 +1,81 @@
+import argparse
+import json
+import time
+import warnings
+
+import numpy as np
+from scipy.sparse import hstack, csr_matrix
+
+from compact_model import LinearScorer
+from model_store import load_pipeline
+
+# Compares the tf-idf matrix path (vectorizer.transform -> hstack -> model.predict_proba)
+# with compact_model.LinearScorer on the checked-in sample data, for one tender at
+# a time and for a whole batch, and checks they give the same probabilities.
+#
+#   python bench_scoring.py [--repeat 5]
+
+warnings.filterwarnings("ignore")
+
+
+def best_of(fn, repeat):
+    """Fastest of repeat runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def matrix_proba(model, vectorizers, texts, extras):
+    """The current path: one tf-idf matrix per vectorizer, hstacked with the extra columns."""
+    parts = [v.transform(column) for v, column in zip(vectorizers, zip(*texts))]
+    parts.append(csr_matrix(np.asarray(extras, dtype=float)))
+    return model.predict_proba(hstack(parts).tocsr())[:, 1]
+
+
+def kernel_proba(scorer, texts, extras):
+    return scorer.predict_proba_many(texts, extras)[:, 1]
+
+
+def bench(name, model, vectorizers, texts, extras, repeat):
+    scorer = LinearScorer(model, *vectorizers)
+    n = len(texts)
+
+    diff = np.abs(matrix_proba(model, vectorizers, texts, extras) - kernel_proba(scorer, texts, extras)).max()
+
+    single_matrix = best_of(lambda: [matrix_proba(model, vectorizers, [t], [e]) for t, e in zip(texts, extras)], repeat)
+    single_kernel = best_of(lambda: [scorer.proba(t, e) for t, e in zip(texts, extras)], repeat)
+    batch_matrix = best_of(lambda: matrix_proba(model, vectorizers, texts, extras), repeat)
+    batch_kernel = best_of(lambda: kernel_proba(scorer, texts, extras), repeat)
+
+    print(f"{name}: {n} tenders, max |p diff| {diff:.1e}")
+    print(f"  single  matrix {single_matrix / n * 1e6:8.1f} us/tender   kernel {single_kernel / n * 1e6:8.1f} us/tender"
+          f"   ({single_matrix / single_kernel:.1f}x)")
+    print(f"  batch   matrix {batch_matrix / n * 1e6:8.1f} us/tender   kernel {batch_kernel / n * 1e6:8.1f} us/tender"
+          f"   ({batch_matrix / batch_kernel:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark tf-idf matrix scoring against the fused linear scorer.")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement, the best is reported")
+    args = parser.parse_args()
+
+    # RSSmodel: title + description, keyword score
+    model, vectorizer = load_pipeline(("RSS_tender_relevance_model.pkl", "RSS_tfidf_vectorizer.pkl"))
+    with open("RSS_tenders_data.json", "r", encoding="utf-8") as f:
+        tenders = json.load(f)
+    texts = [(t.get("Title", "") + " " + t.get("description", ""),) for t in tenders]
+    extras = [(float(t.get("keyword_score", 0)),) for t in tenders]
+    bench("RSSmodel", model, [vectorizer], texts, extras, args.repeat)
+
+    # predictor: description, category + agency, keyword score
+    model, desc_vectorizer, other_vectorizer = load_pipeline(
+        ("model.pkl", "desc_vectorizer.pkl", "other_vectorizer.pkl")
+    )
+    with open("tenders_data.json", "r", encoding="utf-8") as f:
+        tenders = json.load(f)
+    texts = [(t.get("description", ""), t.get("category", "") + " " + t.get("agency", "")) for t in tenders]
+    extras = [(float(i % 20),) for i in range(len(tenders))]
+    bench("predictor", model, [desc_vectorizer, other_vectorizer], texts, extras, args.repeat)
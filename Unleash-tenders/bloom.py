@@ -0,0 +1,78 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+
+# Bloom filter kept in a memory-mapped file. It sits in front of the seen store:
+# a "no" is certain and costs one hash, only a "maybe" has to go to SQLite.
+# file layout: header (magic, bits, hashes, count, capacity) then the bit array
+MAGIC = b"BLM1"
+HEADER = struct.Struct("<4sQIQQ")
+
+
+class BloomFilter:
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.num_bits, self.num_hashes, _, self.capacity = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a bloom filter file")
+
+    @property
+    def count(self):
+        """
+        Number of store rows the filter has all the keys of. Read from the
+        file every time, other processes with it mapped update it too.
+        """
+        # count sits after magic, bits and hashes in the header
+        return struct.unpack_from("<Q", self._map, 16)[0]
+
+    @classmethod
+    def create(cls, path, capacity, error_rate=0.001):
+        """Make an empty filter sized for capacity keys at the given false positive rate."""
+        capacity = max(int(capacity), 1)
+        num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, num_bits, num_hashes, 0, capacity))
+            f.truncate(HEADER.size + (num_bits + 7) // 8)
+        os.replace(tmp_path, path)
+        return cls(path)
+
+    def close(self):
+        if not self._map.closed:
+            self._map.close()
+        self._file.close()
+
+    def _positions(self, key):
+        # one hash split in two, then double hashing for the other positions
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key):
+        data = self._map
+        for pos in self._positions(key):
+            if not data[HEADER.size + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add_many(self, keys):
+        """Set the bits for keys. The count is left alone, the caller knows how many of them were new."""
+        data = self._map
+        for key in keys:
+            for pos in self._positions(key):
+                data[HEADER.size + (pos >> 3)] |= 1 << (pos & 7)
+
+    def set_count(self, count):
+        struct.pack_into("<Q", self._map, 16, count)
+
+    def flush(self):
+        self._map.flush()
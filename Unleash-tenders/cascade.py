@@ -0,0 +1,75 @@
+from collections import Counter
+
+import cascade_file
+
+# Stages a tender goes through before the ML model, cheapest first. The first
+# one that can decide the tender does, and only the tenders none of them can
+# decide (the ambiguous keyword band of a profile that uses the model) are
+# scored by the model. The counts show how much inference that saves.
+
+COUNTRY = "country"
+REJECT_LIST = "reject list"
+KEYWORD_ACCEPT = "keyword accept"
+KEYWORD_REJECT = "keyword reject"
+MODEL = "model"
+STAGES = (COUNTRY, REJECT_LIST, KEYWORD_ACCEPT, KEYWORD_REJECT, MODEL)
+# stages where the keyword scores (and the model) decide which profiles a tender
+# goes to, the others rule it out for every profile
+ROUTED_STAGES = (KEYWORD_ACCEPT, MODEL)
+
+
+def _normalise(value):
+    return str(value or "").strip().lower()
+
+
+class Cascade:
+    """
+    countries: set of allowed values of country_field (None to skip the check,
+    e.g. the RSS feeds don't say). reject: {field: set of values} that rule a
+    tender out. The keyword bands come from the profiles in registry.
+    """
+
+    def __init__(self, registry, countries=None, country_field="countryname", reject=None):
+        self.registry = registry
+        self.countries = {_normalise(c) for c in countries} if countries is not None else None
+        self.country_field = country_field
+        self.reject = {field: {_normalise(v) for v in values} for field, values in (reject or {}).items() if values}
+        self.counts = Counter()
+
+    @classmethod
+    def from_config(cls, registry, use_countries=True):
+        """Cascade from cascade_file.py."""
+        return cls(registry, cascade_file.countries if use_countries else None, reject=cascade_file.reject)
+
+    def stage(self, tender, score_row):
+        """The stage that decides this tender."""
+        if self.countries is not None and _normalise(tender.get(self.country_field)) not in self.countries:
+            return COUNTRY
+        for field, values in self.reject.items():
+            if _normalise(tender.get(field)) in values:
+                return REJECT_LIST
+        if self.registry.needs_model(score_row):
+            return MODEL
+        # the model can't change the outcome, the keyword scores alone decide it
+        matched, _ = self.registry.route(score_row)
+        return KEYWORD_ACCEPT if matched else KEYWORD_REJECT
+
+    def triage(self, tenders, score_rows):
+        """The deciding stage of each tender, in order, counted in self.counts."""
+        stages = [self.stage(tender, score_row) for tender, score_row in zip(tenders, score_rows)]
+        self.counts.update(stages)
+        return stages
+
+    def route(self, stage, score_row, prediction=False):
+        """
+        (matched profiles, sinks) for a tender triage() put in stage,
+        see ProfileRegistry.route. None if an earlier stage ruled it out.
+        """
+        if stage not in ROUTED_STAGES:
+            return [], []
+        return self.registry.route(score_row, prediction)
+
+    def summary(self):
+        total = sum(self.counts.values())
+        parts = ", ".join(f"{stage}: {self.counts[stage]}" for stage in STAGES)
+        return f"Cascade: {parts} ({total - self.counts[MODEL]} of {total} decided without the model)"
@@ -0,0 +1,11 @@
+# Cheap checks that run before the ML model, see cascade.py.
+# The keyword score bands are per profile, in profiles_file.py (accept_score / reject_score).
+
+# countries (TenderInfo countryname, lower-case) we take tenders from, anything else is rejected first
+countries = {"australia", "united kingdom", "united states of america", "united states", "usa", "england", "wales"}
+
+# field -> exact values (lower-case, trimmed) that rule a tender out whatever its keyword score
+reject = {
+    "category": set(),
+    "agency": set(),
+}
@@ -0,0 +1,393 @@
+import argparse
+import json
+import math
+import os
+import re
+
+import numpy as np
+
+# At inference time a LogisticRegression + TfidfVectorizer pipeline is just a
+# vocabulary, idf weights, coefficients and an intercept. export() writes those
+# out as one .npz file: plain numpy arrays plus a JSON manifest (vocabularies
+# and settings), nothing pickled, and load() gives back drop-in replacements
+# for the sklearn objects (transform / predict / predict_proba), so scoring
+# workers don't need sklearn or joblib and can't be handed a malicious pickle.
+#
+# Usage:
+#   python compact_model.py model.pkl desc_vectorizer.pkl other_vectorizer.pkl -o model.npz
+#   python compact_model.py RSS_tender_relevance_model.pkl RSS_tfidf_vectorizer.pkl -o RSS_model.npz
+
+FORMAT = "tender-linear"
+FORMAT_VERSION = 1
+
+# the TfidfVectorizer settings CompactVectorizer knows how to reproduce
+SUPPORTED_PARAMS = {
+    "analyzer": "word",
+    "binary": False,
+    "input": "content",
+    "preprocessor": None,
+    "strip_accents": None,
+    "stop_words": None,
+    "tokenizer": None,
+    "use_idf": True,
+}
+
+
+class CompactVectorizer:
+    """The transform() half of a fitted TfidfVectorizer (word analyzer), in numpy/scipy only."""
+
+    def __init__(self, vocabulary, idf, ngram_range=(1, 1), lowercase=True,
+                 token_pattern=r"(?u)\b\w\w+\b", norm="l2", sublinear_tf=False):
+        self.vocabulary = list(vocabulary)
+        self.vocabulary_ = {term: i for i, term in enumerate(self.vocabulary)}
+        self.idf_ = np.asarray(idf, dtype=np.float64)
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self.token_pattern = token_pattern
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self._token_re = re.compile(token_pattern)
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer):
+        """CompactVectorizer with the same vocabulary, idf and settings as a fitted TfidfVectorizer."""
+        if isinstance(vectorizer, cls):
+            return vectorizer
+        spec = _vectorizer_spec(vectorizer)
+        return cls(spec.pop("vocabulary"), vectorizer.idf_, **spec)
+
+    def tokens(self, text):
+        """Word tokens the way the fitted vectorizer splits text."""
+        if self.lowercase:
+            text = text.lower()
+        return self._token_re.findall(text)
+
+    def terms(self, tokens):
+        """Unigrams .. n-grams of a token list (sklearn's _word_ngrams, no stop words)."""
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+        terms = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), max_n + 1):
+            terms.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return terms
+
+    def counts(self, token_lists):
+        """Raw term counts (csr, sorted indices) for already tokenised documents."""
+        from scipy.sparse import csr_matrix
+
+        vocabulary = self.vocabulary_
+        indptr = [0]
+        indices = []
+        values = []
+        for tokens in token_lists:
+            counter = {}
+            for term in self.terms(tokens):
+                index = vocabulary.get(term)
+                if index is not None:
+                    counter[index] = counter.get(index, 0) + 1
+            for index in sorted(counter):
+                indices.append(index)
+                values.append(counter[index])
+            indptr.append(len(indices))
+        return csr_matrix(
+            (np.asarray(values, dtype=np.float64), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(indptr) - 1, len(self.vocabulary)),
+        )
+
+    def transform_tokens(self, token_lists):
+        """tf-idf rows for already tokenised documents, same maths and order as sklearn."""
+        X = self.counts(token_lists)
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        X.data *= self.idf_[X.indices]
+        if self.norm == "l2":
+            _normalize_rows(X, np.square)
+        elif self.norm == "l1":
+            _normalize_rows(X, np.abs)
+        return X
+
+    def transform(self, texts):
+        return self.transform_tokens([self.tokens(text) for text in texts])
+
+
+def _normalize_rows(X, fn):
+    # row by row, summing in index order, so the result is bit-for-bit what sklearn.normalize gives
+    data = X.data
+    for row in range(X.shape[0]):
+        start, end = X.indptr[row], X.indptr[row + 1]
+        total = 0.0
+        for value in fn(data[start:end]).tolist():
+            total += value
+        if fn is np.square:
+            total = np.sqrt(total)
+        if total != 0.0:
+            data[start:end] /= total
+
+
+class CompactLogisticRegression:
+    """predict / predict_proba of a fitted binary LogisticRegression, numpy/scipy only."""
+
+    def __init__(self, coef, intercept, classes):
+        self.coef_ = np.asarray(coef, dtype=np.float64)
+        self.intercept_ = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        if len(self.classes_) != 2:
+            raise ValueError("only binary models can be exported")
+
+    @property
+    def n_features_in_(self):
+        return self.coef_.shape[1]
+
+    def decision_function(self, X):
+        scores = X @ self.coef_.T + self.intercept_
+        return np.asarray(scores).ravel()
+
+    def predict_proba(self, X):
+        from scipy.special import expit
+
+        prob = expit(self.decision_function(X))
+        return np.vstack([1 - prob, prob]).T
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+
+class LinearScorer:
+    """
+    Fused scoring kernel for a linear model over tf-idf features.
+    score = intercept + sum over vectorizers of (sum coef*idf*count) / norm(idf*count)
+            + coef * extra features
+    so coef*idf is folded into one weight per term up front and the norm is
+    worked out while counting. No CSR matrix, hstack or predict call.
+    Gives the same probabilities as model.predict_proba on the hstacked
+    features, up to float rounding (~1e-15).
+    """
+
+    def __init__(self, model, *vectorizers):
+        self.vectorizers = [CompactVectorizer.from_vectorizer(v) for v in vectorizers]
+        coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+        self.intercept = float(np.asarray(model.intercept_).ravel()[0])
+        self.classes_ = np.asarray(model.classes_)
+
+        # every term any of the vectorizers knows gets one shared id,
+        # so a document tokenised once can be scored (and explained) from its ids
+        self.term_ids = {}
+        for vectorizer in self.vectorizers:
+            for term in vectorizer.vocabulary:
+                self.term_ids.setdefault(term, len(self.term_ids))
+        self.id_terms = list(self.term_ids)
+
+        # term id -> (coef * idf, idf) per vectorizer
+        self.id_weights = []
+        offset = 0
+        for vectorizer in self.vectorizers:
+            size = len(vectorizer.vocabulary)
+            folded = (coef[offset:offset + size] * vectorizer.idf_).tolist()
+            ids = [self.term_ids[term] for term in vectorizer.vocabulary]
+            self.id_weights.append(dict(zip(ids, zip(folded, vectorizer.idf_.tolist()))))
+            offset += size
+        self.extra_coef = coef[offset:].tolist()
+
+    def tokens(self, texts):
+        """Token lists for one document, one text per vectorizer."""
+        return [v.tokens(text) for v, text in zip(self.vectorizers, texts)]
+
+    def ids(self, tokens, vectorizer_index):
+        """Shared ids of the unigrams/bigrams of a token list that vectorizer vectorizer_index knows."""
+        term_ids = self.term_ids
+        weights = self.id_weights[vectorizer_index]
+        ids = []
+        for term in self.vectorizers[vectorizer_index].terms(tokens):
+            term_id = term_ids.get(term)
+            if term_id is not None and term_id in weights:
+                ids.append(term_id)
+        return ids
+
+    def _contributions(self, vectorizer_index, ids):
+        """{term id: contribution to the decision value} for one vectorizer's part of a document."""
+        vectorizer = self.vectorizers[vectorizer_index]
+        weights = self.id_weights[vectorizer_index]
+        counts = {}
+        for term_id in ids:
+            counts[term_id] = counts.get(term_id, 0) + 1
+
+        contributions = {}
+        norm = 0.0
+        for term_id, count in counts.items():
+            weight, idf = weights[term_id]
+            if vectorizer.sublinear_tf:
+                count = 1.0 + math.log(count)
+            contributions[term_id] = weight * count
+            if vectorizer.norm == "l2":
+                norm += (idf * count) ** 2
+            else:
+                norm += idf * count
+        if vectorizer.norm == "l2":
+            norm = math.sqrt(norm)
+        if vectorizer.norm is not None and norm:
+            for term_id in contributions:
+                contributions[term_id] /= norm
+        return contributions
+
+    def decision_ids(self, id_lists, extra=()):
+        """Decision value from term ids (one list per vectorizer, see ids())."""
+        score = self.intercept
+        for vectorizer_index, ids in enumerate(id_lists):
+            if ids:
+                score += sum(self._contributions(vectorizer_index, ids).values())
+        for coef, value in zip(self.extra_coef, extra):
+            score += coef * value
+        return score
+
+    def explain_ids(self, id_lists, top=5):
+        """The top terms pushing the decision up, as [(term, contribution)], biggest first."""
+        totals = {}
+        for vectorizer_index, ids in enumerate(id_lists):
+            if ids:
+                for term_id, value in self._contributions(vectorizer_index, ids).items():
+                    totals[term_id] = totals.get(term_id, 0.0) + value
+        ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+        return [(self.id_terms[term_id], value) for term_id, value in ranked[:top] if value > 0]
+
+    def decision_tokens(self, token_lists, extra=()):
+        """Decision value from already tokenised texts (one token list per vectorizer)."""
+        return self.decision_ids([self.ids(tokens, i) for i, tokens in enumerate(token_lists)], extra)
+
+    def decision(self, texts, extra=()):
+        return self.decision_tokens(self.tokens(texts), extra)
+
+    def proba(self, texts, extra=()):
+        """Probability of the positive class for one document."""
+        return _expit(self.decision(texts, extra))
+
+    def predict(self, texts, extra=()):
+        return self.classes_[int(self.decision(texts, extra) > 0)]
+
+    def predict_proba_many(self, documents, extras=None):
+        """
+        (n, 2) probabilities like model.predict_proba for a list of documents,
+        each a tuple of texts (one per vectorizer), with extras the matching
+        extra feature tuples (e.g. (keyword_score,)).
+        """
+        extras = extras if extras is not None else [()] * len(documents)
+        prob = np.array([_expit(self.decision(texts, extra)) for texts, extra in zip(documents, extras)])
+        return np.vstack([1 - prob, prob]).T
+
+    def predict_many(self, documents, extras=None):
+        extras = extras if extras is not None else [()] * len(documents)
+        decisions = np.array([self.decision(texts, extra) for texts, extra in zip(documents, extras)])
+        return self.classes_[(decisions > 0).astype(int)]
+
+
+def _expit(x):
+    # 1 / (1 + e^-x) without overflowing for big negative x
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    z = math.exp(x)
+    return z / (1.0 + z)
+
+
+def _check_vectorizer(vectorizer):
+    params = vectorizer.get_params()
+    for name, expected in SUPPORTED_PARAMS.items():
+        if params.get(name) != expected:
+            raise ValueError(f"can't export a vectorizer with {name}={params.get(name)!r}")
+    if params.get("norm") not in ("l1", "l2", None):
+        raise ValueError(f"can't export a vectorizer with norm={params.get('norm')!r}")
+
+
+def _vectorizer_spec(vectorizer):
+    """Everything but the idf needed to rebuild a fitted TfidfVectorizer as a CompactVectorizer."""
+    _check_vectorizer(vectorizer)
+    return {
+        "vocabulary": sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get),
+        "ngram_range": list(vectorizer.ngram_range),
+        "lowercase": vectorizer.lowercase,
+        "token_pattern": vectorizer.token_pattern,
+        "norm": vectorizer.norm,
+        "sublinear_tf": vectorizer.sublinear_tf,
+    }
+
+
+def export(path, model, *vectorizers, sources=()):
+    """
+    Write a fitted binary LogisticRegression and the TfidfVectorizers whose
+    outputs feed it (in hstack order) to path (.npz). Model columns after the
+    vectorizers' are extra numeric features, e.g. the keyword score.
+    sources are the pickles they were loaded from, their sha256 goes in the
+    manifest so model_store.load_pipeline can tell the export is up to date.
+    """
+    from model_store import file_sha256
+
+    manifest = {"format": FORMAT, "version": FORMAT_VERSION, "vectorizers": []}
+    if sources:
+        manifest["sources"] = {os.path.basename(p): file_sha256(p) for p in sources}
+    arrays = {}
+    width = 0
+    for i, vectorizer in enumerate(vectorizers):
+        spec = _vectorizer_spec(vectorizer)
+        width += len(spec["vocabulary"])
+        manifest["vectorizers"].append(spec)
+        arrays[f"idf_{i}"] = np.asarray(vectorizer.idf_, dtype=np.float64)
+
+    coef = np.asarray(model.coef_, dtype=np.float64)
+    if coef.shape[1] < width:
+        raise ValueError(f"model has {coef.shape[1]} features, the vectorizers make {width}")
+    manifest["extra_features"] = coef.shape[1] - width
+    manifest["classes"] = np.asarray(model.classes_).tolist()
+
+    arrays["coef"] = coef
+    arrays["intercept"] = np.asarray(model.intercept_, dtype=np.float64)
+    arrays["manifest"] = np.frombuffer(json.dumps(manifest).encode("utf-8"), dtype=np.uint8)
+
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+    return manifest
+
+
+def _manifest(path, data):
+    manifest = json.loads(data["manifest"].tobytes().decode("utf-8"))
+    if manifest.get("format") != FORMAT or manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} is not a {FORMAT} v{FORMAT_VERSION} model")
+    return manifest
+
+
+def read_manifest(path):
+    """The manifest of a file written by export(), without loading the arrays."""
+    with np.load(path, allow_pickle=False) as data:
+        return _manifest(path, data)
+
+
+def load(path):
+    """(model, vectorizer, ...) from a file written by export(), in the order they were exported."""
+    with np.load(path, allow_pickle=False) as data:
+        manifest = _manifest(path, data)
+        vectorizers = [
+            CompactVectorizer(
+                spec["vocabulary"], data[f"idf_{i}"], ngram_range=spec["ngram_range"],
+                lowercase=spec["lowercase"], token_pattern=spec["token_pattern"],
+                norm=spec["norm"], sublinear_tf=spec["sublinear_tf"],
+            )
+            for i, spec in enumerate(manifest["vectorizers"])
+        ]
+        model = CompactLogisticRegression(data["coef"], data["intercept"], manifest["classes"])
+    return (model, *vectorizers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a trained model + vectorizers to the compact format.")
+    parser.add_argument("model", help="pickled LogisticRegression")
+    parser.add_argument("vectorizers", nargs="+", help="pickled TfidfVectorizers, in the order they're hstacked")
+    parser.add_argument("-o", "--out", required=True, help="output .npz file")
+    args = parser.parse_args()
+
+    import joblib
+
+    manifest = export(
+        args.out, joblib.load(args.model), *(joblib.load(p) for p in args.vectorizers),
+        sources=[args.model, *args.vectorizers],
+    )
+    sizes = " + ".join(str(len(v["vocabulary"])) for v in manifest["vectorizers"])
+    print(f"Exported {args.model} ({sizes} terms + {manifest['extra_features']} extra) -> {args.out}")
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+
+
+class FeedCache:
+    """
+    Remembers the ETag / Last-Modified and a hash of the body for each feed url,
+    so the next poll can send a conditional GET and skip feeds that haven't changed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def request_headers(self, url):
+        """Validator headers to send with the next request for this url."""
+        entry = self.entries.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def is_unchanged(self, url, status_code, body=None, digest=None):
+        """
+        True if the server said 304, or sent back exactly the same body as last time.
+        Pass digest (sha256 hex) instead of body if the body was streamed and hashed on the way.
+        """
+        if status_code == 304:
+            return True
+        entry = self.entries.get(url)
+        if digest is None:
+            digest = hashlib.sha256(body).hexdigest()
+        return entry is not None and entry.get("sha256") == digest
+
+    def remember(self, url, response_headers, body=None, digest=None):
+        """Store the validators and body hash (or its digest) from a fresh response."""
+        self.entries[url] = {
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "sha256": digest if digest is not None else hashlib.sha256(body).hexdigest(),
+        }
+
+    def forget(self, url):
+        """Drop a url, e.g. when its body couldn't be parsed, so it is fetched in full next time."""
+        self.entries.pop(url, None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,71 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+
+# how many requests we allow to the same host at once, and how long one feed gets
+PER_HOST_LIMIT = 2
+FEED_TIMEOUT = 15
+
+
+async def _fetch_one(url, headers, timeout, host_limits, cache, executor):
+    """Fetch a single feed in a worker thread, limited per host."""
+    request_headers = dict(headers or {})
+    if cache is not None:
+        request_headers.update(cache.request_headers(url))
+
+    host = urlparse(url).netloc
+    async with host_limits[host]:
+        # requests is blocking so run it off the event loop, wait_for makes sure
+        # one slow feed can't hold up the rest (requests' own timeout is per
+        # socket read, a feed that keeps trickling bytes never hits it)
+        get = functools.partial(requests.get, url, headers=request_headers, timeout=(timeout, timeout))
+        resp = await asyncio.wait_for(
+            asyncio.get_running_loop().run_in_executor(executor, get),
+            timeout=timeout,
+        )
+
+    if cache is not None and resp.status_code == 304:
+        return None
+    resp.raise_for_status()
+
+    if cache is not None:
+        unchanged = cache.is_unchanged(url, resp.status_code, resp.content)
+        # always keep the newest validators, even when the body is the same
+        cache.remember(url, resp.headers, resp.content)
+        if unchanged:
+            return None
+    return resp.content
+
+
+async def _fetch_all(urls, headers, timeout, per_host_limit, cache):
+    host_limits = {}
+    for url in urls:
+        host_limits.setdefault(urlparse(url).netloc, asyncio.Semaphore(per_host_limit))
+
+    # our own pool rather than the loop's default one: asyncio.run waits for the
+    # default pool's threads on the way out, so a timed out request would still
+    # hold up the run. This one is left to finish (or time out) in the background.
+    executor = ThreadPoolExecutor(max_workers=len(urls))
+    try:
+        tasks = [_fetch_one(url, headers, timeout, host_limits, cache, executor) for url in urls]
+        # return_exceptions so a failed feed doesn't cancel the others
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return dict(zip(urls, results))
+
+
+def fetch_feeds(urls, headers=None, timeout=FEED_TIMEOUT, per_host_limit=PER_HOST_LIMIT, cache=None):
+    """
+    Fetch all the feed urls at the same time.
+    Returns a dict of url -> body bytes, or url -> exception if that feed failed,
+    so the caller still gets the feeds that worked.
+    If a FeedCache is passed, requests are conditional and feeds that haven't
+    changed since the last poll come back as None.
+    """
+    if not urls:
+        return {}
+    return asyncio.run(_fetch_all(list(urls), headers, timeout, per_host_limit, cache))
@@ -0,0 +1,178 @@
+import hashlib
+import re
+from collections import OrderedDict
+from html.entities import html5
+from html.parser import HTMLParser
+
+# RSS descriptions come through as small bits of HTML (<p>...</p>, entities).
+# This turns them into the same text BeautifulSoup(html, "html.parser")
+# .get_text(strip=True) gives - every text node stripped and joined with "",
+# script / style / template / rt / rp contents and comments dropped, entities
+# decoded the way bs4 decodes them - without building a tree, and stops
+# parsing once it has max_chars of text. Results are kept in a small LRU
+# keyed by a hash of the html, since the same descriptions come round again
+# (other feeds, the HubSpot / Notion payloads).
+
+# text inside these isn't part of get_text()
+SKIPPED_CONTAINERS = {"script", "style", "template", "rt", "rp"}
+# tags bs4 closes as soon as they're opened
+VOID_TAGS = {
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed", "frame", "hr", "image", "img",
+    "input", "isindex", "keygen", "link", "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr",
+}
+CACHE_SIZE = 4096
+
+_ENTITIES = {name[:-1]: value for name, value in html5.items() if name.endswith(";")}
+_DECIMAL_REFERENCE = re.compile("^([0-9]+)(.*)")
+_HEX_REFERENCE = re.compile("^([0-9a-f]+)(.*)")
+
+_cache = OrderedDict()
+
+
+def _numeric_reference(code):
+    """Character for &#code; the way bs4 (and the HTML spec) resolve it."""
+    if code == 0 or code > 0x10FFFF or 0xD800 <= code <= 0xDFFF:
+        return "�"
+    if 0x80 <= code <= 0x9F:
+        # references written with their Windows-1252 byte
+        try:
+            return bytes([code]).decode("cp1252")
+        except UnicodeDecodeError:
+            pass
+    return chr(code)
+
+
+class _Full(Exception):
+    """Raised by the parser once it has max_chars of text, the rest isn't parsed."""
+
+
+class _TextExtractor(HTMLParser):
+
+    def __init__(self, max_chars=None):
+        # charrefs are decoded by hand below, the same way bs4 does it
+        super().__init__(convert_charrefs=False)
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+        self._data = []
+        # open tags, closed the way bs4 closes them, and how many of them are SKIPPED_CONTAINERS
+        self._open = []
+        self._containers = 0
+        # void tags that were opened as <br>, so a later </br> is ignored
+        self._closed_void = []
+
+    def _add(self, text):
+        text = text.strip()
+        if text:
+            self.parts.append(text)
+            self.length += len(text)
+            if self.max_chars is not None and self.length >= self.max_chars:
+                raise _Full
+
+    def _end_data(self):
+        # consecutive data (text + entities) between two tags is one text node
+        if self._data:
+            text = "".join(self._data)
+            self._data = []
+            if not self._containers:
+                self._add(text)
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_entityref(self, name):
+        self._data.append(_ENTITIES.get(name, "&" + name))
+
+    def handle_charref(self, name):
+        base, pattern = 10, _DECIMAL_REFERENCE
+        if name[:1] in ("x", "X"):
+            name, base, pattern = name[1:], 16, _HEX_REFERENCE
+        extra = ""
+        try:
+            code = int(name, base)
+        except ValueError:
+            # not terminated by a ;, the number is the reference and the rest is text
+            match = pattern.search(name)
+            if match is None:
+                self._data.append(name)
+                return
+            code, extra = int(match.group(1), base), match.group(2)
+        self._data.append(_numeric_reference(code))
+        if extra:
+            self._data.append(extra)
+
+    def handle_starttag(self, tag, attrs):
+        self._end_data()
+        if tag in VOID_TAGS:
+            self._closed_void.append(tag)
+            return
+        self._open.append(tag)
+        if tag in SKIPPED_CONTAINERS:
+            self._containers += 1
+
+    def handle_startendtag(self, tag, attrs):
+        # <tag/> is opened and closed straight away, nothing to track
+        self._end_data()
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_void:
+            # bs4 ignores it completely, the text either side stays one node
+            self._closed_void.remove(tag)
+            return
+        self._end_data()
+        # closes everything opened since the most recent <tag>, if there is one
+        if tag in self._open:
+            while True:
+                closed = self._open.pop()
+                if closed in SKIPPED_CONTAINERS:
+                    self._containers -= 1
+                if closed == tag:
+                    break
+
+    def handle_comment(self, data):
+        self._end_data()
+
+    def handle_decl(self, decl):
+        self._end_data()
+
+    def handle_pi(self, data):
+        self._end_data()
+
+    def unknown_decl(self, data):
+        self._end_data()
+        # CDATA blocks are text, other declarations aren't
+        if data.upper().startswith("CDATA["):
+            self._add(data[len("CDATA["):])
+
+    def close(self):
+        super().close()
+        self._end_data()
+
+
+def html_to_text(html, max_chars=None):
+    """
+    Plain text of an html fragment, same as
+    BeautifulSoup(html, "html.parser").get_text(strip=True)[:max_chars].
+    """
+    if not html:
+        return ""
+    key = (hashlib.blake2b(html.encode("utf-8", "surrogatepass"), digest_size=16).digest(), max_chars)
+    text = _cache.get(key)
+    if text is not None:
+        _cache.move_to_end(key)
+        return text
+
+    parser = _TextExtractor(max_chars)
+    try:
+        parser.feed(html)
+        parser.close()
+    except _Full:
+        pass
+    text = "".join(parser.parts)
+    if max_chars is not None:
+        text = text[:max_chars]
+
+    _cache[key] = text
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return text
@@ -0,0 +1,123 @@
+from collections import deque
+
+import numpy as np
+
+from keywords_file import keywords
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick matcher for a weighted keyword dict.
+    Compiled once into a full state machine (every state has a transition for
+    every character in the keywords), then one pass over the text finds every
+    keyword, so the cost no longer grows with the number of keywords.
+
+    Matching is plain substring matching like `keyword in text`.
+    Keywords are matched as written, callers lower-case the text.
+    """
+
+    def __init__(self, keyword_weights):
+        self.weights = dict(keyword_weights)
+        # keywords are numbered in dict order, which is also the column order for batches
+        self.vocabulary = list(self.weights)
+        self.weight_vector = np.array([self.weights[k] for k in self.vocabulary])
+        self._build()
+
+    def _build(self):
+        goto = [{}]
+        outputs = [[]]
+        for keyword_id, keyword in enumerate(self.vocabulary):
+            state = 0
+            for ch in keyword:
+                if ch not in goto[state]:
+                    goto.append({})
+                    outputs.append([])
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            outputs[state].append(keyword_id)
+
+        # breadth first: fail links, then full transitions from the parent's fail state
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0) if state else 0
+                outputs[child] = outputs[child] + outputs[fail[child]]
+                queue.append(child)
+
+        self._delta = delta
+        self._outputs = [tuple(out) for out in outputs]
+
+    def find_ids(self, text):
+        """Set of keyword ids (vocabulary positions) that appear in text."""
+        delta = self._delta
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def find_first(self, text):
+        """The first keyword found in text, or None. Stops scanning as soon as one matches."""
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                return self.vocabulary[outputs[state][0]]
+        return None
+
+    def find(self, text):
+        """All the keywords that appear in text, in keyword dict order."""
+        return [self.vocabulary[i] for i in sorted(self.find_ids(text))]
+
+    def score(self, text):
+        """(total weight, matched keywords) for text."""
+        matched = self.find(text)
+        return sum(self.weights[keyword] for keyword in matched), matched
+
+    def hit_matrix(self, texts):
+        """
+        Sparse (texts x keywords) matrix with a 1 wherever a keyword appears in a text.
+        """
+        # scipy is only imported once there's a batch to score
+        from scipy.sparse import csr_matrix
+
+        indptr = [0]
+        indices = []
+        for text in texts:
+            indices.extend(self.find_ids(text))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=self.weight_vector.dtype)
+        return csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(self.vocabulary)))
+
+    def batch_scores(self, texts, return_hits=False):
+        """
+        Scores for a whole batch of texts as one sparse matrix x weight vector product.
+        With return_hits=True also returns the hit matrix (columns follow self.vocabulary).
+        """
+        hits = self.hit_matrix(texts)
+        scores = hits @ self.weight_vector
+        return (scores, hits) if return_hits else scores
+
+
+def tender_text(tender):
+    """Lower-cased title + description, the text keyword scores are calculated on."""
+    return (tender.get('title', '') + " " + tender.get('description', '')).lower()
+
+
+# shared matcher for keywords_file.keywords, compiled once on import
+keyword_matcher = KeywordMatcher(keywords)
+
+
+def batch_keyword_scores(tenders, matcher=keyword_matcher, return_hits=False):
+    """Keyword scores for a list of tender dicts, see KeywordMatcher.batch_scores."""
+    return matcher.batch_scores([tender_text(t) for t in tenders], return_hits=return_hits)
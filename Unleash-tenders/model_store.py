@@ -0,0 +1,88 @@
+import hashlib
+import os
+
+# Models and vectorisers are only loaded when there is something to score, and
+# from a copy saved in joblib's uncompressed format, so their numpy arrays are
+# memory-mapped (mmap_mode="r") instead of copied into each process. Workers
+# loading the same artifact share one physical copy of those pages.
+# joblib / sklearn are imported in here, not at the top of the entry points,
+# so a run with nothing new never pays for them.
+
+MMAP_SUFFIX = ".joblib"
+# the copies are run output, they go with the logs / seen store, not next to the tracked .pkl files
+CACHE_DIR = os.path.join("TenderAusAgent_logs", "model_cache")
+
+
+def file_sha256(path):
+    """sha256 (hex) of a file's contents, what the copies made from an artifact record about it."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def mmap_path(path):
+    """
+    Where the memory-mappable copy of an artifact lives:
+    model.pkl -> TenderAusAgent_logs/model_cache/model.joblib (next to model.pkl's directory)
+    """
+    directory, name = os.path.split(path)
+    return os.path.join(directory, CACHE_DIR, os.path.splitext(name)[0] + MMAP_SUFFIX)
+
+
+def load_artifact(path, mmap_mode="r"):
+    """
+    Load a pickled model or vectoriser. The first time (or after the .pkl is
+    retrained) it is re-saved as <name>.joblib under CACHE_DIR, with the
+    sha256 of the .pkl next to it (<name>.joblib.sha256); after that, while
+    the hash still matches, the .joblib copy is loaded with its arrays
+    memory-mapped. File times aren't used, a checkout or touch changes them.
+    """
+    import joblib
+
+    copy_path = mmap_path(path)
+    hash_path = copy_path + ".sha256"
+    source_hash = file_sha256(path)
+    try:
+        with open(hash_path, "r", encoding="utf-8") as f:
+            up_to_date = f.read().strip() == source_hash and os.path.exists(copy_path)
+    except FileNotFoundError:
+        up_to_date = False
+    if up_to_date:
+        return joblib.load(copy_path, mmap_mode=mmap_mode)
+
+    artifact = joblib.load(path)
+    try:
+        os.makedirs(os.path.dirname(copy_path), exist_ok=True)
+        joblib.dump(artifact, copy_path + ".tmp")
+        os.replace(copy_path + ".tmp", copy_path)
+        # written after the copy, so a copy without a matching hash is just made again
+        with open(hash_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(source_hash)
+        os.replace(hash_path + ".tmp", hash_path)
+    except OSError:
+        # can't write the copy, just use what we loaded
+        return artifact
+    return joblib.load(copy_path, mmap_mode=mmap_mode)
+
+
+def load_pipeline(paths, compact_path=None):
+    """
+    Load (model, vectorizer, ...) from the pickles in paths, or from
+    compact_path (see compact_model.py) if it was exported from these same
+    pickles (their sha256 is in its manifest), in which case sklearn isn't
+    needed at all. File times aren't used, a checkout doesn't keep them.
+    """
+    if compact_path and os.path.exists(compact_path):
+        from compact_model import load, read_manifest
+
+        sources = read_manifest(compact_path).get("sources") or {}
+        stale = [
+            p for p in paths
+            if os.path.exists(p) and sources and sources.get(os.path.basename(p)) != file_sha256(p)
+        ]
+        if not stale:
+            return load(compact_path)
+        print(f"{compact_path} was exported from other versions of {', '.join(stale)}, loading the pickles instead")
+    return tuple(load_artifact(p) for p in paths)
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+
+import numpy as np
+
+# The same tender turns up in the AusTender RSS feed, TenderInfo and the detail
+# crawl under different URLs with slightly different titles. Exact URL matching
+# misses those, so we keep a MinHash signature of the normalised title +
+# description for recent tenders, and use LSH banding to find likely matches
+# without comparing against every tender in the history.
+
+DEFAULT_PATH = os.path.join("TenderAusAgent_logs", "seen.db")
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+# estimated Jaccard similarity above which two tenders are the same opportunity
+THRESHOLD = 0.7
+# only compare against tenders seen in the last RECENT_DAYS
+RECENT_DAYS = 90
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# fixed seed so signatures stay comparable between runs
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, _MAX_HASH, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, _MAX_HASH, size=NUM_PERM, dtype=np.uint64)
+
+TAG_RE = re.compile(r"<[^>]+>")
+WORD_RE = re.compile(r"\w+")
+
+
+def shingles(title, description):
+    """Word 3-grams of the lower-cased title + description, with any html tags dropped."""
+    text = TAG_RE.sub(" ", f"{title or ''} {description or ''}").lower()
+    words = WORD_RE.findall(text)
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    """MinHash signature (NUM_PERM uint32s) of a set of shingles."""
+    if not shingle_set:
+        return np.full(NUM_PERM, _MAX_HASH, dtype=np.uint32)
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingle_set],
+        dtype=np.uint64,
+    )
+    # a * h + b fits in 64 bits because a and h are both < 2^32
+    permuted = (np.outer(hashes, _A) + _B) % _PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_buckets(signature):
+    """One bucket id per band, tenders sharing any bucket are candidates."""
+    return [
+        hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).digest()
+        for band in range(BANDS)
+    ]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(sig_a == sig_b))
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index of recent tenders, kept in the same SQLite file as the seen store."""
+
+    def __init__(self, path=DEFAULT_PATH, threshold=THRESHOLD, recent_days=RECENT_DAYS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.threshold = threshold
+        self.recent_days = recent_days
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS minhash (key TEXT PRIMARY KEY, added REAL, signature BLOB) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS lsh (band INTEGER, bucket BLOB, key TEXT)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS lsh_bucket ON lsh (band, bucket)")
+        # so prune only touches the expired rows
+        self.conn.execute("CREATE INDEX IF NOT EXISTS lsh_key ON lsh (key)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS minhash_added ON minhash (added)")
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def find(self, title, description, signature=None, exclude_key=None):
+        """
+        Look for a recent tender that is near enough the same text.
+        Returns (key, similarity) of the closest one, or None.
+        exclude_key stops a tender matching itself if it was indexed before.
+        """
+        if signature is None:
+            signature = minhash(shingles(title, description))
+
+        candidates = set()
+        for band, bucket in enumerate(band_buckets(signature)):
+            rows = self.conn.execute("SELECT key FROM lsh WHERE band = ? AND bucket = ?", (band, bucket))
+            candidates.update(key for (key,) in rows)
+        candidates.discard(exclude_key)
+        if not candidates:
+            return None
+
+        cutoff = time.time() - self.recent_days * 24 * 60 * 60
+        best = None
+        for key in candidates:
+            row = self.conn.execute(
+                "SELECT signature FROM minhash WHERE key = ? AND added >= ?", (key, cutoff)
+            ).fetchone()
+            if row is None:
+                continue
+            score = similarity(signature, np.frombuffer(row[0], dtype=np.uint32))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+
+    def add(self, key, title, description, signature=None):
+        """
+        Index a tender under key (its URL, normally). Whatever was indexed under
+        the key before is replaced, so an amended tender is matched on its new text.
+        """
+        if signature is None:
+            signature = minhash(shingles(title, description))
+        with self.conn:
+            self.conn.execute("DELETE FROM lsh WHERE key = ?", (key,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO minhash (key, added, signature) VALUES (?, ?, ?)",
+                (key, time.time(), signature.tobytes()),
+            )
+            self.conn.executemany(
+                "INSERT INTO lsh (band, bucket, key) VALUES (?, ?, ?)",
+                [(band, bucket, key) for band, bucket in enumerate(band_buckets(signature))],
+            )
+
+    def check_and_add(self, key, title, description):
+        """
+        Returns the (key, similarity) this tender duplicates, or None if it's new,
+        in which case it is added to the index.
+        """
+        signature = minhash(shingles(title, description))
+        duplicate = self.find(title, description, signature=signature, exclude_key=key)
+        if duplicate is None:
+            self.add(key, title, description, signature=signature)
+        return duplicate
+
+    def prune(self):
+        """Drop tenders older than recent_days, they're never matched against anyway."""
+        cutoff = time.time() - self.recent_days * 24 * 60 * 60
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM lsh WHERE key IN (SELECT key FROM minhash WHERE added < ?)", (cutoff,)
+            )
+            self.conn.execute("DELETE FROM minhash WHERE added < ?", (cutoff,))
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+# The same tenders come through again and again (re-published RSS items,
+# TenderInfo "Live" vs "New", backfills), and each time they'd be analysed and
+# scored from scratch. This keeps the model's decision for each one, keyed by
+# (fingerprint of the text the model reads, fingerprint of the model files,
+# fingerprint of the keyword profile), so retraining the model or changing the
+# keywords means the old entries just stop matching. Recent entries are kept
+# in memory (LRU), everything is written to a table in the seen store's
+# SQLite file, which is what makes it last between runs.
+
+DEFAULT_PATH = os.path.join("TenderAusAgent_logs", "seen.db")
+
+# decisions kept in memory, the least recently used go to disk only
+MEMORY_SIZE = 10_000
+# sqlite has a limit on how many ? parameters one query can take
+BATCH_SIZE = 500
+# entries not used for this long are dropped by prune (old models' entries end up here)
+MAX_AGE_DAYS = 180
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_fingerprint(paths):
+    """Fingerprint of the contents of the files in paths (ones that don't exist are skipped)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        digest.update(os.path.basename(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def keywords_fingerprint(keywords):
+    """Fingerprint of a weighted keyword dict, the same whatever order it's written in."""
+    return _digest(json.dumps(keywords, sort_keys=True).encode("utf-8"))
+
+
+def _batches(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class PredictionCache:
+    """
+    Model decisions for one (model, keyword profile) pair, keyed by
+    text fingerprint (see TenderAnalyzer.fingerprint).
+    New decisions are held until flush / close (or until there are
+    memory_size of them) and written in one transaction.
+    """
+
+    def __init__(self, model_hash, profile_hash, path=DEFAULT_PATH, memory_size=MEMORY_SIZE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.model_hash = model_hash
+        self.profile_hash = profile_hash
+        self.memory_size = memory_size
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        # decisions not written to disk yet
+        self._pending = {}
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS predictions (
+                   text_hash TEXT,
+                   model_hash TEXT,
+                   profile_hash TEXT,
+                   decision REAL,
+                   last_used REAL,
+                   PRIMARY KEY (text_hash, model_hash, profile_hash)
+               ) WITHOUT ROWID"""
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)")
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def _remember(self, key, decision):
+        self._memory[key] = decision
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """{key: decision} for the keys we have a decision for."""
+        found = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[key] = self._memory[key]
+            elif key in self._pending:
+                found[key] = self._pending[key]
+            else:
+                missing.append(key)
+
+        now = time.time()
+        for batch in _batches(missing):
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"""SELECT text_hash, decision FROM predictions
+                    WHERE model_hash = ? AND profile_hash = ? AND text_hash IN ({placeholders})""",
+                [self.model_hash, self.profile_hash, *batch],
+            ).fetchall()
+            with self.conn:
+                # keep the ones still in use from being pruned
+                self.conn.executemany(
+                    "UPDATE predictions SET last_used = ? WHERE text_hash = ? AND model_hash = ? AND profile_hash = ?",
+                    [(now, key, self.model_hash, self.profile_hash) for key, _ in rows],
+                )
+            for key, decision in rows:
+                found[key] = decision
+                self._remember(key, decision)
+        return found
+
+    def put_many(self, decisions):
+        """Add {key: decision}, written to disk on the next flush."""
+        for key, decision in decisions.items():
+            decision = float(decision)
+            self._pending[key] = decision
+            self._remember(key, decision)
+        if len(self._pending) >= self.memory_size:
+            self.flush()
+
+    def decisions(self, keys, compute):
+        """
+        Decision for each key, in order. compute(indices) is called once with
+        the positions of the keys we don't have and returns their decisions.
+        """
+        found = self.get_many(keys)
+        missing = [i for i, key in enumerate(keys) if key not in found]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            fresh = dict(zip((keys[i] for i in missing), compute(missing)))
+            self.put_many(fresh)
+            found.update(fresh)
+        return [found[key] for key in keys]
+
+    def flush(self):
+        if not self._pending:
+            return
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                """INSERT OR REPLACE INTO predictions (text_hash, model_hash, profile_hash, decision, last_used)
+                   VALUES (?, ?, ?, ?, ?)""",
+                [(key, self.model_hash, self.profile_hash, decision, now) for key, decision in self._pending.items()],
+            )
+        self._pending = {}
+
+    def prune(self, max_age_days=MAX_AGE_DAYS):
+        """Drop entries (for any model) that haven't been used in max_age_days. Returns how many."""
+        cutoff = time.time() - max_age_days * 24 * 60 * 60
+        with self.conn:
+            return self.conn.execute("DELETE FROM predictions WHERE last_used < ?", (cutoff,)).rowcount
@@ -1,13 +1,18 @@
-import json
-import pickle
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import pandas as pd
-from scipy.sparse import hstack, csr_matrix
 from dotenv import load_dotenv
 import requests
-import xml.etree.ElementTree as ET
-from keywords_file import keywords
+from keyword_matcher import keyword_matcher
+from profiles import profile_registry
+from seen_store import SeenStore, content_hash, normalise_key, field_hashes, NEW, UNCHANGED, AMENDED
+from near_dup import NearDuplicateIndex
+from model_store import load_pipeline
+from compact_model import LinearScorer
+from text_analysis import TenderAnalyzer
+from prediction_cache import PredictionCache, file_fingerprint, keywords_fingerprint
+from cascade import Cascade, MODEL
 
 load_dotenv()
 HUBSPOT_TOKEN = os.getenv("HUBSPOT_TOKEN")
@@ -15,100 +20,212 @@ TENDERINFO_API_URL = "https://tenderdetailapi.tendersinfo.net/api/BOQ/GetMyTende
 ORIGIN_HEADER = "unleashlive.com"
 SUBNO_PARAM = 329595
 
+# paging through the TenderInfo API
+PAGE_SIZE = 100
+MIN_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 500
+MAX_PARALLEL_PAGES = 4
+# pages faster than this grow, slower ones shrink
+TARGET_PAGE_SECONDS = 2.0
+REQUEST_TIMEOUT = 30
+
 NOTION_TOKEN = os.getenv("NOTION_TOKEN", "").strip()
 NOTION_DB_ID = os.getenv("NOTION_DB_ID").strip()
 
 OUTPUT_DIR = "TenderAusAgent_logs"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# old seen file, only read once to import it into the seen store
 LOCAL_SEEN_TENDERS = os.path.join(OUTPUT_DIR, "seen_tenders.json")
+SEEN_STORE_FILE = os.path.join(OUTPUT_DIR, "seen.db")
+SEEN_BLOOM_FILE = os.path.join(OUTPUT_DIR, "seen.bloom")
 
-COUNTRY_NAMES = ["australia, united kingdom, united states of america, united states, usa", "england", "wales"]
+# model, desc vectorizer, other vectorizer
+MODEL_FILES = ('model.pkl', 'desc_vectorizer.pkl', 'other_vectorizer.pkl')
+# sklearn-free export of the three, used when it was made from these pickles (python compact_model.py ... -o model.npz)
+COMPACT_MODEL_FILE = 'model.npz'
 
+# the keyword profile the ML model was trained on
+MODEL_PROFILE = "unleash"
 
-def load_seen_tenders():
-    """load previously seen tenders"""
-    if os.path.exists(LOCAL_SEEN_TENDERS):
-        with open(LOCAL_SEEN_TENDERS, "r", encoding="utf-8") as f:
-            return json.load(f)
-    
-    return []
+# fields we watch for amendments once a tender is in the seen store
+AMENDMENT_FIELDS = ("title", "description", "value")
+
+
+def open_prediction_cache():
+    """
+    Cache of the model's decisions for this model and keyword profile,
+    anything left over from older models or keywords is pruned after a while.
+    """
+    cache = PredictionCache(
+        model_hash=file_fingerprint(MODEL_FILES + (COMPACT_MODEL_FILE,)),
+        profile_hash=keywords_fingerprint(profile_registry[MODEL_PROFILE].keywords),
+        path=SEEN_STORE_FILE,
+    )
+    cache.prune()
+    return cache
+
+
+def open_seen_store():
+    """Open the shared seen store, importing the old seen_tenders.json the first time
+    and compacting it every so often."""
+    seen_store = SeenStore(SEEN_STORE_FILE, bloom_path=SEEN_BLOOM_FILE)
+    if seen_store.migrate_legacy_file(LOCAL_SEEN_TENDERS, source="tenderinfo"):
+        print(f"Imported {LOCAL_SEEN_TENDERS} into the seen store.")
+    if seen_store.maybe_compact():
+        print("Compacted the seen store.")
+    return seen_store
 
-def save_seen_tenders(tenders):
-    """save tenders to local file"""
-    with open(LOCAL_SEEN_TENDERS, "w", encoding="utf-8") as f:
-        json.dump(tenders, f, indent=2, ensure_ascii=False)
-    
 
-def filter_new_tenders(fetched_tenders, seen_tenders):
+def tender_key(tender):
+    """The key we dedupe on, URL or title (if no URL), normalised."""
+    return normalise_key(tender.get("url") or tender.get("title"))
+
+
+def seen_record(tender):
+    """(key, content hash, field hashes), what the seen store keeps for a tender."""
+    return (
+        tender_key(tender),
+        content_hash(tender.get("title", ""), tender.get("description", "")),
+        field_hashes(tender, AMENDMENT_FIELDS),
+    )
+
+
+def classify_tenders(fetched_tenders, seen_store):
     """Compare new tenders to old tenders in 
-    the seen file and return only the new ones. 
+    the seen store and return (new ones, amended ones), each amended
+    tender with the fields that changed under "amended_fields".
     Comparison based on URL or title (if no URL)"""
-    seen_keys = set()
-
-    for t in seen_tenders:
-        key = t.get("url") or t.get("title")
-        if key:
-            seen_keys.add(key.strip().lower())
-    
-    new_tenders = []
-    for t in fetched_tenders:
-        key = t.get("url") or t.get("title")
-        if key and key.strip().lower() not in seen_keys:
+    keys = [tender_key(t) for t in fetched_tenders]
+    status = seen_store.classify_many(
+        [(key, field_hashes(t, AMENDMENT_FIELDS)) for t, key in zip(fetched_tenders, keys) if key]
+    )
+
+    new_tenders, amended_tenders = [], []
+    done = set()
+    for t, key in zip(fetched_tenders, keys):
+        # the same tender can come back twice in one fetch
+        if not key or key in done:
+            continue
+        done.add(key)
+        kind, changed = status[key]
+        if kind == NEW:
             new_tenders.append(t)
-        
-    return new_tenders
+        elif kind == AMENDED:
+            amended_tenders.append(dict(t, amended_fields=changed))
 
+    return new_tenders, amended_tenders
 
 
-def calculate_keyword_scores(tender):
+
+def drop_near_duplicates(tenders, near_dups):
     """
-    Calculates a score based on the predefined, weighted keyword dictionary.
+    Split out tenders that are the same opportunity as one we've recently matched
+    (e.g. already posted from the AusTender RSS feed under another URL).
+    Nothing is indexed here, only tenders that end up matched are (see index_match).
+    Returns (unique tenders, duplicates).
     """
-    score = 0
-    # combine the text and dictionary
-    text = (tender.get('title', '') + " " + tender.get('description', '')).lower()
+    unique, duplicates = [], []
+    for t in tenders:
+        duplicate = near_dups.find(t.get("title", ""), t.get("description", ""), exclude_key=tender_key(t))
+        if duplicate:
+            print(f"Near-duplicate: {t.get('title')} ~ {duplicate[0]} ({duplicate[1]:.2f})")
+            duplicates.append(t)
+        else:
+            unique.append(t)
+    return unique, duplicates
 
-    for keyword, weight in keywords.items():
-        if keyword in text:
-            score += weight
 
-    return score
+def index_match(tender, near_dups):
+    """
+    Index a matched tender so its copies from other sources are dropped.
+    Returns the (key, similarity) of an earlier match it duplicates (another copy
+    in this same run), or None. Amended tenders are always re-indexed, never dropped.
+    """
+    if "amended_fields" in tender:
+        near_dups.add(tender_key(tender), tender.get("title", ""), tender.get("description", ""))
+        return None
+    return near_dups.check_and_add(tender_key(tender), tender.get("title", ""), tender.get("description", ""))
+
+
+def description_text(tender):
+    return tender.get('description', '')
 
 
-def predict_relevance(new_tenders, model, desc_vectorizer, other_vectorizer):
+def category_agency_text(tender):
+    return tender.get('category', '') + " " + tender.get('agency', '')
+
+
+def model_analyzer(model=None, desc_vectorizer=None, other_vectorizer=None):
     """
-    Uses the trained model to predict relevance.
+    The analysis pass for this model: each tender is lower-cased and tokenised
+    once, and the keyword scores, the cache key, both vectorizers and the
+    explanations reuse it. Without the model it only does the lower-casing
+    (enough for the keyword scores), the model is added with use_scorer.
     """
-    # Vectoriser has already been fitted so to our vocab
-    # so use .transform() not .fit_transform()
-    new_descriptions = [tender.get('description', '') for tender in new_tenders]
-    new_categories_agencies = [tender.get('category', '') + " " + tender.get('agency', '') for tender in new_tenders]
+    analyzer = TenderAnalyzer((description_text, category_agency_text))
+    if model is not None:
+        analyzer.use_scorer(LinearScorer(model, desc_vectorizer, other_vectorizer))
+    return analyzer
 
-    new_keyword_scores = [calculate_keyword_scores(tender) for tender in new_tenders]
-    new_X_keyword = csr_matrix(np.array(new_keyword_scores)).T
 
-    new_X_desc = desc_vectorizer.transform(new_descriptions)
-    new_X_other = other_vectorizer.transform(new_categories_agencies)
+def predict_relevance(new_tenders, model, desc_vectorizer, other_vectorizer, keyword_scores=None,
+                      analyzer=None, analyses=None, cache=None):
+    """
+    Uses the trained model to predict relevance.
+    Pass keyword_scores if they've already been worked out for these tenders,
+    and analyzer / analyses if they've already been through model_analyzer.
+    With a cache (open_prediction_cache) only tenders it hasn't seen are tokenised and scored.
+    """
+    if analyzer is None:
+        analyzer = model_analyzer(model, desc_vectorizer, other_vectorizer)
+    elif analyzer.scorer is None:
+        analyzer.use_scorer(LinearScorer(model, desc_vectorizer, other_vectorizer))
+    if analyses is None:
+        analyses = analyzer.analyse_many(new_tenders)
+
+    # score the whole batch in one go
+    if keyword_scores is None:
+        keyword_scores = keyword_matcher.batch_scores([a.keyword_text for a in analyses])
+    extras = [(float(score),) for score in keyword_scores]
+
+    def decide(indices):
+        # the model is linear, so each tender is scored straight from its term ids
+        # (coef x idf folded per term) instead of building and hstacking tf-idf matrices
+        return [analyzer.decision(analyses[i], extras[i]) for i in indices]
+
+    if cache is None:
+        decisions = decide(range(len(new_tenders)))
+    else:
+        keys = [analyzer.fingerprint(analysis, extra) for analysis, extra in zip(analyses, extras)]
+        decisions = cache.decisions(keys, decide)
+    predictions = analyzer.scorer.classes_[(np.array(decisions) > 0).astype(int)]
 
-    # combine the data
-    new_X_combined = hstack([new_X_desc, new_X_other, new_X_keyword])
+    return predictions
 
-    predictions = model.predict(new_X_combined)
 
-    return predictions
+_session = None
 
 
-def fetch_new_tenders(from_index=0, to_index=100, tender_type="Live"):
-    """fetches new tenders from TenderInfo API."""
+def get_session():
+    """One keep-alive session shared by every TenderInfo request."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_PARALLEL_PAGES)
+        _session.mount("https://", adapter)
+        _session.headers.update({
+            "Origin": ORIGIN_HEADER,
+            "Content-Type": "application/json"
+        })
+    return _session
 
-    # define the POST request
-    # Headers
-    headers = {
-        "Origin": ORIGIN_HEADER,
-        "Content-Type": "application/json"
-    }
 
+def fetch_tender_page(from_index, to_index, tender_type="Live"):
+    """
+    POST one page window to the TenderInfo API.
+    Returns (tenders, seconds taken), raises on request errors.
+    """
     # request params
     params = {
         "subno": SUBNO_PARAM
@@ -121,33 +238,98 @@ def fetch_new_tenders(from_index=0, to_index=100, tender_type="Live"):
         "Type": tender_type
     }
 
-    print(f"Fetching tenders from index {from_index} to {to_index}")
+    start = time.perf_counter()
+    response = get_session().post(
+        TENDERINFO_API_URL,
+        params=params,
+        json=body,
+        timeout=REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+    data = response.json()
+    elapsed = time.perf_counter() - start
 
-    try:
-        # send the POST request
-        response = requests.post(
-            TENDERINFO_API_URL,
-            headers=headers,
-            params=params,
-            json=body
-        )
-        response.raise_for_status()
-
-        data = response.json()
-
-        print(json.dumps(data, indent=2))
-
-        # extract the tenders
-        if data.get("isSuccess") and "TENDERS" in data.get("Data", {}):
-            print(f"Successful: {len(data['Data']['TENDERS'])} tenders fetched.")
-            return data["Data"]["TENDERS"]
+    # extract the tenders
+    if data.get("isSuccess") and "TENDERS" in data.get("Data", {}):
+        return data["Data"]["TENDERS"], elapsed
+    return [], elapsed
 
-        print("API reported successfully but no Tenders data found.")
-        return []
 
-    except requests.exceptions.RequestException as e:
-        print(f"Error: {e}")
-        return []
+def fetch_all_tenders(tender_type="Live", seen_store=None, page_size=PAGE_SIZE):
+    """
+    Pages through the TenderInfo API, a few page windows at a time in parallel.
+    Stops at the first empty page, or as soon as a page is made up entirely of
+    tenders we've already seen and that haven't been amended since. The page
+    size grows or shrinks with how long the pages take to come back, but never
+    past the most rows the API has sent back for one request.
+    """
+    all_tenders = []
+    fetched_keys = set()
+    from_index = 0
+    # the most rows the API has been seen to send back for one request
+    page_cap = MAX_PAGE_SIZE
+
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_PAGES) as pool:
+        while True:
+            windows = [(from_index + i * page_size, from_index + (i + 1) * page_size)
+                       for i in range(MAX_PARALLEL_PAGES)]
+            from_index = windows[-1][1]
+            print(f"Fetching tenders from index {windows[0][0]} to {from_index}")
+
+            futures = [pool.submit(fetch_tender_page, start, end, tender_type) for start, end in windows]
+
+            done = False
+            timings = []
+            # go through the pages in order, anything after the stop point is thrown away
+            for (start, end), future in zip(windows, futures):
+                try:
+                    tenders, elapsed = future.result()
+                except requests.exceptions.RequestException as e:
+                    print(f"Error fetching tenders {start}-{end}: {e}")
+                    done = True
+                    break
+                timings.append(elapsed)
+
+                formatted = [format_tender_data(t) for t in tenders]
+                keys = [tender_key(t) for t in formatted]
+                for tender, key in zip(tenders, keys):
+                    # windows can overlap by one if the API treats To as inclusive
+                    if key not in fetched_keys:
+                        fetched_keys.add(key)
+                        all_tenders.append(tender)
+
+                if not tenders:
+                    done = True
+                    break
+                if seen_store is not None and all(keys):
+                    status = seen_store.classify_many(
+                        [(key, field_hashes(t, AMENDMENT_FIELDS)) for t, key in zip(formatted, keys)]
+                    )
+                    if all(kind == UNCHANGED for kind, _ in status.values()):
+                        print(f"Page {start}-{end} is all seen, unamended tenders, stopping.")
+                        done = True
+                        break
+                if len(tenders) < end - start:
+                    # a short page is either the last one or the most the API sends back
+                    # per request: carry on from where it stopped, in windows no bigger
+                    # than that, and only an empty page ends the fetch
+                    page_cap = min(page_cap, len(tenders))
+                    page_size = min(page_size, page_cap)
+                    from_index = start + len(tenders)
+                    break
+
+            if done:
+                break
+
+            # adapt the page size to how fast the API is answering
+            average = sum(timings) / len(timings)
+            if average < TARGET_PAGE_SECONDS / 2:
+                page_size = min(page_size * 2, MAX_PAGE_SIZE, page_cap)
+            elif average > TARGET_PAGE_SECONDS:
+                page_size = min(max(page_size // 2, MIN_PAGE_SIZE), page_cap)
+
+    print(f"Successful: {len(all_tenders)} tenders fetched.")
+    return all_tenders
 
 
 def format_tender_data(raw_tender):
@@ -196,166 +378,250 @@ def format_tender_data(raw_tender):
     return formatted_tender
 
 
-def load_trained_model(model_path='model.pkl', desc_path='desc_vectorizer.pkl', other_path='other_vectorizer.pkl'):
-    """Loads the saved ML model and vectorizers."""
+def load_trained_model(model_path=MODEL_FILES[0], desc_path=MODEL_FILES[1], other_path=MODEL_FILES[2],
+                       compact_path=COMPACT_MODEL_FILE):
+    """Loads the saved ML model and vectorizers (compact export or memory-mapped pickles, see model_store)."""
     try:
-        with open(model_path, 'rb') as f:
-            model = pickle.load(f)
-        with open(desc_path, 'rb') as f:
-            desc_vectorizer = pickle.load(f)
-        with open(other_path, 'rb') as f:
-            other_vectorizer = pickle.load(f)
+        model, desc_vectorizer, other_vectorizer = load_pipeline((model_path, desc_path, other_path), compact_path)
         return model, desc_vectorizer, other_vectorizer
     except FileNotFoundError:
         print("Model files don't exist")
         return None, None, None
 
 
-def post_to_hubspot(match_data):
-    """
-    Posts a single matched tender to HS
-    """
-    if not HUBSPOT_TOKEN:
-        print("Error, no token.")
-        return False
-
-    url = "https://api.hubspot.com/crm/v3/objects/deals"
-
-
-    # define headers and content-type with auth code
-    headers = {
+def hubspot_headers():
+    # define headers and content-type with auth code
+    return {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {HUBSPOT_TOKEN}"
     }
 
+
+def hubspot_properties(match_data):
+    """The HS deal properties for a matched tender"""
     # map the data to HS
     # add URL when the URL is available from the RSS data
-    payload = {
-        "properties": {
-            # Deal name
-            "dealname": match_data['title'],
+    return {
+        # Deal name
+        "dealname": match_data['title'],
 
-            # Deal stage
-            # we dont really have this but it is mandatory for HS
-            "dealstage": "appointmentscheduled",
+        # Deal stage
+        # we dont really have this but it is mandatory for HS
+        "dealstage": "appointmentscheduled",
 
-            # ML reccomendation
-            "ml_recommendation": str(match_data['ml_recommendation']),
+        # ML reccomendation
+        "ml_recommendation": str(match_data['ml_recommendation']),
 
-            # Use get in case it doesnt exist
-            # Description
-            "tender_description": match_data.get('description', 'N/A'),
+        # Use get in case it doesnt exist
+        # Description
+        "tender_description": match_data.get('description', 'N/A'),
 
-            # our keyword scoring
-            "keyword_score": str(match_data['keyword_score']),
+        # our keyword scoring
+        "keyword_score": str(match_data['keyword_score']),
 
-            # Use get in case it doesnt exist
-            # agency
-            "agency": match_data.get('agency', 'N/A'),
+        # Use get in case it doesnt exist
+        # agency
+        "agency": match_data.get('agency', 'N/A'),
 
-            # URL so we can visit the site of the tender
-            # is URL the correct working for hubspot????
-            "url": match_data.get('url', 'N/A'),
+        # URL so we can visit the site of the tender
+        # is URL the correct working for hubspot????
+        "url": match_data.get('url', 'N/A'),
 
-            # country name
-            "country_name": match_data.get('countryname', 'N/A')
+        # country name
+        "country_name": match_data.get('countryname', 'N/A')
 
-            # how much is the tender 
-            # hubspot_totalcontractvalue
-            #"hs_tcv": match_data.get('value')
-        }
+        # how much is the tender 
+        # hubspot_totalcontractvalue
+        #"hs_tcv": match_data.get('value')
     }
 
+
+def post_to_hubspot(match_data):
+    """
+    Posts a single matched tender to HS.
+    Returns the id of the new deal, or False.
+    """
+    if not HUBSPOT_TOKEN:
+        print("Error, no token.")
+        return False
+
+    url = "https://api.hubspot.com/crm/v3/objects/deals"
+    payload = {"properties": hubspot_properties(match_data)}
+
     # send to HS (POST)
-    response = requests.post(url, headers=headers, json=payload)
+    response = requests.post(url, headers=hubspot_headers(), json=payload)
 
     if response.status_code == 201:
         print(f"sucess: {match_data['title']} created in Hubspot")
-        return True
+        return response.json()["id"]
     else:
         print(f"failure: {response.status_code}")
         print(f"Error: {response.text}")
         return False
 
 
-def post_to_notion(match_data):
-    """Posts a single matched tender to notion API"""
-    if not NOTION_TOKEN:
-        print("No Nothion token")
+def update_hubspot(deal_id, match_data):
+    """Updates the HS deal we made for a tender that has since been amended"""
+    if not HUBSPOT_TOKEN:
+        print("Error, no token.")
         return False
 
-    url = "https://api.notion.com/v1/pages"
+    url = f"https://api.hubspot.com/crm/v3/objects/deals/{deal_id}"
+    properties = hubspot_properties(match_data)
+    # leave the deal in whatever stage it has been moved to
+    del properties["dealstage"]
+
+    # send to HS (PATCH)
+    response = requests.patch(url, headers=hubspot_headers(), json={"properties": properties})
+
+    if response.status_code == 200:
+        print(f"sucess: {match_data['title']} updated in Hubspot")
+        return deal_id
+    else:
+        print(f"failure: {response.status_code}")
+        print(f"Error: {response.text}")
+        return False
 
-    headers = {
+
+def notion_headers():
+    return {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {NOTION_TOKEN}",
         "Notion-Version": "2022-06-28",
     }
 
-    payload = {
-        "parent": {"database_id": NOTION_DB_ID},
-        "properties": {
-            # check what notion calls these things
-            # dealname
-            "Title": {  
-                "title": [{"text": {"content": match_data.get("title", "No Title")}}]
-            },
-
-            # deal stage
-            # this was needed for HS, is it for NOtion, if not leave blank
-
-            # this will need to be a custom field
-            # ML recommendation
-            "MLRecommendation": {
-                "rich_text": [{"text": {"content": str(match_data.get("ml_recommendation", ""))}}]
-            },
-
-            # description
-            "tenderdecription": {
-                "rich_text": [{"text": {"content": match_data.get("description", "N/A")}}]
-            },
-
-            # keyword scoring
-            # this will need to be a custom field
-            "keyword_score": {
-                "number": float(match_data.get("keyword_score", 0))
-            },
-
-            # agency
-            "agency": {
-                "rich_text": [{"text": {"content": match_data.get("agency", "N/A")}}]
-            },
-
-            # URL
-            "url": {
-                "url": match_data.get("url", None)
-            },
-            # country name
-            "countryname": {
-               "rich_text": [{"text": {"content": match_data.get('countryname', 'N/A')}}]
-            }
-
-            # how much is the tender 
-            # hubspot_totalcontractvalue
-            #"value": match_data.get('value', 'N/A')
 
+def notion_properties(match_data):
+    """The notion page properties for a matched tender"""
+    return {
+        # check what notion calls these things
+        # dealname
+        "Title": {  
+            "title": [{"text": {"content": match_data.get("title", "No Title")}}]
+        },
+
+        # deal stage
+        # this was needed for HS, is it for NOtion, if not leave blank
+
+        # this will need to be a custom field
+        # ML recommendation
+        "MLRecommendation": {
+            "rich_text": [{"text": {"content": str(match_data.get("ml_recommendation", ""))}}]
+        },
+
+        # description
+        "tenderdecription": {
+            "rich_text": [{"text": {"content": match_data.get("description", "N/A")}}]
+        },
+
+        # keyword scoring
+        # this will need to be a custom field
+        "keyword_score": {
+            "number": float(match_data.get("keyword_score", 0))
+        },
+
+        # agency
+        "agency": {
+            "rich_text": [{"text": {"content": match_data.get("agency", "N/A")}}]
+        },
+
+        # URL
+        "url": {
+            "url": match_data.get("url", None)
+        },
+        # country name
+        "countryname": {
+           "rich_text": [{"text": {"content": match_data.get('countryname', 'N/A')}}]
         }
+
+        # how much is the tender 
+        # hubspot_totalcontractvalue
+        #"value": match_data.get('value', 'N/A')
+
+    }
+
+
+def post_to_notion(match_data):
+    """
+    Posts a single matched tender to notion API.
+    Returns the id of the new page, or False.
+    """
+    if not NOTION_TOKEN:
+        print("No Nothion token")
+        return False
+
+    url = "https://api.notion.com/v1/pages"
+
+    payload = {
+        "parent": {"database_id": NOTION_DB_ID},
+        "properties": notion_properties(match_data),
     }
     # send to notion
-    response = requests.post(url, headers=headers, json=payload)
+    response = requests.post(url, headers=notion_headers(), json=payload)
+
+    if response.status_code in (200, 201):
+        print(f"success: {match_data['title']} created in Notion.")
+        return response.json()["id"]
+    else:
+        print(f"failure {response.status_code}")
+        print(f"{response.text}")
+        return False
+
+
+def update_notion(page_id, match_data):
+    """Updates the notion page we made for a tender that has since been amended"""
+    if not NOTION_TOKEN:
+        print("No Nothion token")
+        return False
 
-    if response.status_code == [200, 201]:
-        print(f"success: {match_data['title']} created in HS.")
+    url = f"https://api.notion.com/v1/pages/{page_id}"
+
+    # send to notion (PATCH)
+    response = requests.patch(url, headers=notion_headers(), json={"properties": notion_properties(match_data)})
+
+    if response.status_code == 200:
+        print(f"success: {match_data['title']} updated in Notion.")
+        return page_id
     else:
         print(f"failure {response.status_code}")
         print(f"{response.text}")
         return False
 
 
+# where a profile's matches can be sent, see profiles_file.py
+SINKS = {
+    "hubspot": post_to_hubspot,
+    "notion": post_to_notion,
+}
+# and how the record a sink made is updated when the tender is amended
+UPDATE_SINKS = {
+    "hubspot": update_hubspot,
+    "notion": update_notion,
+}
+
+
+def send_to_sinks(match, existing_ids):
+    """
+    Sends a match to each of its sinks. Where we already made a record for
+    the tender (existing_ids, {sink: id}) it is updated, otherwise one is made.
+    Returns {sink: id} for the records made.
+    """
+    created = {}
+    for sink in match["sinks"]:
+        if sink in existing_ids:
+            UPDATE_SINKS[sink](existing_ids[sink], match)
+        else:
+            record_id = SINKS[sink](match)
+            if record_id:
+                created[sink] = record_id
+    return created
+
+
 # def log_to_local(tenders):
 #     """Saves Tenders locally
 #     This is not functionality that I think is required but
 #     just a good visual for demo"""
+#     import pandas as pd
 #     df = pd.DataFrame(tenders)
 #     csv_path = os.path.join(OUTPUT_DIR)
 #     html_path = os.path.join(OUTPUT_DIR)
@@ -365,45 +631,101 @@ def post_to_notion(match_data):
 
 
 if __name__ == '__main__':
-    # load the models and vectorizers
-    model, desc_vectorizer, other_vectorizer = load_trained_model()
+    # the models and vectorizers are only loaded once there are new tenders to score
+    model_ready = os.path.exists(COMPACT_MODEL_FILE) or all(os.path.exists(path) for path in MODEL_FILES)
+    if not model_ready:
+        print("Model files don't exist")
 
-    if model:
-        raw_tenders = fetch_new_tenders(from_index=0, to_index=100, tender_type="New")
+    if model_ready:
+        # open the store of old tenders
+        seen_store = open_seen_store()
+
+        raw_tenders = fetch_all_tenders(tender_type="New", seen_store=seen_store)
         formatted_tenders = [format_tender_data(raw) for raw in raw_tenders]
 
         if not formatted_tenders:
             print("No new tenders")
         else:
-            # load the old tenders
-            seen_tenders = load_seen_tenders()
-            # load new tenders (filtering duplicates)
-            NEW_TENDERS = filter_new_tenders(formatted_tenders, seen_tenders)
+            # load new tenders (filtering duplicates), and ones that have been amended since we saw them
+            NEW_TENDERS, AMENDED_TENDERS = classify_tenders(formatted_tenders, seen_store)
+            # drop the ones we already have from another source
+            near_dups = NearDuplicateIndex(SEEN_STORE_FILE)
+            near_dups.prune()
+            NEW_TENDERS, duplicate_tenders = drop_near_duplicates(NEW_TENDERS, near_dups)
+            if duplicate_tenders:
+                seen_store.add_many([seen_record(t) for t in duplicate_tenders], source="tenderinfo")
+            # amended tenders go through scoring again, the unchanged ones don't
+            SCORED_TENDERS = NEW_TENDERS + AMENDED_TENDERS
             
-            if not NEW_TENDERS:
-                print("No new tenders (all were duplicates).")
+            if not SCORED_TENDERS:
+                print("No new or amended tenders (all were duplicates).")
             
             else:
-                # now predict
-                predictions = predict_relevance(NEW_TENDERS, model, desc_vectorizer, other_vectorizer)
+                # one analysis pass per tender, shared by the keyword scores, the model and the explanations
+                analyzer = model_analyzer()
+                analyses = analyzer.analyse_many(SCORED_TENDERS)
+                # keyword scores for every profile in one pass, the model uses the profile it was trained on
+                profile_scores = profile_registry.score_texts([a.keyword_text for a in analyses])
+                keyword_scores = profile_scores[:, profile_registry.names.index(MODEL_PROFILE)]
+
+                # country, reject list and keyword bands first (cascade_file.py, profiles_file.py),
+                # the model only sees the tenders none of them could decide
+                cascade = Cascade.from_config(profile_registry)
+                stages = cascade.triage(SCORED_TENDERS, profile_scores)
+                print(cascade.summary())
+                to_model = [i for i, stage in enumerate(stages) if stage == MODEL]
+                predictions = np.zeros(len(SCORED_TENDERS), dtype=bool)
+
+                if to_model:
+                    # load the models and vectorizers
+                    model, desc_vectorizer, other_vectorizer = load_trained_model()
+                    analyzer.use_scorer(LinearScorer(model, desc_vectorizer, other_vectorizer))
+
+                    # now predict, tenders we've scored before (same text, model and keywords) are a lookup
+                    prediction_cache = open_prediction_cache()
+                    predictions[to_model] = predict_relevance(
+                        [SCORED_TENDERS[i] for i in to_model], model, desc_vectorizer, other_vectorizer,
+                        keyword_scores[to_model], analyzer=analyzer, analyses=[analyses[i] for i in to_model],
+                        cache=prediction_cache,
+                    )
+                    prediction_cache.close()
+                    print(f"Prediction cache: {prediction_cache.hits} hits, {prediction_cache.misses} scored.")
 
                 print("-- Live Agent Predictions Report ---")
                 final_matches = []
+                # the HS deals / notion pages we made for the amended tenders, to update instead of duplicating
+                record_ids = seen_store.sink_ids_many([tender_key(t) for t in AMENDED_TENDERS])
 
-                for tender_data, prediction in zip(NEW_TENDERS, predictions):
-
-                    keyword_score = calculate_keyword_scores(tender_data)
+                for tender_data, analysis, stage, prediction, keyword_score, score_row in zip(
+                        SCORED_TENDERS, analyses, stages, predictions, keyword_scores, profile_scores):
 
-                    country = tender_data.get("countryname", "").lower()
+                    if stage == MODEL:
+                        relevance_status = "RELEVANT" if prediction else "Not relevant"
+                        ml_recommendation = bool(prediction)
+                    else:
+                        relevance_status = ml_recommendation = f"Not run ({stage})"
 
-                    is_final_match = (prediction or (keyword_score >= 10)) and country in COUNTRY_NAMES
-
-                    relevance_status = "RELEVANT" if prediction else "Not relevant"
+                    # no profiles if the country or reject list stage ruled it out
+                    matched_profiles, sinks = cascade.route(stage, score_row, prediction)
+                    is_final_match = bool(matched_profiles)
 
                     # Print the prediction for the console report
-                    print(f"Title: {tender_data['title']} | AI: {relevance_status} | Score: {keyword_score} | FINAL MATCH: {is_final_match}")
+                    print(f"Title: {tender_data['title']} | AI: {relevance_status} | Score: {keyword_score} | "
+                          f"Profiles: {', '.join(p.name for p in matched_profiles) or '-'} | FINAL MATCH: {is_final_match}")
+                    if "amended_fields" in tender_data:
+                        print(f"  Amended: {', '.join(tender_data['amended_fields'])}")
+                    if prediction:
+                        # the words that pushed the model to say yes, from the term ids it was scored on
+                        top_terms = analyzer.explain(analysis)
+                        print(f"  Top terms: {', '.join(term for term, _ in top_terms)}")
 
                     if is_final_match:
+                        duplicate = index_match(tender_data, near_dups)
+                        if duplicate:
+                            # another copy of it matched earlier in this run
+                            print(f"  Near-duplicate of {duplicate[0]} ({duplicate[1]:.2f}), not posted again")
+                            continue
+
                         # Log the success...
                         # Structure the output data with new fields and logic:
                         match_details = {
@@ -412,10 +734,13 @@ if __name__ == '__main__':
                             "url": tender_data.get('url', 'N/A'),
                             "agency": tender_data.get('agency'),
                             "keyword_score": keyword_score,
-                            "ml_recommendation": bool(prediction),
-                            "status": "New Lead",
+                            "ml_recommendation": ml_recommendation,
+                            "status": "Amended" if "amended_fields" in tender_data else "New Lead",
                             "companyname": "companyname",
-                            "countryname": tender_data.get('countryname', 'N/A')
+                            "countryname": tender_data.get('countryname', 'N/A'),
+                            "profiles": [p.name for p in matched_profiles],
+                            "sinks": sinks,
+                            "key": tender_key(tender_data),
                             #"value": tender_data.get('value')
                         }
                         final_matches.append(match_details)
@@ -424,12 +749,18 @@ if __name__ == '__main__':
                 if final_matches:
                     print("---Posting to HS---")
                     for match in final_matches:
-                        post_to_hubspot(match)
-                        # post to notion to, perhaphs look at al script
-                        post_to_notion(match)
+                        # each sink once, for every profile the tender matched
+                        created = send_to_sinks(match, record_ids.get(match["key"], {}))
+                        seen_store.set_sink_ids(
+                            [(match["key"], sink, record_id) for sink, record_id in created.items()]
+                        )
                     #log_to_local(final_matches)
 
-                # save the fetched tenders to seen file
-                all_seen = seen_tenders + NEW_TENDERS
-                save_seen_tenders(all_seen)
-                print(f"Saved {len(all_seen)} to local file.")
+                # save the fetched tenders to the seen store
+                added = seen_store.add_many([seen_record(t) for t in NEW_TENDERS], source="tenderinfo")
+                seen_store.update_many([seen_record(t) for t in AMENDED_TENDERS])
+                print(f"Saved {added} new and {len(AMENDED_TENDERS)} amended tenders to the seen store.")
+
+            near_dups.close()
+
+        seen_store.close()
@@ -0,0 +1,154 @@
+import numpy as np
+
+from keyword_matcher import KeywordMatcher, tender_text
+from profiles_file import profiles
+
+# Every profile's keywords go into one matcher over the union of the vocabularies,
+# and their weights into one (keywords x profiles) matrix. A tender is matched
+# once and hits @ weights gives its score for every profile, so adding a
+# profile adds a column, not another pass over the text.
+
+
+class Profile:
+    """One keyword-weight profile with its thresholds and where its matches go."""
+
+    def __init__(self, name, keywords, min_score=10, accept_score=10, reject_score=None, use_model=False, sinks=()):
+        self.name = name
+        self.keywords = dict(keywords)
+        self.min_score = min_score
+        self.accept_score = accept_score
+        self.reject_score = reject_score
+        self.use_model = use_model
+        self.sinks = list(sinks)
+
+    def is_candidate(self, score):
+        """Worth looking at (and running the model on) for this profile."""
+        return score >= self.min_score
+
+    def is_rejected(self, score):
+        """Below the reject band, not a match whatever the model says."""
+        return self.reject_score is not None and score < self.reject_score
+
+    def needs_model(self, score):
+        """In the band where the ML prediction decides it."""
+        return self.use_model and not self.is_rejected(score) and score < self.accept_score
+
+    def is_match(self, score, prediction=False):
+        """Final decision from the keyword score and, if the profile uses it, the ML prediction."""
+        if score >= self.accept_score:
+            return True
+        return self.needs_model(score) and bool(prediction)
+
+
+class ProfileRegistry:
+    """The profiles we score against, compiled into one matcher and one weight matrix."""
+
+    def __init__(self, profiles=()):
+        self.profiles = []
+        self.matcher = None
+        self.weights = None
+        for profile in profiles:
+            self.register(profile)
+
+    @classmethod
+    def from_config(cls, config, source=None):
+        """
+        Build a registry from a list of dicts like profiles_file.profiles,
+        with that source's threshold overrides applied if source is given.
+        """
+        profiles = []
+        for entry in config:
+            entry = dict(entry)
+            overrides = entry.pop("sources", {})
+            if source is not None:
+                entry.update(overrides.get(source, {}))
+            profiles.append(Profile(**entry))
+        return cls(profiles)
+
+    def register(self, profile):
+        if any(p.name == profile.name for p in self.profiles):
+            raise ValueError(f"profile {profile.name!r} is already registered")
+        self.profiles.append(profile)
+        # recompiled on next use
+        self.matcher = None
+        self.weights = None
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def __getitem__(self, name):
+        for profile in self.profiles:
+            if profile.name == name:
+                return profile
+        raise KeyError(name)
+
+    @property
+    def names(self):
+        return [p.name for p in self.profiles]
+
+    def compile(self):
+        vocabulary = {}
+        for profile in self.profiles:
+            for keyword in profile.keywords:
+                vocabulary.setdefault(keyword, len(vocabulary))
+
+        weights = np.zeros((len(vocabulary), len(self.profiles)), dtype=np.int64)
+        for column, profile in enumerate(self.profiles):
+            for keyword, weight in profile.keywords.items():
+                weights[vocabulary[keyword], column] = weight
+
+        self.matcher = KeywordMatcher(dict.fromkeys(vocabulary, 1))
+        self.weights = weights
+
+    def batch_scores(self, tenders, return_hits=False):
+        """
+        (tenders x profiles) array of keyword scores, column order follows self.profiles.
+        With return_hits=True also returns the hit matrix (columns follow self.matcher.vocabulary).
+        """
+        return self.score_texts([tender_text(t) for t in tenders], return_hits=return_hits)
+
+    def score_texts(self, texts, return_hits=False):
+        """batch_scores for texts that are already lower-cased title + description."""
+        if self.matcher is None:
+            self.compile()
+        hits = self.matcher.hit_matrix(texts)
+        scores = np.asarray(hits @ self.weights)
+        return (scores, hits) if return_hits else scores
+
+    def matched_keywords(self, hits_row, profile):
+        """["keyword (xW)", ...] for one row of the hit matrix, for one profile."""
+        if self.matcher is None:
+            self.compile()
+        vocabulary = self.matcher.vocabulary
+        return [
+            f"{vocabulary[i]} (x{profile.keywords[vocabulary[i]]})"
+            for i in sorted(hits_row.indices)
+            if vocabulary[i] in profile.keywords
+        ]
+
+    def needs_model(self, score_row):
+        """Whether the ML prediction can change which profiles this tender matches."""
+        return any(p.needs_model(score) for p, score in zip(self.profiles, score_row))
+
+    def candidates(self, score_row):
+        """Profiles this tender is worth considering for."""
+        return [p for p, score in zip(self.profiles, score_row) if p.is_candidate(score)]
+
+    def route(self, score_row, prediction=False):
+        """
+        The profiles a tender matches, and the union of their sinks (in order,
+        each once, so a tender matching two profiles isn't posted twice).
+        """
+        matched = [p for p, score in zip(self.profiles, score_row) if p.is_match(score, prediction)]
+        sinks = []
+        for profile in matched:
+            for sink in profile.sinks:
+                if sink not in sinks:
+                    sinks.append(sink)
+        return matched, sinks
+
+
+# shared registry built from profiles_file.profiles, compiled on first use
+profile_registry = ProfileRegistry.from_config(profiles)
+# the same profiles with the thresholds RSSmodel uses
+rss_profile_registry = ProfileRegistry.from_config(profiles, source="rss")
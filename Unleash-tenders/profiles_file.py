@@ -0,0 +1,26 @@
+from keywords_file import keywords
+
+# One entry per business unit we scan tenders for.
+# keywords:     weighted keyword dict, same format as keywords_file.keywords
+# min_score:    keyword score a tender needs to be considered for this profile at all
+# accept_score: keyword score that makes it a match even if the ML model says no (the model isn't run)
+# reject_score: keyword score below which it isn't a match even if the ML model says yes (the model isn't run),
+#               None for no reject band. The Unleash model says yes to some tenders with no keyword hits at all,
+#               so there's no score low enough to be sure.
+# use_model:    whether the ML model's prediction counts (the model was trained on the Unleash keywords)
+# sinks:        where matches are posted ("hubspot", "notion")
+# sources:      optional {entry point: {threshold: value}} overrides, e.g. for "rss" (RSSmodel)
+profiles = [
+    {
+        "name": "unleash",
+        "keywords": keywords,
+        "min_score": 10,
+        "accept_score": 10,
+        "reject_score": None,
+        "use_model": True,
+        "sinks": ["hubspot", "notion"],
+        # the RSS scanner has always needed more than 10 to post without the model
+        # (scores are whole numbers), the TenderInfo predictor 10 or more
+        "sources": {"rss": {"accept_score": 11}},
+    },
+]
@@ -4,7 +4,7 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from scipy.sparse import hstack, csr_matrix
 import numpy as np
-from keywords_file import keywords
+from keyword_matcher import keyword_matcher, batch_keyword_scores
 
 RELEVANCE_KEYWORDS = [
     "software development",
@@ -28,14 +28,9 @@ def calculate_keyword_scores(tender):
     """
     Calculates a score based on the predefined, weighted keyword dictionary.
     """
-    score = 0
-    # combine the text and dictionary
+    # combine the text and match every keyword in one pass
     text = (tender.get('title', '') + " " + tender.get('description', '')).lower()
-
-    for keyword, weight in keywords.items():
-        if keyword in text:
-            score += weight
-
+    score, _ = keyword_matcher.score(text)
     return score
 
 
@@ -54,8 +49,8 @@ def train_relevance_model(tenders):
     labels = np.array([tender['is_relevant'] for tender in tenders])
 
     # keywords scores
-    keyword_scores = [calculate_keyword_scores(tender) for tender in tenders]
-    X_keyword = csr_matrix(np.array(keyword_scores)).T
+    keyword_scores = batch_keyword_scores(tenders)
+    X_keyword = csr_matrix(keyword_scores).T
 
     # vectorise the data
     desc_vectorizer = TfidfVectorizer(ngram_range=(1, 2))
@@ -95,17 +90,20 @@ def score_tender_relevance(tender, keywords):
     return False
 
 
-def predict_relevance(new_tenders, model, desc_vectorizer, other_vectorizer):
+def predict_relevance(new_tenders, model, desc_vectorizer, other_vectorizer, keyword_scores=None):
     """
     Uses the trained model to predict relevance.
+    Pass keyword_scores if they've already been worked out for these tenders.
     """
     # Vectoriser has already been fitted so to our vocab
     # so use .transform() not .fit_transform()
     new_descriptions = [tender.get('description', '') for tender in new_tenders]
     new_categories_agencies = [tender.get('category', '') + " " + tender.get('agency', '') for tender in new_tenders]
 
-    new_keyword_scores = [calculate_keyword_scores(tender) for tender in new_tenders]
-    new_X_keyword = csr_matrix(np.array(new_keyword_scores)).T
+    # score the whole batch in one go
+    if keyword_scores is None:
+        keyword_scores = batch_keyword_scores(new_tenders)
+    new_X_keyword = csr_matrix(np.asarray(keyword_scores)).T
 
     new_X_desc = desc_vectorizer.transform(new_descriptions)
     new_X_other = other_vectorizer.transform(new_categories_agencies)
@@ -137,14 +135,15 @@ if __name__ == '__main__':
             {"title": "Landscaping Services", "description": "Call for tenders for landscaping and gardening services at a public park.", "category": "Landscaping", "agency": "Department of the Environment"}
         ]
 
+        # keyword scores for the batch, used by the model and the final match
+        keyword_scores = batch_keyword_scores(NEW_TENDERS)
+
         # now predict
-        predictions = predict_relevance(NEW_TENDERS, model, desc_vectorizer, other_vectorizer)
+        predictions = predict_relevance(NEW_TENDERS, model, desc_vectorizer, other_vectorizer, keyword_scores)
 
         print("-- Tender Predictions Report ---")
 
-        for tender_data, prediction in zip(NEW_TENDERS, predictions):
-
-            keyword_score = calculate_keyword_scores(tender_data)
+        for tender_data, prediction, keyword_score in zip(NEW_TENDERS, predictions, keyword_scores):
 
             is_final_match = prediction or (keyword_score >= 5)
 
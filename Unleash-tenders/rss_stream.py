@@ -0,0 +1,49 @@
+import xml.etree.ElementTree as ET
+
+# the parts of an <item> we use, everything else is skipped
+ITEM_FIELDS = ("title", "link", "description", "pubDate", "guid")
+CHUNK_SIZE = 64 * 1024
+
+
+def _chunks(source, chunk_size):
+    """Accept either the whole body (bytes/str) or an iterable of chunks, e.g. resp.iter_content()."""
+    if isinstance(source, (bytes, bytearray, str)):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    else:
+        yield from source
+
+
+def iter_items(source, fields=ITEM_FIELDS, chunk_size=CHUNK_SIZE):
+    """
+    Stream <item> records out of an RSS document.
+    Each item is yielded as a small dict as soon as its closing tag is read,
+    and the element is then dropped so memory stays flat on big feeds.
+    Missing fields come back as "" (same as safe_get). Raises ET.ParseError on bad XML.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack = []
+
+    for chunk in _chunks(source, chunk_size):
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                stack.append(elem)
+                continue
+
+            stack.pop()
+            if elem.tag != "item":
+                continue
+
+            record = {}
+            for field in fields:
+                node = elem.find(field)
+                record[field] = node.text.strip() if node is not None and node.text else ""
+            yield record
+
+            # free the item, and take it off its parent so the channel doesn't grow
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+
+    parser.close()
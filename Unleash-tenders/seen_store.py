@@ -0,0 +1,343 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from bloom import BloomFilter
+
+# One store for every entry point (RSSmodel, RSS/main.py, predictor) instead of
+# processed_links.txt / seen_tenders.json. Lookups go through an index, so the
+# cost of a run depends on the size of the batch, not the size of the history.
+DEFAULT_PATH = os.path.join("TenderAusAgent_logs", "seen.db")
+
+# sqlite has a limit on how many ? parameters one query can take
+BATCH_SIZE = 500
+# what classify_many says about a tender
+NEW = "new"
+UNCHANGED = "unchanged"
+AMENDED = "amended"
+# how often maybe_compact actually does the work
+COMPACT_INTERVAL = 7 * 24 * 60 * 60
+# smallest bloom filter we build, it is resized to 2x the store at each rebuild
+MIN_BLOOM_CAPACITY = 100_000
+
+
+def normalise_key(key):
+    """Keys are URLs (or titles when there is no URL), compared trimmed and lower-case."""
+    return key.strip().lower() if key else None
+
+
+def content_hash(*parts):
+    """
+    Short fingerprint (8 bytes, hex) of the text of a tender, so we can tell later if it changed.
+    Case and whitespace are normalised so re-formatting alone doesn't count as a change.
+    Only this goes in the store, never the text itself.
+    """
+    text = " ".join(" ".join(p.lower().split()) for p in parts if p)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def field_hashes(tender, fields):
+    """
+    {field: content_hash} for the fields of a tender we watch for amendments,
+    so we can tell which of them changed without keeping the text.
+    """
+    return {field: content_hash(str(tender.get(field) or "")) for field in fields}
+
+
+def _batches(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class SeenStore:
+    """
+    SQLite (WAL mode) store of every tender we've already seen.
+    New tenders are appended and amended ones update their own row in place
+    (update_many), so a run writes O(new + amended) bytes.
+    With bloom_path set, a memory-mapped bloom filter (built once, shared by
+    every process that opens it) answers first and only keys it says might
+    be there are looked up for real.
+    Rows can carry per-field hashes (field_hashes) so classify_many can tell an
+    amended tender from one we've already seen, and the ids of the records we
+    made for it (HubSpot deal, Notion page) so an amendment can update them.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, bloom_path=None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.bloom = None
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS seen (
+                   key TEXT PRIMARY KEY,
+                   source TEXT,
+                   first_seen REAL,
+                   content_hash TEXT
+               ) WITHOUT ROWID"""
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        # stores from before amendment tracking don't have these columns yet
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(seen)")}
+        if "field_hashes" not in columns:
+            self.conn.execute("ALTER TABLE seen ADD COLUMN field_hashes TEXT")
+        if "amended" not in columns:
+            self.conn.execute("ALTER TABLE seen ADD COLUMN amended REAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS sink_ids (
+                   key TEXT,
+                   sink TEXT,
+                   external_id TEXT,
+                   PRIMARY KEY (key, sink)
+               ) WITHOUT ROWID"""
+        )
+        self.conn.commit()
+
+        if bloom_path:
+            self.bloom = self._open_bloom(bloom_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.bloom is not None:
+            self.bloom.close()
+        self.conn.close()
+
+    def __contains__(self, key):
+        return bool(self.contains_many([key]))
+
+    def contains_many(self, keys):
+        """Return the set of keys (as passed in) that are already in the store."""
+        by_norm = {}
+        for key in keys:
+            norm = normalise_key(key)
+            if norm:
+                by_norm.setdefault(norm, []).append(key)
+
+        if self.bloom is not None:
+            # anything the bloom filter hasn't seen is definitely new
+            by_norm = {norm: originals for norm, originals in by_norm.items() if norm in self.bloom}
+
+        found = set()
+        for batch in _batches(list(by_norm)):
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(f"SELECT key FROM seen WHERE key IN ({placeholders})", batch)
+            for (norm,) in rows:
+                found.update(by_norm[norm])
+        return found
+
+    def add_many(self, records, source=""):
+        """
+        Add (key, content_hash) pairs, (key, content_hash, field_hashes) triples
+        or plain keys. Keys already in the store keep their original first_seen.
+        Returns how many were new.
+        """
+        now = time.time()
+        rows = []
+        for record in records:
+            if not isinstance(record, tuple):
+                record = (record, None)
+            key, digest, fields = record if len(record) == 3 else (*record, None)
+            norm = normalise_key(key)
+            if norm:
+                rows.append((norm, source, now, digest, json.dumps(fields, sort_keys=True) if fields else None))
+
+        self._row_count()
+        stale_bloom = False
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                """INSERT OR IGNORE INTO seen (key, source, first_seen, content_hash, field_hashes)
+                   VALUES (?, ?, ?, ?, ?)""",
+                rows,
+            )
+            added = self.conn.total_changes - before
+            # keep a running count so the bloom filter can check it's in sync without a COUNT(*),
+            # updated in the same transaction so concurrent writers can't lose a count
+            self.conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + ? WHERE name = 'row_count'", (added,))
+            row_count = int(self._get_meta("row_count"))
+            if self.bloom is not None:
+                # still holding the write lock, so no one else changes the filter in between.
+                # Rows it doesn't account for were written without it (plain store, or
+                # another process's filter after a rebuild) and their keys aren't in it.
+                if self.bloom.count + added == row_count and row_count <= self.bloom.capacity:
+                    self.bloom.add_many(row[0] for row in rows)
+                    self.bloom.set_count(row_count)
+                else:
+                    stale_bloom = True
+        if stale_bloom:
+            bloom_path = self.bloom.path
+            self.bloom.close()
+            self.bloom = self._build_bloom(bloom_path)
+        return added
+
+    def classify_many(self, records):
+        """
+        Sort (key, field_hashes) pairs into NEW, UNCHANGED and AMENDED.
+        Returns {key (as passed in): (status, [fields that changed])}.
+        Rows stored before we kept field hashes count as UNCHANGED, and get
+        these hashes stored so the next change to them is spotted.
+        """
+        by_norm = {}
+        for key, fields in records:
+            norm = normalise_key(key)
+            if norm:
+                by_norm.setdefault(norm, []).append((key, fields))
+
+        result = {key: (NEW, []) for originals in by_norm.values() for key, _ in originals}
+        candidates = list(by_norm)
+        if self.bloom is not None:
+            # anything the bloom filter hasn't seen is definitely new
+            candidates = [norm for norm in candidates if norm in self.bloom]
+
+        baselines = []
+        for batch in _batches(candidates):
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(f"SELECT key, field_hashes FROM seen WHERE key IN ({placeholders})", batch)
+            for norm, stored in rows:
+                for key, fields in by_norm[norm]:
+                    if stored is None:
+                        result[key] = (UNCHANGED, [])
+                        baselines.append((json.dumps(fields, sort_keys=True), norm))
+                        continue
+                    stored_fields = json.loads(stored)
+                    changed = [f for f, digest in fields.items() if f in stored_fields and stored_fields[f] != digest]
+                    result[key] = (AMENDED, changed) if changed else (UNCHANGED, [])
+
+        if baselines:
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE seen SET field_hashes = ? WHERE key = ? AND field_hashes IS NULL", baselines
+                )
+        return result
+
+    def update_many(self, records):
+        """Store the new (key, content_hash, field_hashes) of tenders that were amended."""
+        now = time.time()
+        rows = [
+            (digest, json.dumps(fields, sort_keys=True), now, normalise_key(key))
+            for key, digest, fields in records
+            if normalise_key(key)
+        ]
+        with self.conn:
+            self.conn.executemany("UPDATE seen SET content_hash = ?, field_hashes = ?, amended = ? WHERE key = ?", rows)
+
+    def set_sink_ids(self, records):
+        """Remember (key, sink, id) for the records we made for a tender, e.g. ("...", "hubspot", deal id)."""
+        rows = [
+            (normalise_key(key), sink, str(external_id))
+            for key, sink, external_id in records
+            if normalise_key(key)
+        ]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO sink_ids (key, sink, external_id) VALUES (?, ?, ?)", rows)
+
+    def sink_ids_many(self, keys):
+        """{key (as passed in): {sink: id}} for the keys we've made records for."""
+        by_norm = {}
+        for key in keys:
+            norm = normalise_key(key)
+            if norm:
+                by_norm.setdefault(norm, []).append(key)
+
+        found = {}
+        for batch in _batches(list(by_norm)):
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT key, sink, external_id FROM sink_ids WHERE key IN ({placeholders})", batch
+            )
+            for norm, sink, external_id in rows:
+                for key in by_norm[norm]:
+                    found.setdefault(key, {})[sink] = external_id
+        return found
+
+    def _row_count(self):
+        value = self._get_meta("row_count")
+        if value is None:
+            count = self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+            self._set_meta("row_count", count)
+            return count
+        return int(value)
+
+    def _open_bloom(self, bloom_path):
+        """
+        Open the bloom filter, rebuilding it if it's missing, out of date
+        (someone wrote to the store without it) or over capacity.
+        """
+        try:
+            bloom = BloomFilter(bloom_path)
+        except (FileNotFoundError, ValueError):
+            return self._build_bloom(bloom_path)
+
+        row_count = self._row_count()
+        if bloom.count != row_count or row_count > bloom.capacity:
+            bloom.close()
+            return self._build_bloom(bloom_path)
+        return bloom
+
+    def _build_bloom(self, bloom_path):
+        # counted before the keys are read: rows written in between make the
+        # count too low, which only means another rebuild, never a missing key
+        row_count = self._row_count()
+        bloom = BloomFilter.create(bloom_path, capacity=max(2 * row_count, MIN_BLOOM_CAPACITY))
+        bloom.add_many(key for (key,) in self.conn.execute("SELECT key FROM seen"))
+        bloom.set_count(row_count)
+        bloom.flush()
+        return bloom
+
+    def _get_meta(self, name):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, str(value)))
+
+    def compact(self):
+        """Fold the WAL back into the database, reclaim free pages and rebuild the bloom filter."""
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("VACUUM")
+        self._set_meta("last_compacted", time.time())
+        if self.bloom is not None:
+            bloom_path = self.bloom.path
+            self.bloom.close()
+            self.bloom = self._build_bloom(bloom_path)
+
+    def maybe_compact(self, interval=COMPACT_INTERVAL):
+        """Compact if it hasn't been done in the last interval seconds. Returns True if it ran."""
+        last = self._get_meta("last_compacted")
+        if last is not None and time.time() - float(last) < interval:
+            return False
+        self.compact()
+        return True
+
+    def migrate_legacy_file(self, path, source):
+        """
+        One-off import of an old processed_links.txt (one URL per line)
+        or seen_tenders.json (list of tender dicts). After that it's never read again.
+        """
+        marker = f"migrated:{os.path.abspath(path)}"
+        if not os.path.exists(path):
+            return 0
+        if self._get_meta(marker) is not None:
+            return 0
+
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".json"):
+                records = [
+                    (t.get("url") or t.get("title"), content_hash(t.get("title", ""), t.get("description", "")))
+                    for t in json.load(f)
+                ]
+            else:
+                records = [line.strip() for line in f if line.strip()]
+
+        added = self.add_many(records, source=source)
+        self._set_meta(marker, time.time())
+        return added
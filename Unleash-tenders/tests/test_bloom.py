@@ -0,0 +1,41 @@
+import pytest
+
+from bloom import BloomFilter
+
+
+def test_no_false_negatives(tmp_path):
+    bloom = BloomFilter.create(str(tmp_path / "seen.bloom"), capacity=1000)
+    keys = [f"https://www.tenders.gov.au/atm/show/{i}" for i in range(1000)]
+    bloom.add_many(keys)
+    assert all(key in bloom for key in keys)
+    # sized for a 0.1% false positive rate, allow some slack
+    false_positives = sum(f"https://example.com/{i}" in bloom for i in range(10_000))
+    assert false_positives < 50
+    bloom.close()
+
+
+def test_count_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "seen.bloom")
+    first = BloomFilter.create(path, capacity=100)
+    second = BloomFilter(path)
+    assert first.count == second.count == 0
+
+    first.add_many(["a"])
+    first.set_count(1)
+    # the other mapping sees the bits and the count straight away
+    assert "a" in second
+    assert second.count == 1
+    first.close()
+    second.close()
+
+    reopened = BloomFilter(path)
+    assert reopened.count == 1
+    assert reopened.capacity == 100
+    reopened.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.bloom"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        BloomFilter(str(path))
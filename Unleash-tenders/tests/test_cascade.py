@@ -0,0 +1,50 @@
+from cascade import COUNTRY, KEYWORD_ACCEPT, KEYWORD_REJECT, MODEL, REJECT_LIST, STAGES, Cascade
+from profiles import Profile, ProfileRegistry
+
+
+def cascade(countries=("Australia",)):
+    registry = ProfileRegistry([
+        Profile("unleash", {"drone": 5}, min_score=5, accept_score=10, reject_score=5, use_model=True,
+                sinks=["hubspot", "notion"]),
+    ])
+    return Cascade(registry, countries=countries, reject={"agency": {"Department of Nope"}})
+
+
+def tender(country="australia", agency="Department of Testing"):
+    return {"countryname": country, "agency": agency}
+
+
+def test_stages_in_order():
+    c = cascade()
+    # the cheapest stage that can decide a tender does, whatever the later ones would say
+    assert c.stage(tender(country="France"), [20]) == COUNTRY
+    assert c.stage(tender(country="France", agency="department of nope "), [20]) == COUNTRY
+    assert c.stage(tender(agency=" Department of NOPE"), [20]) == REJECT_LIST
+    assert c.stage(tender(), [10]) == KEYWORD_ACCEPT
+    assert c.stage(tender(), [4]) == KEYWORD_REJECT
+    assert c.stage(tender(), [5]) == MODEL
+    # no country check (the RSS feeds don't say)
+    assert cascade(countries=None).stage(tender(country=""), [10]) == KEYWORD_ACCEPT
+
+
+def test_triage_counts_each_stage():
+    c = cascade()
+    tenders = [tender(country="France"), tender(agency="Department of Nope"), tender(), tender(), tender(), tender()]
+    stages = c.triage(tenders, [[20], [20], [10], [4], [5], [7]])
+    assert stages == [COUNTRY, REJECT_LIST, KEYWORD_ACCEPT, KEYWORD_REJECT, MODEL, MODEL]
+    assert dict(c.counts) == {COUNTRY: 1, REJECT_LIST: 1, KEYWORD_ACCEPT: 1, KEYWORD_REJECT: 1, MODEL: 2}
+    c.triage([tender()], [[6]])
+    assert c.counts[MODEL] == 3
+    assert c.summary().endswith("(4 of 7 decided without the model)")
+    assert all(stage in c.summary() for stage in STAGES)
+
+
+def test_route_only_for_tenders_that_got_through():
+    c = cascade()
+    assert c.route(COUNTRY, [20]) == ([], [])
+    assert c.route(REJECT_LIST, [20], prediction=True) == ([], [])
+    assert c.route(KEYWORD_REJECT, [4], prediction=True) == ([], [])
+    matched, sinks = c.route(KEYWORD_ACCEPT, [10])
+    assert [p.name for p in matched] == ["unleash"] and sinks == ["hubspot", "notion"]
+    assert c.route(MODEL, [6], prediction=False) == ([], [])
+    assert [p.name for p in c.route(MODEL, [6], prediction=True)[0]] == ["unleash"]
@@ -0,0 +1,164 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix, hstack
+
+import compact_model
+
+joblib = pytest.importorskip("joblib")
+pytest.importorskip("sklearn")
+
+# the pickles were made with an older sklearn, it warns on every load
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (pickles, checked-in export, tenders file, texts per tender for each vectorizer)
+PIPELINES = {
+    "predictor": (
+        ("model.pkl", "desc_vectorizer.pkl", "other_vectorizer.pkl"),
+        "model.npz",
+        "tenders_data.json",
+        lambda t: (t.get("description", ""), t.get("category", "") + " " + t.get("agency", "")),
+    ),
+    "RSSmodel": (
+        ("RSS_tender_relevance_model.pkl", "RSS_tfidf_vectorizer.pkl"),
+        "RSS_model.npz",
+        "RSS_tenders_data.json",
+        lambda t: (t.get("Title", "") + " " + t.get("description", ""),),
+    ),
+}
+
+
+def module_path(name):
+    return os.path.join(MODULE_DIR, name)
+
+
+@pytest.fixture(scope="module", params=sorted(PIPELINES))
+def pipeline(request):
+    pickles, npz, tenders_file, fields = PIPELINES[request.param]
+    model, *vectorizers = [joblib.load(module_path(name)) for name in pickles]
+    with open(module_path(tenders_file), "r", encoding="utf-8") as f:
+        tenders = json.load(f)
+    texts = [fields(t) for t in tenders]
+    extras = [(float(i % 20),) for i in range(len(tenders))]
+    return model, vectorizers, module_path(npz), texts, extras
+
+
+def matrix(vectorizers, texts, extras):
+    parts = [v.transform(column) for v, column in zip(vectorizers, zip(*texts))]
+    parts.append(csr_matrix(np.asarray(extras, dtype=float)))
+    return hstack(parts).tocsr()
+
+
+def assert_same_pipeline(loaded, model, vectorizers, texts, extras):
+    compact, *compact_vectorizers = loaded
+    assert len(compact_vectorizers) == len(vectorizers)
+    for compact_vectorizer, vectorizer, column in zip(compact_vectorizers, vectorizers, zip(*texts)):
+        assert compact_vectorizer.vocabulary_ == vectorizer.vocabulary_
+        expected = vectorizer.transform(column)
+        got = compact_vectorizer.transform(column)
+        # same maths in the same order, so bit-for-bit
+        assert (got != expected).nnz == 0
+
+    X = matrix(vectorizers, texts, extras)
+    np.testing.assert_array_equal(compact.predict(X), model.predict(X))
+    np.testing.assert_allclose(compact.predict_proba(X), model.predict_proba(X), rtol=0, atol=1e-12)
+
+
+def test_export_load_round_trip(pipeline, tmp_path):
+    model, vectorizers, _, texts, extras = pipeline
+    path = tmp_path / "model.npz"
+    manifest = compact_model.export(path, model, *vectorizers)
+    assert manifest["extra_features"] == 1
+    assert_same_pipeline(compact_model.load(path), model, vectorizers, texts, extras)
+
+
+def test_checked_in_export_matches_pickles(pipeline):
+    model, vectorizers, npz, texts, extras = pipeline
+    assert_same_pipeline(compact_model.load(npz), model, vectorizers, texts, extras)
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "other.npz"
+    np.savez(path, manifest=np.frombuffer(json.dumps({"format": "something-else"}).encode("utf-8"), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        compact_model.load(path)
+
+
+def test_export_rejects_unsupported_vectorizers(tmp_path):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    texts = ["supply of software", "cleaning services", "software licences", "office cleaning"]
+    vectorizer = TfidfVectorizer(stop_words="english").fit(texts)
+    model = LogisticRegression().fit(vectorizer.transform(texts), [1, 0, 1, 0])
+    with pytest.raises(ValueError):
+        compact_model.export(tmp_path / "model.npz", model, vectorizer)
+
+
+def test_linear_scorer_matches_predict_proba(pipeline):
+    model, vectorizers, _, texts, extras = pipeline
+    scorer = compact_model.LinearScorer(model, *vectorizers)
+    X = matrix(vectorizers, texts, extras)
+    np.testing.assert_allclose(scorer.predict_proba_many(texts, extras), model.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(scorer.predict_many(texts, extras), model.predict(X))
+
+
+def test_linear_scorer_from_compact_export(pipeline):
+    model, vectorizers, npz, texts, extras = pipeline
+    from_pickles = compact_model.LinearScorer(model, *vectorizers)
+    from_export = compact_model.LinearScorer(*compact_model.load(npz))
+    np.testing.assert_allclose(
+        from_export.predict_proba_many(texts, extras), from_pickles.predict_proba_many(texts, extras), rtol=0, atol=1e-12
+    )
+
+
+def test_tender_analyzer_scores_like_the_scorer(pipeline):
+    from text_analysis import TenderAnalyzer
+
+    model, vectorizers, _, texts, extras = pipeline
+    scorer = compact_model.LinearScorer(model, *vectorizers)
+    fields = [lambda t, i=i: t[i] for i in range(len(vectorizers))]
+    analyzer = TenderAnalyzer(fields, keyword_fields=None, scorer=scorer)
+    for document, extra in zip(texts, extras):
+        analysis = analyzer.analyse(document)
+        assert analyzer.decision(analysis, extra) == pytest.approx(scorer.decision(document, extra), abs=1e-12)
+
+
+def test_explain_ids_ranks_positive_contributions(pipeline):
+    model, vectorizers, _, texts, extras = pipeline
+    scorer = compact_model.LinearScorer(model, *vectorizers)
+    for document in texts[:50]:
+        explanation = scorer.explain_ids([scorer.ids(tokens, i) for i, tokens in enumerate(scorer.tokens(document))])
+        values = [value for _, value in explanation]
+        assert len(values) <= 5
+        assert all(value > 0 for value in values)
+        assert values == sorted(values, reverse=True)
+
+
+def test_load_pipeline_uses_the_export_of_these_pickles(tmp_path):
+    import shutil
+
+    import model_store
+
+    pickles, _, _, _ = PIPELINES["RSSmodel"]
+    paths = [str(tmp_path / name) for name in pickles]
+    for name, path in zip(pickles, paths):
+        shutil.copy(module_path(name), path)
+    compact_path = str(tmp_path / "RSS_model.npz")
+    model, *vectorizers = [joblib.load(p) for p in paths]
+    compact_model.export(compact_path, model, *vectorizers, sources=paths)
+
+    # older than the pickles, the way a fresh clone can leave it
+    os.utime(compact_path, (0, 0))
+    loaded = model_store.load_pipeline(paths, compact_path)
+    assert isinstance(loaded[0], compact_model.CompactLogisticRegression)
+
+    # retrained pickle, the export is out of date whatever its mtime says
+    joblib.dump(model, paths[0], compress=3)
+    os.utime(compact_path)
+    loaded = model_store.load_pipeline(paths, compact_path)
+    assert not isinstance(loaded[0], compact_model.CompactLogisticRegression)
@@ -0,0 +1,45 @@
+import hashlib
+
+from feed_cache import FeedCache
+
+URL = "https://www.tenders.gov.au/public_data/rss/rss.xml"
+BODY = b"<rss><channel><item><title>Cloud hosting</title></item></channel></rss>"
+
+
+def test_conditional_headers_and_unchanged_body(tmp_path):
+    path = str(tmp_path / "logs" / "feed_cache.json")
+    cache = FeedCache(path)
+    assert cache.request_headers(URL) == {}
+    assert not cache.is_unchanged(URL, 200, BODY)
+
+    cache.remember(URL, {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jul 2024 00:00:00 GMT"}, BODY)
+    cache.save()
+
+    cache = FeedCache(path)
+    assert cache.request_headers(URL) == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jul 2024 00:00:00 GMT"}
+    assert cache.is_unchanged(URL, 304)
+    assert cache.is_unchanged(URL, 200, BODY)
+    assert not cache.is_unchanged(URL, 200, BODY + b" ")
+
+
+def test_streamed_digest_matches_body(tmp_path):
+    # RSS/main.py hashes the body chunk by chunk instead of keeping it
+    digest = hashlib.sha256()
+    for start in range(0, len(BODY), 16):
+        digest.update(BODY[start:start + 16])
+
+    cache = FeedCache(str(tmp_path / "feed_cache.json"))
+    cache.remember(URL, {}, digest=digest.hexdigest())
+    assert cache.is_unchanged(URL, 200, BODY)
+    assert cache.is_unchanged(URL, 200, digest=hashlib.sha256(BODY).hexdigest())
+
+
+def test_forget_and_unreadable_file(tmp_path):
+    path = tmp_path / "feed_cache.json"
+    path.write_text("{not json")
+    cache = FeedCache(str(path))
+    assert cache.entries == {}
+    cache.remember(URL, {"ETag": '"v1"'}, BODY)
+    cache.forget(URL)
+    assert cache.request_headers(URL) == {}
+    assert not cache.is_unchanged(URL, 200, BODY)
@@ -0,0 +1,83 @@
+import html
+import json
+import os
+import random
+
+import pytest
+
+import html_text
+from html_text import html_to_text
+
+BeautifulSoup = pytest.importorskip("bs4").BeautifulSoup
+
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DESCRIPTION_LIMIT = 2000
+
+# bits of html the fuzz cases are put together from: the feed's usual tags,
+# void and skipped tags, stray / unbalanced end tags, entities with and
+# without their ;, numeric references bs4 has to repair, comments, CDATA
+PIECES = [
+    "<p>", "</p>", "<b>", "</b>", "<i>", "</i>", "<div class='x'>", "</div>", "<span>", "</span>",
+    "<br>", "<br/>", "</br>", "<img src='a.png'>", "</img>", "<hr>", "<wbr>",
+    "<script>", "</script>", "<style>", "</style>", "<template>", "</template>",
+    "<ruby>", "</ruby>", "<rt>", "</rt>", "<rp>", "</rp>", "<a href='https://example.com/?a=1&b=2'>", "</a>",
+    "&amp;", "&lt;", "&gt;", "&nbsp;", "&eacute;", "&copy", "&amp", "&notanentity;", "&",
+    "&#65;", "&#x41;", "&#X6a;", "&#150;", "&#x80;", "&#0;", "&#1114112;", "&#xD800;", "&#12abc", "&#x4gz", "&#;",
+    "<!-- a comment -->", "<!DOCTYPE html>", "<![CDATA[ raw <b> text ]]>", "<?php echo 1 ?>",
+    " ", "  ", "\n", "\t", "tender", "Supply of IT services", "x", "42", "a < b", "c > d", "é", "—",
+]
+
+
+def soup_text(fragment, max_chars=None):
+    return BeautifulSoup(fragment, "html.parser").get_text(strip=True)[:max_chars]
+
+
+def fuzz_fragments(count, seed=20240601):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(PIECES) for _ in range(rng.randint(1, 25)))
+
+
+@pytest.fixture(autouse=True)
+def cold_cache():
+    html_text._cache.clear()
+    yield
+    html_text._cache.clear()
+
+
+def test_matches_beautifulsoup_on_fuzzed_fragments():
+    mismatches = []
+    for fragment in fuzz_fragments(3000):
+        html_text._cache.clear()
+        if html_to_text(fragment) != soup_text(fragment):
+            mismatches.append(fragment)
+    assert mismatches == []
+
+
+def test_matches_beautifulsoup_with_max_chars():
+    for fragment in fuzz_fragments(500, seed=7):
+        for max_chars in (1, 5, 20):
+            html_text._cache.clear()
+            assert html_to_text(fragment, max_chars) == soup_text(fragment, max_chars), fragment
+
+
+def test_matches_beautifulsoup_on_sample_descriptions():
+    # wrapped the way the tenders.gov.au feed sends them
+    for name in ("RSS_tenders_data.json", "tenders_data.json"):
+        with open(os.path.join(MODULE_DIR, name), "r", encoding="utf-8") as f:
+            tenders = json.load(f)
+        for tender in tenders:
+            description = f"<p>{html.escape(tender.get('description', ''))}</p>"
+            assert html_to_text(description, DESCRIPTION_LIMIT) == soup_text(description, DESCRIPTION_LIMIT)
+
+
+def test_empty_input():
+    assert html_to_text("") == ""
+    assert html_to_text(None) == ""
+
+
+def test_cache_is_keyed_by_max_chars():
+    fragment = "<p>Supply of IT services</p>"
+    assert html_to_text(fragment, 6) == "Supply"
+    assert html_to_text(fragment) == "Supply of IT services"
+    assert html_to_text(fragment, 6) == "Supply"
@@ -0,0 +1,57 @@
+import random
+
+from keyword_matcher import KeywordMatcher, batch_keyword_scores, keyword_matcher, tender_text
+from keywords_file import keywords
+
+# overlapping on purpose: prefixes, suffixes, one inside another, shared middles
+WEIGHTS = {"stream": 5, "streaming": 5, "real-time": 4, "time": 1, "ai": 5, "maintain": 2, "it": 4, "ml": 3,
+           "drone": 5, "drones": 5, "uav": 4, "aaa": 1, "aa": 1, "a": 1}
+
+
+def fuzz_texts(count, seed=12):
+    rng = random.Random(seed)
+    pieces = list(WEIGHTS) + [" ", "-", "x", "e", "real", "stre", "dron", "maint", "ua"]
+    for _ in range(count):
+        yield "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+
+
+def test_find_matches_substring_search():
+    matcher = KeywordMatcher(WEIGHTS)
+    for text in fuzz_texts(2000):
+        assert matcher.find(text) == [k for k in WEIGHTS if k in text], text
+
+
+def test_overlapping_keywords_all_count():
+    matcher = KeywordMatcher(WEIGHTS)
+    assert matcher.find("live streaming in real-time") == ["stream", "streaming", "real-time", "time", "a"]
+    assert matcher.find("maintain") == ["ai", "maintain", "a"]
+    assert matcher.score("drones") == (10, ["drone", "drones"])
+
+
+def test_find_first_is_the_earliest_match():
+    matcher = KeywordMatcher(WEIGHTS)
+    for text in fuzz_texts(2000, seed=3):
+        first = matcher.find_first(text)
+        found = [k for k in WEIGHTS if k in text]
+        if not found:
+            assert first is None
+            continue
+        # the keyword whose match ends first
+        assert first in found
+        assert text.index(first) + len(first) == min(text.index(k) + len(k) for k in found), text
+
+
+def test_batch_scores_match_single_scores():
+    texts = list(fuzz_texts(200, seed=5))
+    matcher = KeywordMatcher(WEIGHTS)
+    scores, hits = matcher.batch_scores(texts, return_hits=True)
+    assert list(scores) == [matcher.score(text)[0] for text in texts]
+    assert hits.shape == (len(texts), len(WEIGHTS))
+
+
+def test_shared_matcher_scores_tenders_like_substring_search():
+    tender = {"title": "Drone inspection", "description": "Real-time video analytics for IT infrastructure"}
+    text = tender_text(tender)
+    expected = sum(weight for keyword, weight in keywords.items() if keyword in text)
+    assert keyword_matcher.score(text)[0] == expected
+    assert list(batch_keyword_scores([tender])) == [expected]
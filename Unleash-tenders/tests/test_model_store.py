@@ -0,0 +1,49 @@
+import os
+import shutil
+
+import pytest
+
+import model_store
+
+joblib = pytest.importorskip("joblib")
+pytest.importorskip("sklearn")
+
+# the pickles were made with an older sklearn, it warns on every load
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+MODULE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def pickle_path(tmp_path):
+    path = str(tmp_path / "RSS_tender_relevance_model.pkl")
+    shutil.copy(os.path.join(MODULE_DIR, "RSS_tender_relevance_model.pkl"), path)
+    return path
+
+
+def test_copy_is_made_once_and_memory_mapped(pickle_path):
+    copy_path = model_store.mmap_path(pickle_path)
+    model = model_store.load_artifact(pickle_path)
+    assert os.path.exists(copy_path)
+    written = os.stat(copy_path).st_mtime_ns
+
+    # a checkout or touch gives the pickle a newer mtime, the copy is still good
+    os.utime(pickle_path)
+    again = model_store.load_artifact(pickle_path)
+    assert os.stat(copy_path).st_mtime_ns == written
+    assert (again.coef_ == model.coef_).all()
+
+
+def test_copy_is_remade_when_the_pickle_changes(pickle_path):
+    model = model_store.load_artifact(pickle_path)
+    copy_path = model_store.mmap_path(pickle_path)
+
+    retrained = joblib.load(pickle_path)
+    retrained.coef_ = retrained.coef_ * 2
+    joblib.dump(retrained, pickle_path)
+    # older than the copy, the mtime can't be what gives it away
+    os.utime(pickle_path, (0, 0))
+    assert os.path.getmtime(copy_path) > os.path.getmtime(pickle_path)
+
+    loaded = model_store.load_artifact(pickle_path)
+    assert (loaded.coef_ == model.coef_ * 2).all()
@@ -0,0 +1,53 @@
+import time
+
+from near_dup import BANDS, NearDuplicateIndex
+
+TITLE = "Provision of drone inspection services"
+DESCRIPTION = (
+    "The Department seeks a supplier to provide remotely piloted aircraft inspections "
+    "of transmission towers, bridges and other critical infrastructure across Queensland."
+)
+OTHER_DESCRIPTION = "Cleaning and waste removal for the regional office buildings, including windows and carpets."
+
+
+def open_index(tmp_path, **options):
+    return NearDuplicateIndex(str(tmp_path / "seen.db"), **options)
+
+
+def test_finds_reworded_copies_only(tmp_path):
+    with open_index(tmp_path) as index:
+        index.add("https://a", TITLE, DESCRIPTION)
+        key, score = index.find("Provision of Drone Inspection Services", "<p>" + DESCRIPTION + "</p>")
+        assert key == "https://a" and score >= index.threshold
+        assert index.find("Office cleaning", OTHER_DESCRIPTION) is None
+        # a tender doesn't match itself
+        assert index.find(TITLE, DESCRIPTION, exclude_key="https://a") is None
+
+
+def test_check_and_add(tmp_path):
+    with open_index(tmp_path) as index:
+        assert index.check_and_add("https://a", TITLE, DESCRIPTION) is None
+        assert index.check_and_add("https://b", TITLE, DESCRIPTION)[0] == "https://a"
+        # the duplicate isn't indexed, only the first copy is
+        assert index.find(TITLE, DESCRIPTION, exclude_key="https://a") is None
+
+
+def test_amended_text_replaces_the_old_one(tmp_path):
+    with open_index(tmp_path) as index:
+        index.add("https://a", TITLE, DESCRIPTION)
+        index.add("https://a", "Office cleaning", OTHER_DESCRIPTION)
+        assert index.find(TITLE, DESCRIPTION) is None
+        assert index.find("Office cleaning", OTHER_DESCRIPTION)[0] == "https://a"
+        # no band rows left over from the old text
+        rows = index.conn.execute("SELECT COUNT(*) FROM lsh WHERE key = 'https://a'").fetchone()[0]
+        assert rows == BANDS
+
+
+def test_prune_drops_old_tenders(tmp_path):
+    with open_index(tmp_path, recent_days=1) as index:
+        index.add("https://a", TITLE, DESCRIPTION)
+        with index.conn:
+            index.conn.execute("UPDATE minhash SET added = ?", (time.time() - 2 * 24 * 60 * 60,))
+        assert index.find(TITLE, DESCRIPTION) is None
+        index.prune()
+        assert index.conn.execute("SELECT COUNT(*) FROM lsh").fetchone()[0] == 0
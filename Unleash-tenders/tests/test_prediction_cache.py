@@ -0,0 +1,80 @@
+import time
+
+from prediction_cache import PredictionCache, file_fingerprint, keywords_fingerprint
+
+
+def open_cache(tmp_path, model_hash="model-1", profile_hash="profile-1", **options):
+    return PredictionCache(model_hash, profile_hash, path=str(tmp_path / "seen.db"), **options)
+
+
+def test_decisions_only_computes_misses(tmp_path):
+    computed = []
+
+    def compute(indices):
+        computed.append(list(indices))
+        return [float(i) for i in indices]
+
+    with open_cache(tmp_path) as cache:
+        assert cache.decisions(["a", "b"], compute) == [0.0, 1.0]
+        assert cache.decisions(["b", "c", "a"], compute) == [1.0, 1.0, 0.0]
+        assert computed == [[0, 1], [1]]
+        assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_decisions_last_between_runs(tmp_path):
+    with open_cache(tmp_path) as cache:
+        cache.put_many({"a": 0.5})
+    with open_cache(tmp_path) as cache:
+        assert cache.get_many(["a", "b"]) == {"a": 0.5}
+
+
+def test_other_models_and_profiles_dont_match(tmp_path):
+    with open_cache(tmp_path) as cache:
+        cache.put_many({"a": 0.5})
+    with open_cache(tmp_path, model_hash="model-2") as cache:
+        assert cache.get_many(["a"]) == {}
+    with open_cache(tmp_path, profile_hash="profile-2") as cache:
+        assert cache.get_many(["a"]) == {}
+
+
+def test_memory_is_bounded_and_falls_back_to_disk(tmp_path):
+    with open_cache(tmp_path, memory_size=2) as cache:
+        cache.put_many({"a": 1.0, "b": 2.0, "c": 3.0})
+        assert len(cache._memory) == 2
+        # filling memory_size pending decisions writes them out
+        assert cache._pending == {}
+        assert cache.get_many(["a", "b", "c"]) == {"a": 1.0, "b": 2.0, "c": 3.0}
+
+
+def test_prune_drops_unused_entries(tmp_path):
+    with open_cache(tmp_path) as cache:
+        cache.put_many({"old": 1.0, "new": 2.0})
+        cache.flush()
+        with cache.conn:
+            cache.conn.execute("UPDATE predictions SET last_used = ? WHERE text_hash = 'old'", (time.time() - 10 * 86400,))
+        assert cache.prune(max_age_days=5) == 1
+    with open_cache(tmp_path) as cache:
+        assert cache.get_many(["old", "new"]) == {"new": 2.0}
+
+
+def test_fingerprints(tmp_path):
+    assert keywords_fingerprint({"cloud": 3, "software": 2}) == keywords_fingerprint({"software": 2, "cloud": 3})
+    assert keywords_fingerprint({"cloud": 3}) != keywords_fingerprint({"cloud": 2})
+
+    model = tmp_path / "model.npz"
+    model.write_bytes(b"one")
+    missing = str(tmp_path / "missing.pkl")
+    before = file_fingerprint([str(model), missing])
+    assert before == file_fingerprint([str(model)])
+    model.write_bytes(b"two")
+    assert file_fingerprint([str(model)]) != before
+
+
+def test_cache_key_ignores_what_the_vectorizers_cant_see():
+    from text_analysis import TenderAnalyzer
+
+    analyzer = TenderAnalyzer([lambda t: t["description"]])
+    key = analyzer.fingerprint(analyzer.analyse({"description": "Cloud  hosting\n services"}), (3,))
+    assert key == analyzer.fingerprint(analyzer.analyse({"description": "cloud hosting services"}), (3.0,))
+    assert key != analyzer.fingerprint(analyzer.analyse({"description": "cloud hosting services"}), (4,))
+    assert key != analyzer.fingerprint(analyzer.analyse({"description": "cloud hosting"}), (3,))
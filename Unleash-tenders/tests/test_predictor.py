@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def predictor(tmp_path_factory):
+    # the module reads its settings from the environment and makes its log directory on import
+    pytest.importorskip("dotenv")
+    cwd = os.getcwd()
+    os.environ.setdefault("NOTION_DB_ID", "test")
+    os.chdir(tmp_path_factory.mktemp("predictor"))
+    try:
+        import predictor
+    finally:
+        os.chdir(cwd)
+    return predictor
+
+
+def fake_api(total, cap, calls):
+    """fetch_tender_page for an API with total tenders that sends back at most cap per request."""
+    def fetch_tender_page(from_index, to_index, tender_type="Live"):
+        calls.append((from_index, to_index))
+        end = min(to_index, total, from_index + cap)
+        tenders = [{"originalsource": f"https://example.com/tender/{i}"} for i in range(from_index, end)]
+        return tenders, 0.0
+    return fetch_tender_page
+
+
+@pytest.mark.parametrize("total, cap", [(0, 100), (37, 100), (1000, 100), (1000, 1000), (250, 30)])
+def test_fetch_all_tenders_gets_every_page(predictor, monkeypatch, total, cap):
+    calls = []
+    monkeypatch.setattr(predictor, "fetch_tender_page", fake_api(total, cap, calls))
+    tenders = predictor.fetch_all_tenders()
+    assert [t["originalsource"] for t in tenders] == [f"https://example.com/tender/{i}" for i in range(total)]
+    # once a capped page has been seen, the windows don't grow past the cap again
+    last_start, last_end = calls[-1]
+    assert last_end - last_start <= max(cap, predictor.PAGE_SIZE)
@@ -0,0 +1,69 @@
+import pytest
+
+from profiles import Profile, ProfileRegistry, profile_registry, rss_profile_registry
+from profiles_file import profiles
+
+
+def registry():
+    return ProfileRegistry([
+        Profile("drones", {"drone": 6, "inspection": 5}, min_score=5, accept_score=10, use_model=True,
+                sinks=["hubspot", "notion"]),
+        Profile("water", {"stormwater": 6, "inspection": 5}, min_score=5, accept_score=10, reject_score=5,
+                sinks=["notion", "email"]),
+    ])
+
+
+def test_scores_every_profile_in_one_pass():
+    scores = registry().score_texts(["drone inspection of stormwater drains", "office cleaning", "drone hire"])
+    assert scores.tolist() == [[11, 11], [0, 0], [6, 0]]
+
+
+def test_route_sends_a_tender_to_every_matching_profile_once():
+    reg = registry()
+    matched, sinks = reg.route([11, 11])
+    assert [p.name for p in matched] == ["drones", "water"]
+    assert sinks == ["hubspot", "notion", "email"]
+
+    # only the profile that uses the model can be matched by it
+    matched, sinks = reg.route([6, 6], prediction=True)
+    assert [p.name for p in matched] == ["drones"]
+    assert sinks == ["hubspot", "notion"]
+    assert reg.route([6, 6], prediction=False) == ([], [])
+
+
+def test_bands():
+    reg = registry()
+    assert reg.needs_model([6, 0])
+    assert not reg.needs_model([11, 0])
+    assert [p.name for p in reg.candidates([6, 4])] == ["drones"]
+    assert reg["water"].is_rejected(4)
+    assert not reg["drones"].is_rejected(0)
+
+
+def test_matched_keywords():
+    reg = registry()
+    _, hits = reg.score_texts(["stormwater inspection"], return_hits=True)
+    # in the order the keywords were first seen across the profiles
+    assert reg.matched_keywords(hits[0], reg["water"]) == ["inspection (x5)", "stormwater (x6)"]
+    assert reg.matched_keywords(hits[0], reg["drones"]) == ["inspection (x5)"]
+
+
+def test_names_are_unique():
+    reg = registry()
+    with pytest.raises(ValueError):
+        reg.register(Profile("drones", {"uav": 1}))
+    with pytest.raises(KeyError):
+        reg["nope"]
+
+
+def test_rss_accept_override():
+    # RSSmodel needs more than 10 to post without the model, the predictor 10
+    assert profile_registry["unleash"].accept_score == 10
+    assert rss_profile_registry["unleash"].accept_score == 11
+    assert profile_registry["unleash"].is_match(10)
+    assert not rss_profile_registry["unleash"].is_match(10)
+    assert rss_profile_registry["unleash"].needs_model(10)
+    assert rss_profile_registry["unleash"].is_match(11)
+    # the overrides don't leak into the config
+    assert ProfileRegistry.from_config(profiles)["unleash"].accept_score == 10
+    assert ProfileRegistry.from_config(profiles, source="other")["unleash"].accept_score == 10
@@ -0,0 +1,133 @@
+import pytest
+
+from seen_store import AMENDED, NEW, UNCHANGED, SeenStore, field_hashes
+
+FIELDS = ("title", "description", "close_date")
+
+
+@pytest.fixture(params=["plain", "bloom"])
+def open_store(request, tmp_path):
+    """Opens the store at tmp_path the way each kind of caller does."""
+    options = {
+        "plain": {},
+        "bloom": {"bloom_path": str(tmp_path / "seen.bloom")},
+    }[request.param]
+    stores = []
+
+    def open_store():
+        store = SeenStore(str(tmp_path / "seen.db"), **options)
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        store.close()
+
+
+def tender(title, description="Supply of IT services", close_date="2024-07-01"):
+    return {"title": title, "description": description, "close_date": close_date}
+
+
+def test_add_and_contains(open_store):
+    store = open_store()
+    assert store.contains_many(["https://a", "https://b"]) == set()
+    assert store.add_many(["https://a", "https://b"], source="rss") == 2
+    assert store.add_many(["https://b", "https://c"], source="rss") == 1
+    # keys are compared trimmed and lower-case, and come back as passed in
+    assert store.contains_many([" HTTPS://A ", "https://c", "https://d"]) == {" HTTPS://A ", "https://c"}
+    assert "https://b" in store
+    assert "https://d" not in store
+
+
+def test_seen_keys_survive_reopening(open_store):
+    with open_store() as store:
+        store.add_many(["https://a"])
+    assert open_store().contains_many(["https://a", "https://b"]) == {"https://a"}
+
+
+def test_classify_many(open_store):
+    store = open_store()
+    original = tender("Cloud hosting")
+    store.add_many([("https://a", "digest", field_hashes(original, FIELDS))])
+
+    extended = tender("Cloud hosting", close_date="2024-08-01")
+    result = store.classify_many([
+        ("https://a", field_hashes(original, FIELDS)),
+        ("HTTPS://A", field_hashes(extended, FIELDS)),
+        ("https://new", field_hashes(tender("Cleaning"), FIELDS)),
+    ])
+    assert result == {
+        "https://a": (UNCHANGED, []),
+        "HTTPS://A": (AMENDED, ["close_date"]),
+        "https://new": (NEW, []),
+    }
+
+    store.update_many([("https://a", "digest2", field_hashes(extended, FIELDS))])
+    assert store.classify_many([("https://a", field_hashes(extended, FIELDS))]) == {"https://a": (UNCHANGED, [])}
+
+
+def test_classify_many_stores_a_baseline_for_old_rows(open_store):
+    store = open_store()
+    # rows from before field hashes were kept
+    store.add_many(["https://a"])
+    hashes = field_hashes(tender("Cloud hosting"), FIELDS)
+    assert store.classify_many([("https://a", hashes)]) == {"https://a": (UNCHANGED, [])}
+
+    changed = field_hashes(tender("Cloud hosting", description="Amended"), FIELDS)
+    assert store.classify_many([("https://a", changed)]) == {"https://a": (AMENDED, ["description"])}
+
+
+def test_sink_ids(open_store):
+    store = open_store()
+    store.add_many(["https://a"])
+    store.set_sink_ids([("https://a", "hubspot", 123), ("https://a", "notion", "page-1")])
+    assert store.sink_ids_many(["HTTPS://A", "https://b"]) == {"HTTPS://A": {"hubspot": "123", "notion": "page-1"}}
+
+
+def test_bloom_catches_up_with_plain_writers(tmp_path):
+    db, bloom_path = str(tmp_path / "seen.db"), str(tmp_path / "seen.bloom")
+    with SeenStore(db, bloom_path=bloom_path) as store:
+        store.add_many(["a", "b"])
+    plain = SeenStore(db)
+    with_bloom = SeenStore(db, bloom_path=bloom_path)
+    # written without the filter while the bloom store has it open
+    plain.add_many(["e"])
+    with_bloom.add_many(["f"])
+    assert with_bloom.contains_many(["a", "e", "f", "g"]) == {"a", "e", "f"}
+    plain.close()
+    with_bloom.close()
+
+    with SeenStore(db, bloom_path=bloom_path) as store:
+        assert store.contains_many(["a", "e", "f", "g"]) == {"a", "e", "f"}
+
+
+def test_bloom_stores_sharing_a_filter(tmp_path):
+    db, bloom_path = str(tmp_path / "seen.db"), str(tmp_path / "seen.bloom")
+    first = SeenStore(db, bloom_path=bloom_path)
+    second = SeenStore(db, bloom_path=bloom_path)
+    first.add_many(["a"])
+    second.add_many(["b"])
+    first.add_many(["c"])
+    for store in (first, second):
+        assert store.contains_many(["a", "b", "c", "d"]) == {"a", "b", "c"}
+        assert store.bloom.count == 3
+    first.close()
+    second.close()
+
+
+def test_bloom_is_rebuilt_when_missing_or_over_capacity(tmp_path, monkeypatch):
+    import seen_store
+
+    monkeypatch.setattr(seen_store, "MIN_BLOOM_CAPACITY", 4)
+    db, bloom_path = str(tmp_path / "seen.db"), tmp_path / "seen.bloom"
+    with SeenStore(db, bloom_path=str(bloom_path)) as store:
+        store.add_many(["a", "b"])
+        capacity = store.bloom.capacity
+        store.add_many([f"k{i}" for i in range(10)])
+        assert store.bloom.capacity > capacity
+        assert store.contains_many(["a", "k9", "z"]) == {"a", "k9"}
+
+    bloom_path.unlink()
+    with SeenStore(db, bloom_path=str(bloom_path)) as store:
+        assert store.bloom.count == 12
+        assert store.contains_many(["a", "k9", "z"]) == {"a", "k9"}
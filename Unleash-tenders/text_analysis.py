@@ -0,0 +1,104 @@
+import hashlib
+import re
+
+# One analysis pass per tender: each piece of text is lower-cased once and
+# split into tokens once, and the unigrams/bigrams are turned into the
+# scorer's shared term ids. The keyword scorer gets the lower-cased text
+# (keywords are substring matches, so they need the text, not the tokens),
+# and the model and any explanation of its decision work from the term ids,
+# so no vectorizer tokenises the tender again.
+#
+# The lower-casing doesn't need the model, so it's done for every tender up
+# front (keyword scores, cache keys). Tokens and term ids are only worked out
+# the first time the model needs them, and kept on the analysis, so tenders
+# the cascade or the prediction cache settle are never tokenised at all.
+
+
+class TenderAnalysis:
+    """What the analysis pass produced for one tender."""
+
+    __slots__ = ("texts", "keyword_text", "term_ids")
+
+    def __init__(self, texts, keyword_text):
+        # lower-cased text of each model input
+        self.texts = texts
+        # lower-cased title + description, what keyword scores are worked out on
+        self.keyword_text = keyword_text
+        # one list of term ids per model input (see LinearScorer.ids), filled in on first use
+        self.term_ids = None
+
+
+class TenderAnalyzer:
+    """
+    Analysis pass for one model (a compact_model.LinearScorer).
+    fields has one function per model input, tender -> raw text,
+    in the same order as the scorer's vectorizers.
+    keyword_fields are the tender keys joined for the keyword text,
+    None if the keyword scores are worked out somewhere else.
+    The scorer can be left out (and set with use_scorer once the model is
+    loaded) if all that's needed for now is the keyword text.
+    """
+
+    def __init__(self, fields, keyword_fields=('title', 'description'), scorer=None):
+        self.fields = fields
+        self.keyword_fields = keyword_fields
+        self.scorer = None
+        self._token_re = None
+        if scorer is not None:
+            self.use_scorer(scorer)
+
+    def use_scorer(self, scorer):
+        if len(self.fields) != len(scorer.vectorizers):
+            raise ValueError(f"{len(self.fields)} fields for {len(scorer.vectorizers)} vectorizers")
+        patterns = {v.token_pattern for v in scorer.vectorizers}
+        if len(patterns) != 1 or not all(v.lowercase for v in scorer.vectorizers):
+            raise ValueError("the vectorizers have to share one lower-cased token pattern")
+        self.scorer = scorer
+        self._token_re = re.compile(patterns.pop())
+
+    def analyse(self, tender):
+        lowered = {}
+
+        def lower(text):
+            # the same text (e.g. the description) is only lower-cased once
+            if text not in lowered:
+                lowered[text] = text.lower()
+            return lowered[text]
+
+        texts = [lower(field(tender)) for field in self.fields]
+        keyword_text = None
+        if self.keyword_fields:
+            keyword_text = " ".join(lower(tender.get(key, '')) for key in self.keyword_fields)
+        return TenderAnalysis(texts, keyword_text)
+
+    def analyse_many(self, tenders):
+        return [self.analyse(tender) for tender in tenders]
+
+    def term_ids(self, analysis):
+        """Term ids of each model input, tokenised the first time they're asked for."""
+        if analysis.term_ids is None:
+            tokens = {}
+            term_ids = []
+            for vectorizer_index, text in enumerate(analysis.texts):
+                if text not in tokens:
+                    tokens[text] = self._token_re.findall(text)
+                term_ids.append(self.scorer.ids(tokens[text], vectorizer_index))
+            analysis.term_ids = term_ids
+        return analysis.term_ids
+
+    def fingerprint(self, analysis, extra=()):
+        """
+        Fingerprint of everything the model sees for this tender: its fields,
+        lower-cased with whitespace runs collapsed (the vectorizers can't see
+        the difference), and the extra features. Used as the prediction_cache key.
+        """
+        texts = [" ".join(text.split()) for text in analysis.texts]
+        texts += [repr(float(value)) for value in extra]
+        return hashlib.blake2b("\x1f".join(texts).encode("utf-8"), digest_size=16).hexdigest()
+
+    def decision(self, analysis, extra=()):
+        return self.scorer.decision_ids(self.term_ids(analysis), extra)
+
+    def explain(self, analysis, top=5):
+        """Top terms behind the model's decision, see LinearScorer.explain_ids."""
+        return self.scorer.explain_ids(self.term_ids(analysis), top)
@@ -8,6 +8,7 @@ import json
 import numpy as np
 import pickle
 import joblib
+from keyword_matcher import KeywordMatcher, batch_keyword_scores
 
 FILE_PATH = "/Users/tristanblackledge/TenderAusAgent/ai-agent-project/tender_scraper/tenders_data.json"
 
@@ -107,6 +108,9 @@ keywords = {
     "data": 3
 }
 
+# compiled once from the dict above
+keyword_matcher = KeywordMatcher(keywords)
+
 
 # load the data
 def load_tenders_data(file_path):
@@ -120,14 +124,9 @@ def calculate_keyword_scores(tender):
     """
     Calculates a score based on the predefined, weighted keyword dictionary.
     """
-    score = 0
-    # combine the text and dictionary
+    # combine the text and match every keyword in one pass
     text = (tender.get('title', '') + " " + tender.get('description', '')).lower()
-
-    for keyword, weight in keywords.items():
-        if keyword in text:
-            score += weight
-
+    score, _ = keyword_matcher.score(text)
     return score
 
 
@@ -137,7 +136,7 @@ def prepare_data(tenders):
     # Feature Extraction
     descriptions = [tender.get('description', '') for tender in tenders]
     categories_agencies = [tender.get('category', '') + " " + tender.get('agency', '') for tender in tenders]
-    keyword_scores = np.array([calculate_keyword_scores(tender) for tender in tenders]).reshape(-1, 1)
+    keyword_scores = batch_keyword_scores(tenders, keyword_matcher).reshape(-1, 1)
 
     # label extraction
     labels = np.array([tender.get('is_relevant') for tender in tenders])
@@ -0,0 +1 @@
+../../../Unleash-tenders/rss_stream.py
\ No newline at end of file
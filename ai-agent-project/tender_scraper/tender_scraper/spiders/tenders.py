@@ -1,5 +1,5 @@
 import scrapy
-import xml.etree.ElementTree as ET
+from tender_scraper.rss_stream import iter_items
 
 
 class TendersSpider(scrapy.Spider):
@@ -11,12 +11,16 @@ class TendersSpider(scrapy.Spider):
         """
         Parses the RSS feed XML to find links to full pages.
         """
-        root = ET.fromstring(response.text)
-
-        # Loop through each tender in the feed
-        for item in root.findall('.//item'):
-            title = item.find('title').text
-            link = item.find('link').text
+        # the http cache revalidated the feed (304), nothing new to parse
+        if "cached" in response.flags:
+            self.logger.info(f"RSS feed unchanged since last crawl: {response.url}")
+            return
+
+        # Loop through each tender in the feed (Scrapy has already downloaded
+        # the whole body, the parser just doesn't build a tree of it)
+        for item in iter_items(response.body, fields=("title", "link")):
+            title = item['title']
+            link = item['link']
 
             # Check for new tenders
             # simple, make this better later
@@ -0,0 +1,244 @@
+# historical backfill of the AusTender OCDS API
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from filter_ops import compile_filters, iter_filter_opportunities
+from ocds_stream import iter_releases
+from ocds_sync import date_shards, format_date, load_checkpoint, parse_date, save_checkpoint, shard_url
+from RSSmain import MY_COMPANY_FILTERS
+
+
+# When a new keyword profile is set up we need to re-scan years of contract
+# history. This splits the date range into day or week shards, and each
+# worker process streams one shard from the API (one connection each) and
+# filters it as it goes, so it scales with cores and only the matches ever
+# leave the worker. Matches are written to a local JSON-lines file in date
+# order. Finished shards are recorded in <out>.done.json, so a rerun after a
+# failure only does the shards that are missing, and records already in the
+# output file (by id) aren't written twice.
+#
+# The filters are the company ones (RSSmain) unless --filters gives a JSON
+# file of them, or --profile names a keyword profile (profiles_file): then
+# anything mentioning one of its keywords is scored with its weights, and
+# kept if that's at least the profile's min_score. Every record carries the
+# reasons it matched (and the profile and score, if there is one).
+
+SHARD_SIZES = {"day": timedelta(days=1), "week": timedelta(days=7)}
+OUTPUT_FILE = "backfill_matches.jsonl"
+# attempts per shard before it's given up on (until the next run)
+SHARD_ATTEMPTS = 3
+RETRY_DELAY = 5
+# shards streamed at once, keep it low, each one is a connection to the API
+WORKERS = 4
+
+
+def done_path(out_path):
+    """Where the finished shards for an output file are recorded."""
+    return out_path + ".done.json"
+
+
+def shard_id(endpoint, shard_start, shard_end):
+    return f"{endpoint} {format_date(shard_start)} {format_date(shard_end)}"
+
+
+def load_filters(path):
+    """A filter dict (see filter_ops.filter_opportunities) from a JSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_profile(name):
+    """A keyword profile from profiles_file, with its "backfill" source overrides, if any."""
+    from profiles import ProfileRegistry
+    from profiles_file import profiles
+
+    return ProfileRegistry.from_config(profiles, source="backfill")[name]
+
+
+def profile_filters(profile):
+    """Filters that let through anything mentioning one of the profile's keywords, to be scored."""
+    return {"keywords": list(profile.keywords)}
+
+
+def filter_releases(releases, filters, profile=None):
+    """Match records for the releases that pass the (compiled) filters, and the profile's min_score."""
+    if profile is None:
+        return [match_record(opp) for opp in iter_filter_opportunities(releases, filters)]
+
+    # the filter lower-cases its keywords
+    weights = {keyword.lower(): weight for keyword, weight in profile.keywords.items()}
+    records = []
+    # every keyword is needed for the score, not just the first
+    for opp, reasons in filters.iter_matches(releases, all_reasons=True):
+        score = sum(weights.get(keyword, 0) for keyword in reasons.get('keywords', []))
+        if profile.is_candidate(score):
+            records.append(match_record({**opp, "match_reasons": reasons}, profile.name, score))
+    return records
+
+
+def fetch_and_filter_shard(endpoint, shard_start, shard_end, filters, profile=None):
+    """
+    Runs in a worker process: stream one shard's releases and filter them on the way.
+    Returns (number of releases, match records). Retried a few times before giving up.
+    """
+    for attempt in range(1, SHARD_ATTEMPTS + 1):
+        release_count = 0
+
+        def counted(releases):
+            nonlocal release_count
+            for release in releases:
+                release_count += 1
+                yield release
+
+        try:
+            releases = counted(iter_releases(shard_url(endpoint, shard_start, shard_end)))
+            records = filter_releases(releases, filters, profile)
+            return release_count, records
+        except Exception:
+            if attempt == SHARD_ATTEMPTS:
+                raise
+            time.sleep(RETRY_DELAY * attempt)
+
+
+def written_ids(out_path):
+    """Ids of the records already in out_path, so a rerun doesn't write them again."""
+    ids = set()
+    try:
+        with open(out_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ids.add(json.loads(line)["id"])
+                except (ValueError, KeyError):
+                    # a line cut short by a crash
+                    continue
+    except FileNotFoundError:
+        pass
+    ids.discard('N/A')
+    return ids
+
+
+def match_record(opp, profile=None, keyword_score=None):
+    """The fields we keep for each match in the local store."""
+    tender_info = opp.get('tender') or {}
+    atm_id = opp.get('id', 'N/A')
+    record = {
+        "id": atm_id,
+        "title": tender_info.get('title', 'N/A'),
+        "buyer": opp.get('buyer', {}).get('name', 'N/A'),
+        "description": tender_info.get('description', 'N/A'),
+        "url": f"https://www.tenders.gov.au/Atm/Show/{atm_id}" if atm_id != 'N/A' else 'N/A',
+        "date": opp.get('date'),
+        "matched_unspsc": opp.get("matched_unspsc", []),
+        "match_reasons": opp.get("match_reasons", {}),
+    }
+    if profile is not None:
+        record["profile"] = profile
+        record["keyword_score"] = keyword_score
+    return record
+
+
+def run_backfill(start, end, endpoint="contractLastModified", shard="week", out_path=OUTPUT_FILE,
+                 workers=WORKERS, filters=MY_COMPANY_FILTERS, profile=None):
+    """
+    Backfill start -> end with filters, or with a keyword profile (see load_profile)
+    if one is given. Shards are fetched and filtered in parallel,
+    but results are written to out_path in shard order (a shard retried by a
+    later run lands after what was written before it). Shards finished by
+    an earlier run are skipped. A shard that still fails after its retries
+    is logged and left for the next run, the others carry on.
+    At most 2 x workers shards are in flight at a time to bound memory.
+    """
+    shards = date_shards(parse_date(start), parse_date(end), SHARD_SIZES[shard])
+    checkpoint_path = done_path(out_path)
+    finished = load_checkpoint(checkpoint_path)
+    todo = [window for window in shards if shard_id(endpoint, *window) not in finished]
+    if not todo:
+        print("Nothing to backfill.")
+        return 0
+
+    # compiled once here, the process pool gets the compiled filter with each shard
+    filters = compile_filters(profile_filters(profile) if profile is not None else filters)
+    matching = f"profile {profile.name}" if profile is not None else "filters"
+    print(f"Backfilling {endpoint} {start} -> {end} with {matching}: {len(todo)} of {len(shards)} {shard} shards "
+          f"left, {workers} workers")
+
+    started = time.perf_counter()
+    total_releases = 0
+    total_matches = 0
+    failed = []
+    already_written = written_ids(out_path)
+    shard_queue = iter(todo)
+    pending = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(out_path, "a", encoding="utf-8") as out:
+
+        def submit_next():
+            shard_window = next(shard_queue, None)
+            if shard_window is None:
+                return
+            future = pool.submit(fetch_and_filter_shard, endpoint, *shard_window, filters, profile)
+            pending.append((shard_window, future))
+
+        for _ in range(workers * 2):
+            submit_next()
+
+        done = 0
+        while pending:
+            (shard_start, shard_end), future = pending.popleft()
+            submit_next()
+            done += 1
+            label = f"[{done}/{len(todo)}] {format_date(shard_start)} -> {format_date(shard_end)}"
+            try:
+                release_count, records = future.result()
+            except Exception as e:
+                print(f"{label}: FAILED, left for the next run: {e!r}")
+                failed.append((shard_start, shard_end))
+                continue
+
+            new_records = [r for r in records if r["id"] not in already_written]
+            for record in new_records:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            already_written.update(r["id"] for r in new_records)
+            # only marked done once its matches are on disk
+            finished[shard_id(endpoint, shard_start, shard_end)] = len(records)
+            save_checkpoint(finished, checkpoint_path)
+
+            total_releases += release_count
+            total_matches += len(new_records)
+            print(f"{label}: {release_count} releases, {len(records)} matches")
+
+    elapsed = time.perf_counter() - started
+    print(f"Backfill complete: {total_releases} releases, {total_matches} matches in {elapsed:.1f}s -> {out_path}")
+    if failed:
+        print(f"{len(failed)} shard(s) failed, run the same command again to retry them: "
+              + ", ".join(f"{format_date(s)} -> {format_date(e)}" for s, e in failed))
+    return total_matches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill AusTender OCDS history with the filters or a keyword profile.")
+    parser.add_argument("start", help="start date, e.g. 2022-01-01")
+    parser.add_argument("end", help="end date, e.g. 2025-01-01")
+    parser.add_argument("--endpoint", default="contractLastModified", help="findByDates endpoint")
+    parser.add_argument("--shard", choices=sorted(SHARD_SIZES), default="week", help="shard size")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="shard processes, one API connection each")
+    matching = parser.add_mutually_exclusive_group()
+    matching.add_argument("--profile", help="keyword profile (from profiles_file) to score the history against")
+    matching.add_argument("--filters", help="JSON file of filters to use instead of the company ones")
+    parser.add_argument("--out", help=f"JSON-lines file the matches are appended to (default {OUTPUT_FILE}, "
+                                      "or backfill_<profile>.jsonl with --profile)")
+    args = parser.parse_args()
+
+    profile = load_profile(args.profile) if args.profile else None
+    filters = load_filters(args.filters) if args.filters else MY_COMPANY_FILTERS
+    out_path = args.out or (f"backfill_{profile.name}.jsonl" if profile is not None else OUTPUT_FILE)
+    run_backfill(args.start, args.end, endpoint=args.endpoint, shard=args.shard, out_path=out_path,
+                 workers=args.workers, filters=filters, profile=profile)
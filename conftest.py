@@ -0,0 +1,2 @@
+# Lets pytest find the tests under tests/ and put this directory on sys.path,
+# so they import the modules the same way the scripts here do (import filter_ops, ...).
@@ -1,14 +1,107 @@
 # filter opportunities
 
-import requests
-import json
-import datetime
-from unspscCodes import unspsc_mapping
+from unspsc_index import code_prefix
+# symlink to the main agent's Unleash-tenders/keyword_matcher.py
+from keyword_matcher import KeywordMatcher
 
 
-# This script fetches procurement data from the AusTender OCDS API,
-# filters it based on specific criteria, and prints matching opportunities.
-# You may need to install the 'requests' library: pip install requests
+# Filters procurement data from the AusTender OCDS API (see ocds_stream,
+# RSSmain) against specific criteria.
+
+
+class CompiledFilter:
+    """
+    A filter dict compiled once, so each opportunity is checked in one walk
+    over its contracts:
+    - UNSPSC codes go into a set per prefix length, at the level they're given:
+      '43' or '43000000' matches the whole segment, '4310' or '43100000' the family
+    - keywords go into one automaton that finds all of them in a single pass
+    - min_amount is parsed to a float once
+
+    match() returns the reasons an opportunity matched, or None.
+    With all_reasons=False the keyword scan is skipped once a UNSPSC code or the
+    amount has matched, and stops at the first keyword found, which is all a
+    yes/no filter needs. Opportunities are never modified.
+    """
+
+    def __init__(self, filters):
+        codes = [code_prefix(code) for code in filters.get('unspsc_codes') or []]
+        self.unspsc_prefixes = {}
+        for code in codes:
+            if code:
+                self.unspsc_prefixes.setdefault(len(code), set()).add(code)
+
+        keywords = [k.lower() for k in filters.get('keywords') or [] if k]
+        self.keyword_matcher = KeywordMatcher(dict.fromkeys(keywords, 1)) if keywords else None
+
+        min_amount = filters.get('min_amount')
+        self.min_amount = float(min_amount) if min_amount is not None else None
+
+    def _unspsc_match(self, code):
+        for length, prefixes in self.unspsc_prefixes.items():
+            if code[:length] in prefixes:
+                return True
+        return False
+
+    def match(self, opportunity, all_reasons=True):
+        """
+        The reasons opportunity matches, e.g.
+        {'unspsc': ['43231500'], 'keywords': ['software'], 'amount': 250000.0},
+        with only the filters that passed, or None if none did.
+        """
+        matched_codes = []
+        descriptions = []
+        best_amount = None
+
+        for contract in opportunity.get('contracts') or []:
+            if self.unspsc_prefixes:
+                for item in contract.get('items') or []:
+                    classification = item.get('classification') or {}
+                    if classification.get('scheme') == 'UNSPSC':
+                        unspsc_id = str(classification.get('id', ''))
+                        if self._unspsc_match(unspsc_id):
+                            matched_codes.append(unspsc_id)
+
+            if self.keyword_matcher is not None:
+                description = contract.get('description')
+                if description:
+                    descriptions.append(description)
+
+            if self.min_amount is not None:
+                amount = (contract.get('value') or {}).get('amount')
+                if amount is not None:
+                    amount = float(amount)
+                    if amount >= self.min_amount and (best_amount is None or amount > best_amount):
+                        best_amount = amount
+
+        reasons = {}
+        if matched_codes:
+            reasons['unspsc'] = matched_codes
+        if best_amount is not None:
+            reasons['amount'] = best_amount
+        if descriptions and (all_reasons or not reasons):
+            # newline can't be part of a keyword, so nothing matches across two descriptions
+            text = "\n".join(descriptions).lower()
+            if all_reasons:
+                matched_keywords = self.keyword_matcher.find(text)
+            else:
+                first = self.keyword_matcher.find_first(text)
+                matched_keywords = [first] if first is not None else []
+            if matched_keywords:
+                reasons['keywords'] = matched_keywords
+        return reasons or None
+
+    def iter_matches(self, opportunities, all_reasons=True):
+        """Lazily yield (opportunity, reasons) for each matching opportunity in any iterable."""
+        for opportunity in opportunities:
+            reasons = self.match(opportunity, all_reasons)
+            if reasons is not None:
+                yield opportunity, reasons
+
+
+def compile_filters(filters):
+    """Compile a filter dict, passing an already compiled filter straight through."""
+    return filters if isinstance(filters, CompiledFilter) else CompiledFilter(filters)
 
 
 def filter_opportunities(opportunities, filters):
@@ -24,14 +117,18 @@ def filter_opportunities(opportunities, filters):
     Args:
         opportunities (list): A list of dictionaries, where each dictionary
                              represents a single procurement opportunity.
-        filters (dict): A dictionary containing filter criteria.
+        filters (dict): A dictionary containing filter criteria (or a CompiledFilter).
                         Possible keys:
-                        - 'unspsc_codes': list of UNSPSC codes (e.g., ['81110000']).
+                        - 'unspsc_codes': list of UNSPSC codes or prefixes (e.g., ['43', '8111', '81110000']).
                         - 'keywords': list of keywords to search in contract descriptions.
                         - 'min_amount': minimum contract value.
 
     Returns:
         list: A new list containing only the opportunities that match at least one filter.
+              Each is a shallow copy with 'match_reasons' added: the UNSPSC codes and the
+              amount that matched (both are always checked), and only if neither did, the
+              first keyword found. 'matched_unspsc' is added too if any codes matched.
+              The input dicts are left as they were.
     """
     
     # Check if the input is valid JSON and contains the 'contracts' key.
@@ -39,44 +136,19 @@ def filter_opportunities(opportunities, filters):
         print("Error: The input data is not a list of opportunities.")
         return []
 
-    matched_opportunities = []
-
-    for opportunity in opportunities:
-        # Assume an opportunity is NOT a match until a filter passes.
-        unspsc_match = False
-        keyword_match = False
-        amount_match = False
-        
-        # This list will store any UNSPSC codes that match
-        matched_codes = []
+    return list(iter_filter_opportunities(opportunities, filters))
 
-        # Check for UNSPSC code match.
-        if 'unspsc_codes' in filters and filters['unspsc_codes']:
-            contract_items = opportunity.get('contracts', [])
-            for contract in contract_items:
-                for item in contract.get('items', []):
-                    if item.get('classification', {}).get('scheme') == 'UNSPSC':
-                        unspsc_id = item['classification']['id']
-                        prefix = unspsc_id[:4]
-                        if prefix in filters['unspsc_codes']:
-                            unspsc_match = True
-                            matched_codes.append(unspsc_id)
 
-        # Check for keyword match in contract description.
-        if 'keywords' in filters and filters['keywords']:
-            contract_descriptions = [c.get('description', '').lower() for c in opportunity.get('contracts', [])]
-            keyword_match = any(any(keyword.lower() in desc for desc in contract_descriptions) for keyword in filters['keywords'])
-
-        # Check for minimum amount.
-        if 'min_amount' in filters:
-            contract_values = [c.get('value', {}).get('amount') for c in opportunity.get('contracts', [])]
-            amount_match = any(float(v) >= filters['min_amount'] for v in contract_values if v is not None)
-                
-        # Now, check if ANY of the conditions are true using "OR"
-        if unspsc_match or keyword_match or amount_match:
-            # If there was a UNSPSC match, add the codes to the opportunity for printing
-            if unspsc_match:
-                opportunity["matched_unspsc"] = matched_codes
-            matched_opportunities.append(opportunity)
-
-    return matched_opportunities
\ No newline at end of file
+def iter_filter_opportunities(opportunities, filters):
+    """
+    Same filter as filter_opportunities, but lazy: takes any iterable of
+    opportunities (e.g. releases streamed from the API) and yields the
+    matching ones as it goes, so nothing has to be held in memory.
+    """
+    # the keyword scan stops at the first keyword and is skipped if a code or the
+    # amount matched, use CompiledFilter.match for all the reasons
+    for opportunity, reasons in compile_filters(filters).iter_matches(opportunities, all_reasons=False):
+        matched = {**opportunity, "match_reasons": reasons}
+        if 'unspsc' in reasons:
+            matched["matched_unspsc"] = reasons['unspsc']
+        yield matched
@@ -0,0 +1 @@
+Unleash-tenders/keywords_file.py
\ No newline at end of file
@@ -0,0 +1,209 @@
+# stream releases out of the AusTender OCDS API
+
+import codecs
+import json
+import re
+
+import requests
+
+
+# This reads the OCDS release package straight off the socket and yields one
+# release at a time, so memory is set by the biggest release rather than by
+# the size of the date window. Paging links are followed automatically.
+
+CHUNK_SIZE = 64 * 1024
+REQUEST_TIMEOUT = 60
+WHITESPACE = " \t\r\n"
+# a single value (release) bigger than this is taken to be malformed input
+MAX_VALUE_SIZE = 64 * 1024 * 1024
+
+_decoder = json.JSONDecoder()
+# what the scan for the end of a value has to stop at, inside and outside strings
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURE = re.compile(r'["{}\[\]]')
+# end of a number / true / false / null
+_SCALAR_END = re.compile(r"[\s,:\]}]")
+
+
+class _JsonStream:
+    """A small cursor over JSON text that arrives in chunks."""
+
+    def __init__(self, chunks, max_value_size=MAX_VALUE_SIZE):
+        self._chunks = iter(chunks)
+        self.max_value_size = max_value_size
+        self.buf = ""
+        self.pos = 0
+        # where the scan for the end of the current value is up to
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._scalar = False
+
+    def _more(self):
+        """Pull the next chunk in, dropping what's already been read."""
+        for chunk in self._chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        return False
+
+    def peek(self):
+        """Next non-whitespace character, or "" at the end of the stream."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._more():
+                return ""
+
+    def expect(self, chars):
+        """Consume the next character, which must be one of chars. Returns it."""
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise json.JSONDecodeError(f"Expected one of {chars!r}", self.buf, self.pos)
+        self.pos += 1
+        return ch
+
+    def _scan(self, text, i):
+        """
+        Carry the scan for the end of the current value on through text from i.
+        Returns the index in text just past the value, or None if it goes on past
+        it. The state (nesting depth, inside a string, escape) is kept between
+        calls, so each chunk is scanned once, however many the value spans.
+        """
+        if self._escape:
+            # the character after a backslash that ended the last chunk
+            self._escape = False
+            i += 1
+        if self._scalar:
+            match = _SCALAR_END.search(text, i)
+            return match.start() if match else None
+
+        while True:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(text, i)
+                if match is None:
+                    return None
+                if match.group() == "\\":
+                    if match.end() == len(text):
+                        self._escape = True
+                        return None
+                    i = match.end() + 1
+                    continue
+                self._in_string = False
+                i = match.end()
+                if not self._depth:
+                    return i
+            else:
+                match = _STRUCTURE.search(text, i)
+                if match is None:
+                    return None
+                i = match.end()
+                ch = match.group()
+                if ch == '"':
+                    self._in_string = True
+                elif ch in "{[":
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if not self._depth:
+                        return i
+
+    def value(self):
+        """
+        Decode one complete JSON value, reading more chunks until it is all there.
+        If it isn't all in the buffer, the chunks are scanned for the end of the
+        value as they come in and joined once, and only then is it decoded again,
+        so a big value isn't re-parsed for every chunk. A value that grows past
+        max_value_size is an error, not a reason to keep buffering.
+        """
+        first = self.peek()
+        if not first:
+            raise json.JSONDecodeError("Expected a value", self.buf, self.pos)
+        # most values (keys, small releases) are already all in the buffer
+        try:
+            value, end = _decoder.raw_decode(self.buf, self.pos)
+            # a number cut off by the end of the buffer ("1." of "1.5") might carry on in the next chunk
+            if first in '"{[' or _SCALAR_END.match(self.buf, end):
+                self.pos = end
+                return value
+        except json.JSONDecodeError:
+            pass
+
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._scalar = first not in '"{['
+
+        if self._scan(self.buf, self.pos) is None:
+            parts = [self.buf[self.pos:]]
+            size = len(parts[0])
+            # anything past the end of the stream is left for the decoder to complain about
+            for chunk in self._chunks:
+                size += len(chunk)
+                if size > self.max_value_size:
+                    raise json.JSONDecodeError(f"Value longer than {self.max_value_size} characters", parts[0], 0)
+                parts.append(chunk)
+                if self._scan(chunk, 0) is not None:
+                    break
+            self.buf = "".join(parts)
+            self.pos = 0
+        value, self.pos = _decoder.raw_decode(self.buf, self.pos)
+        return value
+
+
+def iter_package_releases(chunks, meta=None, array_key="releases", max_value_size=MAX_VALUE_SIZE):
+    """
+    Yield each entry of the release array in a release package.
+    All the other top-level fields (uri, links, publisher...) are put into meta.
+    Raises json.JSONDecodeError on malformed input, or a release bigger than max_value_size.
+    """
+    meta = {} if meta is None else meta
+    stream = _JsonStream(chunks, max_value_size)
+
+    stream.expect("{")
+    if stream.peek() == "}":
+        return
+
+    while True:
+        key = stream.value()
+        stream.expect(":")
+
+        if key == array_key and stream.peek() == "[":
+            stream.expect("[")
+            if stream.peek() == "]":
+                stream.expect("]")
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.expect(",]") == "]":
+                        break
+        else:
+            meta[key] = stream.value()
+
+        if stream.expect(",}") == "}":
+            break
+
+
+def _iter_text(response):
+    """Decode the response body as utf-8 text, chunk by chunk."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in response.iter_content(CHUNK_SIZE):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def iter_releases(url, session=None, timeout=REQUEST_TIMEOUT):
+    """
+    Yields releases one at a time from an OCDS findByDates url,
+    following the package's links.next until there are no more pages.
+    """
+    http = session or requests
+    while url:
+        meta = {}
+        with http.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            yield from iter_package_releases(_iter_text(response), meta)
+        url = (meta.get("links") or {}).get("next")
@@ -0,0 +1,96 @@
+# incremental sync of the AusTender OCDS API
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from ocds_stream import iter_releases
+
+
+# Instead of re-downloading the whole date range every run, we keep a
+# high-water mark per findByDates endpoint (contractLastModified,
+# contractPublished...) and only ask for the window since then.
+# Big windows are split into shards and the mark is moved forward after
+# each shard, so a crashed backfill picks up at the shard it stopped in.
+
+API_BASE_URL = "https://api.tenders.gov.au/ocds/findByDates"
+CHECKPOINT_FILE = "ocds_checkpoint.json"
+DEFAULT_START = "2024-02-08T00:00:00Z"
+SHARD_SIZE = timedelta(days=7)
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def parse_date(value):
+    """Parse an API date string ("2024-02-08T00:00:00Z") or a plain date ("2024-02-08")."""
+    for fmt in (DATE_FORMAT, "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date: {value}")
+
+
+def format_date(value):
+    return value.astimezone(timezone.utc).strftime(DATE_FORMAT)
+
+
+def load_checkpoint(path=CHECKPOINT_FILE):
+    """Load the saved watermarks, keyed by endpoint."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(checkpoint, path=CHECKPOINT_FILE):
+    """Write the watermarks atomically so a crash can't leave a half-written file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def date_shards(start, end, shard_size=SHARD_SIZE):
+    """Split start -> end into (shard_start, shard_end) windows of at most shard_size."""
+    shards = []
+    shard_start = start
+    while shard_start < end:
+        shard_end = min(shard_start + shard_size, end)
+        shards.append((shard_start, shard_end))
+        shard_start = shard_end
+    return shards
+
+
+def shard_url(endpoint, shard_start, shard_end):
+    return f"{API_BASE_URL}/{endpoint}/{format_date(shard_start)}/{format_date(shard_end)}"
+
+
+def iter_sync_releases(endpoint="contractLastModified", checkpoint_path=CHECKPOINT_FILE,
+                       start=None, end=None, shard_size=SHARD_SIZE):
+    """
+    Yields every release modified since the last run, shard by shard.
+    The watermark for the endpoint is saved once a shard's releases have all
+    been consumed, so only fully processed shards are ever skipped next time.
+    An explicit start overrides the saved watermark.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    since = parse_date(start or checkpoint.get(endpoint) or DEFAULT_START)
+    until = parse_date(end) if end else datetime.now(timezone.utc).replace(microsecond=0)
+
+    shards = date_shards(since, until, shard_size)
+    if not shards:
+        print(f"{endpoint} is already up to date ({format_date(since)}).")
+        return
+
+    print(f"Syncing {endpoint} from {format_date(since)} to {format_date(until)} in {len(shards)} shard(s)")
+    for number, (shard_start, shard_end) in enumerate(shards, start=1):
+        release_count = 0
+        for release in iter_releases(shard_url(endpoint, shard_start, shard_end)):
+            release_count += 1
+            yield release
+
+        checkpoint[endpoint] = format_date(shard_end)
+        save_checkpoint(checkpoint, checkpoint_path)
+        print(f"Shard {number}/{len(shards)} {format_date(shard_start)} -> {format_date(shard_end)}: {release_count} releases")
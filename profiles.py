@@ -0,0 +1 @@
+Unleash-tenders/profiles.py
\ No newline at end of file
@@ -0,0 +1 @@
+Unleash-tenders/profiles_file.py
\ No newline at end of file
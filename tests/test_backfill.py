@@ -0,0 +1,76 @@
+import backfill
+from filter_ops import compile_filters
+from profiles import Profile
+
+
+def release(release_id, description, amount=1000, code="72100000"):
+    return {
+        "id": release_id,
+        "date": "2024-03-01T00:00:00Z",
+        "tender": {"title": f"Tender {release_id}", "description": description},
+        "buyer": {"name": "Department of Testing"},
+        "contracts": [{
+            "description": description,
+            "value": {"amount": amount},
+            "items": [{"classification": {"scheme": "UNSPSC", "id": code}}],
+        }],
+    }
+
+
+RELEASES = [
+    release("a", "Drone inspection of bridges"),
+    release("b", "Drone hire"),
+    release("c", "Office cleaning", code="43231500"),
+    release("d", "Catering", amount=500000),
+]
+
+
+def test_records_carry_the_filter_reasons():
+    filters = compile_filters({"unspsc_codes": ["4323"], "keywords": ["drone"], "min_amount": 100000})
+    records = {r["id"]: r for r in backfill.filter_releases(RELEASES, filters)}
+    assert sorted(records) == ["a", "b", "c", "d"]
+    assert records["a"]["match_reasons"] == {"keywords": ["drone"]}
+    assert records["c"]["match_reasons"] == {"unspsc": ["43231500"]}
+    assert records["c"]["matched_unspsc"] == ["43231500"]
+    assert records["d"]["match_reasons"] == {"amount": 500000.0}
+    assert records["a"]["url"] == "https://www.tenders.gov.au/Atm/Show/a"
+    assert "profile" not in records["a"]
+
+
+def test_profile_scores_with_its_weights():
+    profile = Profile("drones", {"Drone": 6, "inspection": 5, "bridges": 1}, min_score=10)
+    filters = compile_filters(backfill.profile_filters(profile))
+    records = backfill.filter_releases(RELEASES, filters, profile)
+    # "Drone hire" only scores 6
+    assert [r["id"] for r in records] == ["a"]
+    assert records[0]["profile"] == "drones"
+    assert records[0]["keyword_score"] == 12
+    assert records[0]["match_reasons"] == {"keywords": ["drone", "inspection", "bridges"]}
+
+
+def test_load_profile_and_filters(tmp_path):
+    profile = backfill.load_profile("unleash")
+    assert profile.keywords and profile.min_score == 10
+
+    path = tmp_path / "filters.json"
+    path.write_text('{"keywords": ["drone"], "min_amount": 5}')
+    assert backfill.load_filters(str(path)) == {"keywords": ["drone"], "min_amount": 5}
+
+
+def test_shards_are_retried(monkeypatch):
+    attempts = []
+
+    def iter_releases(url):
+        attempts.append(url)
+        if len(attempts) < 2:
+            raise ConnectionError("dropped")
+        yield from RELEASES
+
+    monkeypatch.setattr(backfill, "iter_releases", iter_releases)
+    monkeypatch.setattr(backfill, "RETRY_DELAY", 0)
+    filters = compile_filters({"keywords": ["drone"]})
+    start, end = backfill.parse_date("2024-03-01"), backfill.parse_date("2024-03-02")
+    release_count, records = backfill.fetch_and_filter_shard("contractPublished", start, end, filters)
+    assert len(attempts) == 2
+    assert release_count == len(RELEASES)
+    assert [r["id"] for r in records] == ["a", "b"]
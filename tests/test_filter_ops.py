@@ -0,0 +1,80 @@
+import copy
+
+from filter_ops import CompiledFilter, compile_filters, filter_opportunities, iter_filter_opportunities
+
+
+def opportunity(code="72100000", description="Office fit-out", amount=1000, scheme="UNSPSC"):
+    return {
+        "id": "atm-1",
+        "contracts": [{
+            "description": description,
+            "value": {"amount": amount},
+            "items": [{"classification": {"scheme": scheme, "id": code}}],
+        }],
+    }
+
+
+def test_unspsc_codes_match_at_the_level_they_are_given():
+    segment = CompiledFilter({"unspsc_codes": ["43"]})
+    family = CompiledFilter({"unspsc_codes": ["43100000"]})
+    same_family = CompiledFilter({"unspsc_codes": ["4310"]})
+
+    assert segment.match(opportunity("43231512")) == {"unspsc": ["43231512"]}
+    assert segment.match(opportunity("43100000")) == {"unspsc": ["43100000"]}
+    assert family.match(opportunity("43101501")) == {"unspsc": ["43101501"]}
+    # '43100000' is the family, not the whole segment
+    assert family.match(opportunity("43231512")) is None
+    assert same_family.match(opportunity("43101501")) == family.match(opportunity("43101501"))
+    assert segment.match(opportunity("81110000")) is None
+    # only UNSPSC classifications count
+    assert segment.match(opportunity("43231512", scheme="CPV")) is None
+
+
+def test_all_reasons():
+    filters = CompiledFilter({"unspsc_codes": ["43"], "keywords": ["Software", "licences"], "min_amount": 1000})
+    opp = opportunity("43231512", "Software licences", amount=5000)
+    assert filters.match(opp) == {"unspsc": ["43231512"], "amount": 5000.0, "keywords": ["software", "licences"]}
+
+
+def test_short_circuit_skips_the_keyword_scan():
+    filters = CompiledFilter({"unspsc_codes": ["43"], "keywords": ["software", "licences"]})
+    # a code matched, the keywords aren't looked at
+    assert filters.match(opportunity("43231512", "Software licences"), all_reasons=False) == {"unspsc": ["43231512"]}
+    # nothing else matched, the first keyword found is enough
+    assert filters.match(opportunity("81110000", "Licences for software"), all_reasons=False) == \
+        {"keywords": ["licences"]}
+    assert filters.match(opportunity("81110000", "Cleaning"), all_reasons=False) is None
+
+
+def test_min_amount_takes_the_biggest_contract():
+    opp = opportunity(amount=100)
+    opp["contracts"].append({"value": {"amount": "300000"}})
+    opp["contracts"].append({"value": {"amount": 250000}})
+    assert CompiledFilter({"min_amount": 200000}).match(opp) == {"amount": 300000.0}
+    assert CompiledFilter({"min_amount": 400000}).match(opp) is None
+
+
+def test_input_is_not_mutated():
+    opportunities = [opportunity("43231512"), opportunity("81110000", "software"), opportunity("72100000")]
+    before = copy.deepcopy(opportunities)
+    matched = filter_opportunities(opportunities, {"unspsc_codes": ["4323"], "keywords": ["software"]})
+
+    assert opportunities == before
+    assert [m["match_reasons"] for m in matched] == [{"unspsc": ["43231512"]}, {"keywords": ["software"]}]
+    assert matched[0]["matched_unspsc"] == ["43231512"]
+    assert "matched_unspsc" not in matched[1]
+
+
+def test_iter_filter_opportunities_is_lazy():
+    def opportunities():
+        yield opportunity("43231512")
+        raise AssertionError("read past the first match")
+
+    matches = iter_filter_opportunities(opportunities(), {"unspsc_codes": ["43"]})
+    assert next(matches)["id"] == "atm-1"
+
+
+def test_compile_filters_passes_compiled_filters_through():
+    compiled = compile_filters({"keywords": ["x"]})
+    assert compile_filters(compiled) is compiled
+    assert filter_opportunities("not a list", compiled) == []
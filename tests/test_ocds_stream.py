@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from ocds_stream import iter_package_releases, iter_releases
+
+RELEASES = [
+    {"id": "r1", "tender": {"title": 'Drone "inspection"', "description": "line\nbreak \\ back\u00e9slash"}},
+    {"id": "r2", "value": -12.5e3, "items": [], "flags": [True, False, None], "note": "}]{[,:"},
+    {"id": "r3", "unicode": "é — 🚁"},
+]
+PACKAGE = {"uri": "https://api.tenders.gov.au/ocds/findByDates/x", "releases": RELEASES,
+           "links": {"next": None}, "version": 1.1}
+
+
+def split_at(text, *cuts):
+    cuts = [0, *cuts, len(text)]
+    return [text[a:b] for a, b in zip(cuts, cuts[1:])]
+
+
+def test_every_chunk_boundary():
+    text = json.dumps(PACKAGE, ensure_ascii=False)
+    # one cut at each position: inside keys, strings, escapes, numbers and literals
+    for cut in range(1, len(text)):
+        meta = {}
+        assert list(iter_package_releases(split_at(text, cut), meta)) == RELEASES, cut
+        assert meta == {key: value for key, value in PACKAGE.items() if key != "releases"}
+
+
+def test_one_character_chunks():
+    text = json.dumps(PACKAGE)
+    assert list(iter_package_releases(list(text))) == RELEASES
+
+
+def test_empty_package_and_array():
+    assert list(iter_package_releases(["{}"])) == []
+    meta = {}
+    assert list(iter_package_releases(['{"releases": [] , "uri": "u"}'], meta)) == []
+    assert meta == {"uri": "u"}
+
+
+@pytest.mark.parametrize("text", [
+    '{"releases": [{"id": "r1"}, {"id": ]}',
+    '{"releases": [{"id": "r1"} {"id": "r2"}]}',
+    '{"releases": [{"id": "r1",}]}',
+    '{"releases": [{"id": "r1"}',
+    '{"releases": [{"id": "unterminated}]}',
+    '["not", "a", "package"]',
+])
+def test_malformed_input(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_package_releases(split_at(text, len(text) // 2)))
+
+
+def test_oversized_release_fails_without_reading_the_rest():
+    read = []
+
+    def chunks():
+        yield '{"releases": [{"id": "r1"}, {"description": "'
+        # never closed
+        while True:
+            read.append(1)
+            yield "x" * 1000
+
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_package_releases(chunks(), max_value_size=10_000))
+    assert len(read) <= 11
+
+
+class FakeResponse:
+
+    def __init__(self, body):
+        self.body = body.encode("utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        # small chunks, so multi-byte characters are split too
+        for start in range(0, len(self.body), 7):
+            yield self.body[start:start + 7]
+
+
+class FakeSession:
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requested = []
+
+    def get(self, url, stream=False, timeout=None):
+        self.requested.append(url)
+        return FakeResponse(self.pages[url])
+
+
+def test_iter_releases_follows_links_next():
+    pages = {
+        "page1": json.dumps({"releases": RELEASES[:1], "links": {"next": "page2"}}),
+        "page2": json.dumps({"links": {"next": "page3"}, "releases": RELEASES[1:2]}, ensure_ascii=False),
+        "page3": json.dumps({"releases": RELEASES[2:], "links": {}}, ensure_ascii=False),
+    }
+    session = FakeSession(pages)
+    assert list(iter_releases("page1", session=session)) == RELEASES
+    assert session.requested == ["page1", "page2", "page3"]
+
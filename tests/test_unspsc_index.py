@@ -0,0 +1,97 @@
+import pytest
+
+from unspsc_index import (
+    UnspscIndex, build_index, code_level, code_prefix, load_index, normalise_code, read_code_file,
+)
+
+PAIRS = [
+    ("43000000", "Information Technology"),
+    ("43230000", "Software"),
+    ("43231500", "Business function specific software"),
+    ("43231512", "License management software"),
+    ("43239999", "Last code in the family"),
+    ("43240000", "Next family"),
+    ("44000000", "Office Equipment"),
+    ("42999999", "Just below the segment"),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = UnspscIndex(build_index(PAIRS, str(tmp_path / "unspsc_index.bin")))
+    yield index
+    index.close()
+
+
+def test_codes():
+    assert normalise_code("43.10") == "43100000"
+    assert normalise_code(4310) == "43100000"
+    assert normalise_code("") is None
+    assert code_prefix("43100000") == "4310"
+    assert code_prefix("43231500") == "432315"
+    assert code_prefix("43") == "43"
+    assert [code_level(c) for c in ("43", "4323", "43231500", "43231512")] == \
+        ["segment", "family", "class", "commodity"]
+
+
+def test_round_trip(index):
+    assert len(index) == len(PAIRS)
+    for code, title in PAIRS:
+        assert code in index
+        assert index.title(code) == title
+    assert index.title("43230000") == index.title("4323") == "Software"
+    assert index.title("99999999") is None
+
+
+def test_later_duplicates_win(tmp_path):
+    path = build_index([("43", "old"), ("43000000", "new")], str(tmp_path / "index.bin"))
+    with_duplicates = UnspscIndex(path)
+    assert len(with_duplicates) == 1
+    assert with_duplicates.title("43") == "new"
+    with_duplicates.close()
+
+
+def test_under_stays_inside_the_prefix(index):
+    assert index.under("4323") == ["43230000", "43231500", "43231512", "43239999"]
+    assert index.under("43") == ["43000000", "43230000", "43231500", "43231512", "43239999", "43240000"]
+    assert index.under("43231500") == ["43231500", "43231512"]
+    assert index.under("43231512") == ["43231512"]
+    assert index.under("45") == []
+    assert index.under("") == []
+
+
+def test_ancestors_and_category(index):
+    assert index.ancestors("43231512") == [
+        ("segment", "43000000", "Information Technology"),
+        ("family", "43230000", "Software"),
+        ("class", "43231500", "Business function specific software"),
+        ("commodity", "43231512", "License management software"),
+    ]
+    # falls back to the most specific level we have a title for
+    assert index.category("43231599") == "Business function specific software"
+    assert index.category("99000000") == "Unknown category"
+
+
+def test_read_code_file(tmp_path):
+    with_header = tmp_path / "codes.csv"
+    with_header.write_text("Title,Code\nSoftware,43230000\nbad row\nOffice,44\n", encoding="utf-8")
+    assert read_code_file(str(with_header)) == [("43230000", "Software"), ("44000000", "Office")]
+
+    without_header = tmp_path / "plain.csv"
+    without_header.write_text("43230000,Software\n44000000,Office\n", encoding="utf-8")
+    assert read_code_file(str(without_header)) == [("43230000", "Software"), ("44000000", "Office")]
+
+
+def test_load_index_builds_from_the_code_file(tmp_path):
+    codes = tmp_path / "codes.csv"
+    codes.write_text("code,title\n43230000,Software\n", encoding="utf-8")
+    index = load_index(str(tmp_path / "unspsc_index.bin"), str(codes))
+    assert index.title("4323") == "Software"
+    index.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.bin"
+    path.write_bytes(b"x" * 32)
+    with pytest.raises(ValueError):
+        UnspscIndex(str(path))
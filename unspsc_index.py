@@ -0,0 +1,214 @@
+# UNSPSC code index
+
+import argparse
+import csv
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from unspscCodes import unspsc_mapping
+
+
+# UNSPSC codes are 8 digits, two per level: segment (43000000), family
+# (43230000), class (43231500) and commodity (43231512). The full code list
+# (~150k rows, e.g. the UNGM export) is turned into a prebuilt binary file:
+# the codes sorted as uint32, an offset table and the titles as one utf-8 blob.
+# The file is memory-mapped, so loading it costs next to nothing. Lookups go
+# through a dict built on first use, and "everything under 43" is a range of
+# the sorted code array.
+
+# next to this module, not in whatever directory we're run from
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+CODES_FILE = os.path.join(MODULE_DIR, "unspsc_codes.csv")
+INDEX_FILE = os.path.join(MODULE_DIR, "unspsc_index.bin")
+
+LEVELS = ("segment", "family", "class", "commodity")
+
+# file layout: header (magic, number of codes, size of the title blob),
+# codes (uint32 x n), title offsets (uint32 x n + 1), titles
+MAGIC = b"UNS1"
+HEADER = struct.Struct("<4sII")
+
+
+def normalise_code(code):
+    """'4310', '43.10', 43100000 -> '43100000' (padded to 8 digits)."""
+    digits = "".join(ch for ch in str(code) if ch.isdigit())[:8]
+    return digits.ljust(8, "0") if digits else None
+
+
+def code_prefix(code):
+    """
+    The significant part of a code, what everything under it starts with:
+    '43100000' -> '4310', '43231500' -> '432315', '43' -> '43'.
+    """
+    digits = "".join(ch for ch in str(code) if ch.isdigit())[:8]
+    while len(digits) > 2 and digits.endswith("00"):
+        digits = digits[:-2]
+    return digits
+
+
+def code_level(code):
+    """segment / family / class / commodity for a code."""
+    return LEVELS[max(len(code_prefix(code)), 2) // 2 - 1]
+
+
+def read_code_file(path):
+    """
+    (code, title) pairs from a csv code list. Uses the 'code' and 'title'
+    columns if there's a header with them, otherwise the first two columns.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = csv.reader(f)
+        header = next(rows, None)
+        if header is None:
+            return []
+        columns = [h.strip().lower() for h in header]
+        if "code" in columns and "title" in columns:
+            code_col, title_col = columns.index("code"), columns.index("title")
+        else:
+            code_col, title_col = 0, 1
+            rows = [header, *rows]
+
+        pairs = []
+        for row in rows:
+            if len(row) <= max(code_col, title_col):
+                continue
+            code = normalise_code(row[code_col])
+            if code:
+                pairs.append((code, row[title_col].strip()))
+        return pairs
+
+
+def build_index(pairs, path=INDEX_FILE):
+    """Write (code, title) pairs out as an index file. Later duplicates win."""
+    titles_by_code = {int(normalise_code(code)): title for code, title in pairs}
+    codes = np.array(sorted(titles_by_code), dtype=np.uint32)
+
+    blob = bytearray()
+    offsets = np.zeros(len(codes) + 1, dtype=np.uint32)
+    for i, code in enumerate(codes.tolist()):
+        blob += titles_by_code[code].encode("utf-8")
+        offsets[i + 1] = len(blob)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(codes), len(blob)))
+        f.write(codes.tobytes())
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return path
+
+
+class UnspscIndex:
+    """Read-only view of an index file written by build_index."""
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, blob_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a UNSPSC index file")
+
+        start = HEADER.size
+        self.codes = np.frombuffer(self._map, dtype=np.uint32, count=count, offset=start)
+        start += self.codes.nbytes
+        self._offsets = np.frombuffer(self._map, dtype=np.uint32, count=count + 1, offset=start)
+        self._titles_start = start + self._offsets.nbytes
+        self._rows = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    def _row(self, code):
+        if self._rows is None:
+            # built on first lookup, every lookup after that is one dict get
+            self._rows = {code: row for row, code in enumerate(self.codes.tolist())}
+        normalised = normalise_code(code)
+        return self._rows.get(int(normalised)) if normalised else None
+
+    def _title_at(self, row):
+        start = self._titles_start + int(self._offsets[row])
+        end = self._titles_start + int(self._offsets[row + 1])
+        return self._map[start:end].decode("utf-8")
+
+    def __contains__(self, code):
+        return self._row(code) is not None
+
+    def title(self, code):
+        """Title of exactly this code, or None."""
+        row = self._row(code)
+        return self._title_at(row) if row is not None else None
+
+    def ancestors(self, code):
+        """[(level, code, title)] from the segment down to the code itself, for the levels we know."""
+        prefix = code_prefix(code)
+        chain = []
+        for length in range(2, len(prefix) + 1, 2):
+            level_code = normalise_code(prefix[:length])
+            title = self.title(level_code)
+            if title is not None:
+                chain.append((LEVELS[length // 2 - 1], level_code, title))
+        return chain
+
+    def category(self, code, default="Unknown category"):
+        """The most specific title we have for a code: its own, else its class, family or segment."""
+        chain = self.ancestors(code)
+        return chain[-1][2] if chain else default
+
+    def under(self, prefix):
+        """All the codes under a prefix ('43', '4310', '43100000'...), as 8-digit strings."""
+        prefix = code_prefix(prefix)
+        if not prefix:
+            return []
+        width = 10 ** (8 - len(prefix))
+        low = int(prefix) * width
+        start, end = np.searchsorted(self.codes, [low, low + width])
+        return [f"{code:08d}" for code in self.codes[start:end].tolist()]
+
+    def close(self):
+        self._rows = None
+        self.codes = self._offsets = None
+        self._map.close()
+
+
+def load_index(index_path=INDEX_FILE, codes_path=CODES_FILE):
+    """
+    Open the index, (re)building it first if the code file is newer.
+    With no code file at all, falls back to an index of unspscCodes.unspsc_mapping.
+    """
+    index_exists = os.path.exists(index_path)
+    if os.path.exists(codes_path):
+        if not index_exists or os.path.getmtime(codes_path) > os.path.getmtime(index_path):
+            build_index(read_code_file(codes_path), index_path)
+    elif not index_exists:
+        build_index(unspsc_mapping.items(), index_path)
+    return UnspscIndex(index_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the UNSPSC index.")
+    parser.add_argument("codes", nargs="*", help="codes to look up, e.g. 43231512 or 43")
+    parser.add_argument("--build", metavar="CSV", help="build the index from this code file first")
+    parser.add_argument("--index", default=INDEX_FILE, help="index file")
+    parser.add_argument("--under", action="store_true", help="list every code under each code given")
+    args = parser.parse_args()
+
+    if args.build:
+        pairs = read_code_file(args.build)
+        build_index(pairs, args.index)
+        print(f"Indexed {len(pairs)} codes from {args.build} -> {args.index}")
+
+    index = load_index(args.index)
+    for code in args.codes:
+        if args.under:
+            for child in index.under(code):
+                print(f"{child}  {index.title(child)}")
+        else:
+            for level, level_code, title in index.ancestors(code):
+                print(f"{level:<10} {level_code}  {title}")
+    index.close()